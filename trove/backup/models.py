@@ -14,7 +14,12 @@
 
 """Model classes that form the core of snapshots functionality."""
 
+import base64
+import datetime
+
+from sqlalchemy import and_
 from sqlalchemy import desc
+from sqlalchemy import or_
 from swiftclient.client import ClientException
 
 from trove.common import cfg
@@ -32,6 +37,8 @@ from trove.openstack.common.gettextutils import _
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+MARKER_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
 
 class BackupState(object):
     NEW = "NEW"
@@ -156,25 +163,51 @@ class Backup(object):
         except exception.NotFound:
             raise exception.NotFound(uuid=backup_id)
 
+    @classmethod
+    def _encode_marker(cls, backup):
+        """Build the opaque marker of the page following backup."""
+        marker = '%s|%s' % (backup.updated.strftime(MARKER_TIME_FORMAT),
+                            backup.id)
+        return base64.urlsafe_b64encode(marker).rstrip('=')
+
+    @classmethod
+    def _decode_marker(cls, marker):
+        marker = str(marker)
+        padding = '=' * (-len(marker) % 4)
+        try:
+            updated, backup_id = base64.urlsafe_b64decode(
+                marker + padding).split('|', 1)
+            return (datetime.datetime.strptime(updated, MARKER_TIME_FORMAT),
+                    backup_id)
+        except (TypeError, ValueError):
+            raise exception.BadRequest(_("Invalid marker: %s") % marker)
+
     @classmethod
     def _paginate(cls, context, query):
         """Paginate the results of the base query.
-        We use limit/offset as the results need to be ordered by date
-        and not the primary key.
+        The results are ordered by date, most recent first, with the id
+        breaking ties. Each page seeks past the (updated, id) of the last
+        backup of the previous page, which the marker encodes, so deep
+        pages do not scan the rows before them.
         """
-        marker = int(context.marker or 0)
         limit = int(context.limit or CONF.backups_page_size)
         # order by 'updated DESC' to show the most recent backups first
-        query = query.order_by(desc(DBBackup.updated))
-        # Apply limit/offset
-        query = query.limit(limit)
-        query = query.offset(marker)
-        # check if we need to send a marker for the next page
-        if query.count() < limit:
-            marker = None
-        else:
-            marker += limit
-        return query.all(), marker
+        query = query.order_by(desc(DBBackup.updated), desc(DBBackup.id))
+        if context.marker and str(context.marker).isdigit():
+            # Offset marker handed out before markers were opaque
+            query = query.offset(int(context.marker))
+        elif context.marker:
+            updated, backup_id = cls._decode_marker(context.marker)
+            query = query.filter(or_(
+                DBBackup.updated < updated,
+                and_(DBBackup.updated == updated, DBBackup.id < backup_id)))
+        # Fetch one more than a page to know whether there is a next one
+        backups = query.limit(limit + 1).all()
+        marker = None
+        if len(backups) > limit:
+            backups = backups[:limit]
+            marker = cls._encode_marker(backups[-1])
+        return backups, marker
 
     @classmethod
     def list(cls, context, datastore=None):
@@ -219,32 +252,55 @@ class Backup(object):
             backup.state = BackupState.FAILED
             backup.save()
 
+    @classmethod
+    def _chain(cls, backup):
+        """
+        Return the ids of a backup and all its live descendants, children
+        before their parents, with one query per generation of the tree.
+        """
+        chain = [backup.id]
+        generation = [backup.id]
+        while generation:
+            query = DBBackup.query().with_entities(DBBackup.id)
+            query = query.filter_by(tenant_id=backup.tenant_id, deleted=False)
+            query = query.filter(DBBackup.parent_id.in_(generation))
+            generation = [child_id for child_id, in query.all()]
+            chain.extend(generation)
+        return list(reversed(chain))
+
     @classmethod
     def delete(cls, context, backup_id):
         """
-        update Backup table on deleted flag for given Backup
+        update Backup table on deleted flag for given Backup and all of its
+        children and grandchildren
         :param cls:
         :param context: context containing the tenant id and token
         :param backup_id: Backup uuid
         :return:
         """
 
-        # Recursively delete all children and grandchildren of this backup.
-        query = DBBackup.query()
-        query = query.filter_by(parent_id=backup_id, deleted=False)
-        for child in query.all():
-            cls.delete(context, child.id)
+        backup = cls.get_by_id(context, backup_id)
+        if backup.is_running:
+            msg = _("Backup %s cannot be deleted because it is running.")
+            raise exception.UnprocessableEntity(msg % backup_id)
+        cls.verify_swift_auth_token(context)
+
+        chain = cls._chain(backup)
+        if len(chain) > 1:
+            query = DBBackup.query()
+            query = query.filter(DBBackup.id.in_(chain),
+                                 DBBackup.state.in_(
+                                     BackupState.RUNNING_STATES))
+            running = query.first()
+            if running:
+                msg = _("Backup %s cannot be deleted because it is running.")
+                raise exception.UnprocessableEntity(msg % running.id)
 
         def _delete_resources():
-            backup = cls.get_by_id(context, backup_id)
-            if backup.is_running:
-                msg = _("Backup %s cannot be deleted because it is running.")
-                raise exception.UnprocessableEntity(msg % backup_id)
-            cls.verify_swift_auth_token(context)
-            api.API(context).delete_backup(backup_id)
+            api.API(context).delete_backups(chain)
 
         return run_with_quotas(context.tenant,
-                               {'backups': -1},
+                               {'backups': -len(chain)},
                                _delete_resources)
 
     @classmethod
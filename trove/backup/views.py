@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from trove.common.views import collection
+
 
 class BackupView(object):
 
@@ -49,8 +51,5 @@ class BackupViews(object):
         self.backups = backups
 
     def data(self):
-        backups = []
-
-        for b in self.backups:
-            backups.append(BackupView(b).data()["backup"])
-        return {"backups": backups}
+        return {"backups": collection(BackupView(b).data()["backup"]
+                                      for b in self.backups)}
@@ -97,6 +97,18 @@ common_opts = [
                                        'information_schema']),
     cfg.IntOpt('agent_call_low_timeout', default=5),
     cfg.IntOpt('agent_call_high_timeout', default=60),
+    cfg.IntOpt('sql_batch_size', default=50,
+               help='Number of statements the MySQL guest sends to the '
+                    'server in one round trip when creating databases and '
+                    'users or granting access in bulk. Set to 1 to send '
+                    'them one at a time.'),
+    cfg.IntOpt('fan_out_concurrency', default=10,
+               help='Maximum number of guests called at the same time by '
+                    'management actions that span many instances, such as '
+                    'updating every guest on a host.'),
+    cfg.IntOpt('fan_out_timeout', default=120,
+               help='Seconds to wait for each guest call made by those '
+                    'actions before counting it as failed.'),
     cfg.StrOpt('guest_id', default=None),
     cfg.IntOpt('state_change_wait_time', default=3 * 60),
     cfg.IntOpt('agent_heartbeat_time', default=10),
@@ -117,6 +129,15 @@ common_opts = [
     cfg.StrOpt('quota_driver',
                default='trove.quota.quota.DbQuotaDriver',
                help='Default driver to use for quota checks.'),
+    cfg.IntOpt('quota_cache_ttl', default=0,
+               help='Seconds the API caches the quota limits of a tenant. '
+                    'Limits updated through the management API are '
+                    'invalidated in the process that served the update; '
+                    'other processes see them once the entry expires. '
+                    '0 disables the cache.'),
+    cfg.IntOpt('quota_cache_size', default=10000,
+               help='Maximum number of tenants whose quota limits are '
+                    'cached.'),
     cfg.StrOpt('taskmanager_queue', default='taskmanager'),
     cfg.StrOpt('conductor_queue', default='trove-conductor'),
     cfg.IntOpt('trove_conductor_workers',
@@ -148,6 +169,27 @@ common_opts = [
     cfg.IntOpt('http_delete_rate', default=200),
     cfg.IntOpt('http_put_rate', default=200),
     cfg.IntOpt('http_mgmt_post_rate', default=200),
+    cfg.StrOpt('rate_limit_backend', default='mmap',
+               help='Where SharedLimiter keeps rate limit buckets: mmap, '
+                    'a file shared by the API workers of one host, or '
+                    'memcached, shared by API workers on any host.'),
+    cfg.StrOpt('rate_limit_mmap_path', default='/var/run/trove/rate_limits',
+               help='File holding the rate limit buckets of the mmap '
+                    'backend.'),
+    cfg.IntOpt('rate_limit_mmap_slots', default=65536,
+               help='Number of buckets in the mmap backend file.'),
+    cfg.ListOpt('rate_limit_memcached_servers', default=[],
+                help='Memcached servers used by the memcached rate limit '
+                     'backend.'),
+    cfg.IntOpt('rate_limit_batch_size', default=1,
+               help='Number of requests an API worker takes from a shared '
+                    'rate limit bucket at once. Larger batches save round '
+                    'trips to the backend but let each worker exceed a '
+                    'limit by up to one batch.'),
+    cfg.BoolOpt('stream_list_responses', default=False,
+                help='Serialize the items of list responses one by one as '
+                     'the response is sent, instead of building the whole '
+                     'body in memory first.'),
     cfg.BoolOpt('hostname_require_ipv4', default=True,
                 help="Require user hostnames to be IPv4 addresses."),
     cfg.BoolOpt('trove_security_groups_support', default=True),
@@ -177,6 +219,19 @@ common_opts = [
                 help='Incremental Backup Runner based on the default'
                 ' strategy. For strategies that do not implement an'
                 ' incremental, the runner will use the default full backup.'),
+    cfg.DictOpt('backup_codec', default={},
+                help='In-process codec compressing the output of a backup '
+                     'strategy in place of the gzip pipeline, keyed by '
+                     'strategy, e.g. InnoBackupEx:ParallelGzip. Codecs are '
+                     'not used for encrypted backups.'),
+    cfg.StrOpt('backup_codec_namespace',
+               default='trove.guestagent.strategies.codec.gzip_impl',
+               help='Namespace to load backup codecs from.'),
+    cfg.IntOpt('backup_codec_threads', default=4,
+               help='Number of threads compressing a backup in process.'),
+    cfg.IntOpt('backup_codec_block_size', default=1024 ** 2,
+               help='Size of the blocks a backup is compressed in when it '
+                    'is compressed in process.'),
     cfg.BoolOpt('verify_swift_checksum_on_restore', default=True,
                 help='Enable verification of swift checksum before starting '
                 'restore; makes sure the checksum of original backup matches '
@@ -186,6 +241,9 @@ common_opts = [
     cfg.StrOpt('storage_namespace',
                default='trove.guestagent.strategies.storage.swift',
                help='Namespace to load the default storage strategy from.'),
+    cfg.StrOpt('backup_local_storage_dir', default='/var/lib/trove/backups',
+               help='Directory backups are written to by the local storage '
+                    'strategy.'),
     cfg.StrOpt('backup_swift_container', default='database_backups'),
     cfg.BoolOpt('backup_use_gzip_compression', default=True,
                 help='Compress backups using gzip.'),
@@ -203,6 +261,37 @@ common_opts = [
                ' See: http://stackoverflow.com/questions/1131220/'),
     cfg.IntOpt('backup_segment_max_size', default=2 * (1024 ** 3),
                help="Maximum size of each segment of the backup file."),
+    cfg.IntOpt('backup_upload_concurrency', default=1,
+               help='Number of backup segments uploaded to swift at the same '
+                    'time. Segments are buffered in memory when more than '
+                    'one is uploaded at once.'),
+    cfg.IntOpt('backup_upload_segment_size', default=64 * (1024 ** 2),
+               help='Size of each segment of the backup file when segments '
+                    'are uploaded concurrently. The guest holds up to '
+                    'backup_upload_concurrency + 1 of these in memory.'),
+    cfg.IntOpt('backup_delete_concurrency', default=1,
+               help='Number of swift segments the taskmanager deletes at '
+                    'the same time when a backup is deleted.'),
+    cfg.IntOpt('backup_download_concurrency', default=1,
+               help='Number of byte ranges of a backup fetched from swift at '
+                    'the same time during a restore.'),
+    cfg.IntOpt('backup_download_range_size', default=64 * (1024 ** 2),
+               help='Size of each byte range fetched when a backup is '
+                    'downloaded concurrently. The guest holds up to '
+                    'backup_download_concurrency of these in memory.'),
+    cfg.IntOpt('remote_client_cache_ttl', default=0,
+               help='Seconds nova, cinder and heat clients are reused for '
+                    'requests made with the same token. Clients are also '
+                    'dropped before their token expires. 0 disables the '
+                    'cache.'),
+    cfg.IntOpt('remote_client_cache_size', default=1000,
+               help='Maximum number of cached remote service clients.'),
+    cfg.IntOpt('remote_client_expiry_margin', default=60,
+               help='Seconds before its token expires that a cached client '
+                    'is dropped.'),
+    cfg.IntOpt('remote_endpoint_cache_size', default=1000,
+               help='Maximum number of service catalog endpoint lookups '
+                    'that are remembered.'),
     cfg.StrOpt('remote_dns_client',
                default='trove.common.remote.dns_client'),
     cfg.StrOpt('remote_guest_client',
@@ -220,6 +309,13 @@ common_opts = [
     cfg.IntOpt('exists_notification_ticks', default=360,
                help='Number of report_intervals to wait between pushing '
                     'events (see report_interval).'),
+    cfg.IntOpt('exists_notification_batch_size', default=1000,
+               help='Number of instances read per query, and exists events '
+                    'published per batch, when pushing exists events.'),
+    cfg.FloatOpt('exists_notification_spread', default=0.0,
+                 help='Fraction of the exists_notification_ticks window to '
+                      'spread publishing exists events over, pausing '
+                      'between batches. 0 publishes them all at once.'),
     cfg.DictOpt('notification_service_id',
                 default={'mysql': '2f3ff068-2bfb-4f70-9a9d-a6bb65bc084b',
                          'redis': 'b216ffc5-1947-456c-a4cf-70f94c05f7d0',
@@ -265,7 +361,27 @@ common_opts = [
                     'large tokens (typically those generated by the '
                     'Keystone v3 API with big service catalogs).'),
     cfg.StrOpt('conductor_manager', default='trove.conductor.manager.Manager',
-               help='Qualified class name to use for conductor manager.')
+               help='Qualified class name to use for conductor manager.'),
+    cfg.IntOpt('server_status_cache_ttl', default=0,
+               help='Seconds a Nova server read by the API is cached for '
+                    'before being fetched again. Only read-only views use '
+                    'the cache, and an API worker only drops an entry for '
+                    'actions it starts itself, so other workers may show '
+                    'a server status up to this old. Zero disables the '
+                    'cache.'),
+    cfg.IntOpt('server_status_cache_size', default=10000,
+               help='Maximum number of Nova servers held in the cache.'),
+    cfg.IntOpt('server_load_concurrency', default=10,
+               help='Number of Nova servers the instance list fetches at '
+                    'the same time when they are not cached.'),
+    cfg.FloatOpt('heartbeat_batch_interval', default=0,
+                 help='Seconds the conductor buffers guest heartbeats for '
+                      'before writing the newest one per instance in bulk. '
+                      'Zero writes every heartbeat as it arrives.'),
+    cfg.IntOpt('conductor_lastseen_cache_size', default=0,
+               help='Number of last seen message times the conductor keeps '
+                    'in memory and writes behind to the database. Zero '
+                    'reads and writes the table for every message.'),
 ]
 
 # Datastore specific option groups
@@ -33,6 +33,7 @@ class TroveContext(context.RequestContext):
         self.limit = kwargs.pop('limit', None)
         self.marker = kwargs.pop('marker', None)
         self.service_catalog = kwargs.pop('service_catalog', None)
+        self.auth_token_expires = kwargs.pop('auth_token_expires', None)
         super(TroveContext, self).__init__(**kwargs)
 
         if not hasattr(local.store, 'context'):
@@ -42,7 +43,8 @@ class TroveContext(context.RequestContext):
         parent_dict = super(TroveContext, self).to_dict()
         parent_dict.update({'limit': self.limit,
                             'marker': self.marker,
-                            'service_catalog': self.service_catalog
+                            'service_catalog': self.service_catalog,
+                            'auth_token_expires': self.auth_token_expires
                             })
         return parent_dict
 
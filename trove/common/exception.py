@@ -177,6 +177,11 @@ class GuestError(TroveError):
                 "%(original_message)s.")
 
 
+class BatchStatementError(TroveError):
+
+    message = _("Failed to %(action)s for: %(items)s.")
+
+
 class GuestTimeout(TroveError):
 
     message = _("Timeout trying to connect to the Guest Agent.")
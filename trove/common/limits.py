@@ -19,14 +19,25 @@ Module dedicated functions/classes dealing with rate limiting requests.
 
 import collections
 import copy
+import fcntl
+import hashlib
 import httplib
 import math
+import mmap
+import os
 import re
+import struct
 import time
 import webob.dec
 import webob.exc
 
+try:
+    import memcache
+except ImportError:
+    memcache = None
+
 from trove.common import cfg
+from trove.common import exception
 from trove.common import wsgi as base_wsgi
 from trove.openstack.common import importutils
 from trove.openstack.common import jsonutils
@@ -70,6 +81,7 @@ class Limit(object):
         self.verb = verb
         self.uri = uri
         self.regex = regex
+        self.pattern = re.compile(regex)
         self.value = int(value)
         self.unit = unit
         self.unit_string = self.display_unit().lower()
@@ -95,7 +107,7 @@ class Limit(object):
         @param verb: string http verb (POST, GET, etc.)
         @param url: string URL
         """
-        if self.verb != verb or not re.match(self.regex, url):
+        if self.verb != verb or not self.pattern.match(url):
             return
 
         now = self._get_time()
@@ -129,6 +141,14 @@ class Limit(object):
         """Retrieve the current time. Broken out for testability."""
         return time.time()
 
+    def copy(self):
+        """
+        Return a copy of this limit with its own bucket state. The compiled
+        pattern is shared, which also keeps this working on interpreters
+        that cannot deep copy pattern objects.
+        """
+        return copy.copy(self)
+
     def display_unit(self):
         """Display the string name of the unit."""
         return self.UNITS.get(self.unit, "UNKNOWN")
@@ -217,6 +237,78 @@ class RateLimitingMiddleware(base_wsgi.TroveMiddleware):
         return self.application
 
 
+class UserLevel(object):
+    """
+    The limits of a single user, indexed by HTTP verb.
+    """
+
+    __slots__ = ('limits', 'by_verb', 'last_seen', 'pinned', 'taken')
+
+    def __init__(self, limits, pinned=False):
+        self.limits = limits
+        self.by_verb = collections.defaultdict(list)
+        for limit in limits:
+            self.by_verb[limit.verb].append(limit)
+        self.last_seen = None
+        self.pinned = pinned
+        # Requests taken in advance from a shared bucket, by limit.
+        self.taken = {}
+
+
+class UserLevels(object):
+    """
+    Per-user copies of a set of limits, created on first use.
+
+    Users that have not made a request for longer than the longest limit
+    unit are dropped: by then every bucket of theirs has leaked empty, so
+    a fresh copy behaves exactly the same. Users given their own limits
+    are never dropped.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.idle_time = max([limit.capacity for limit in limits] or [0])
+        self.next_sweep = None
+        self._levels = {}
+
+    def level(self, username, now):
+        """Return the `UserLevel` of a user, evicting idle users first."""
+        if self.next_sweep is None or now >= self.next_sweep:
+            self.evict_idle(now)
+            self.next_sweep = now + self.idle_time
+
+        level = self._get_or_create(username)
+        level.last_seen = now
+        return level
+
+    def _get_or_create(self, username):
+        level = self._levels.get(username)
+        if level is None:
+            level = UserLevel([limit.copy() for limit in self.limits])
+            self._levels[username] = level
+        return level
+
+    def evict_idle(self, now):
+        cutoff = now - self.idle_time
+        idle = [username for username, level in self._levels.iteritems()
+                if not level.pinned and level.last_seen is not None and
+                level.last_seen < cutoff]
+        for username in idle:
+            del self._levels[username]
+
+    def __getitem__(self, username):
+        return self._get_or_create(username).limits
+
+    def __setitem__(self, username, limits):
+        self._levels[username] = UserLevel(limits, pinned=True)
+
+    def __contains__(self, username):
+        return username in self._levels
+
+    def __len__(self):
+        return len(self._levels)
+
+
 class Limiter(object):
     """
     Rate-limit checking class which handles limits in memory.
@@ -228,8 +320,8 @@ class Limiter(object):
 
         @param limits: List of `Limit` objects
         """
-        self.limits = copy.deepcopy(limits)
-        self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        self.limits = [limit.copy() for limit in limits]
+        self.levels = UserLevels(self.limits)
 
         # Pick up any per-user limit information
         for key, value in kwargs.items():
@@ -247,11 +339,15 @@ class Limiter(object):
         """
         Check the given verb/user/user triplet for limit.
 
+        Only the limits defined for the verb are looked at, so the cost of
+        a check does not grow with the limits configured for other verbs.
+
         @return: Tuple of delay (in seconds) and error message (or None, None)
         """
+        level = self.levels.level(username, self._get_time())
         delays = []
 
-        for limit in self.levels[username]:
+        for limit in level.by_verb.get(verb, ()):
             delay = limit(verb, url)
             if delay:
                 delays.append((delay, limit.error_message))
@@ -262,6 +358,10 @@ class Limiter(object):
 
         return None, None
 
+    def _get_time(self):
+        """Retrieve the current time. Broken out for testability."""
+        return time.time()
+
     # This was ported from nova.
     # Keeping it as a static method for the sake of consistency
     #
@@ -326,6 +426,187 @@ class Limiter(object):
         return result
 
 
+def leak(limit, state, now, count=1):
+    """
+    Apply the leaky bucket of a `Limit` to stored bucket state.
+
+    @param state: Tuple of water level and last request time, or None
+    @param count: Number of requests to admit at most
+    @return: Tuple of the number of admitted requests, the new state and
+             the delay before the next request would be admitted
+    """
+    water_level, last_request = state or (0.0, now)
+    water_level = max(water_level - (now - last_request), 0)
+
+    granted = 0
+    while (granted < count and
+           water_level + limit.request_value <= limit.capacity):
+        water_level += limit.request_value
+        granted += 1
+
+    delay = None
+    if not granted:
+        delay = water_level + limit.request_value - limit.capacity
+    return granted, (water_level, now), delay
+
+
+class MmapBucketBackend(object):
+    """
+    Keeps bucket state in a file mapped into every API worker on a host.
+
+    The file is a fixed table of slots, so its size does not depend on the
+    number of users. A bucket is stored in the slot its key hashes to
+    together with a digest of the key; a bucket whose slot was taken over
+    by another key starts out empty again. Each update holds a lock on the
+    slot only.
+    """
+
+    SLOT = struct.Struct('<8sdd')
+
+    def __init__(self, path=None, slots=None):
+        self.path = path or CONF.rate_limit_mmap_path
+        self.slots = slots or CONF.rate_limit_mmap_slots
+        size = self.slots * self.SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def take(self, key, limit, now, count=1):
+        digest = hashlib.md5(key).digest()
+        offset = (struct.unpack('<Q', digest[:8])[0] % self.slots *
+                  self.SLOT.size)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+        try:
+            stored, water_level, last_request = self.SLOT.unpack_from(
+                self._map, offset)
+            state = None
+            if stored == digest[:8]:
+                state = (water_level, last_request)
+            granted, state, delay = leak(limit, state, now, count)
+            self.SLOT.pack_into(self._map, offset, digest[:8], *state)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+        return granted, state, delay
+
+
+class MemcachedBucketBackend(object):
+    """
+    Keeps bucket state in memcached, shared by API workers on any host.
+
+    Updates use check-and-set and are retried when another worker changed
+    the bucket in between. Buckets expire once they would have leaked
+    empty.
+    """
+
+    RETRIES = 10
+
+    def __init__(self, client=None):
+        if client is None:
+            if memcache is None:
+                raise exception.TroveError(
+                    _("The memcached rate limit backend requires the "
+                      "python-memcached library."))
+            client = memcache.Client(CONF.rate_limit_memcached_servers,
+                                     cache_cas=True)
+        self.client = client
+
+    def take(self, key, limit, now, count=1):
+        for _attempt in xrange(self.RETRIES):
+            value = self.client.gets(key)
+            state = None
+            if value is not None:
+                state = tuple(float(part) for part in value.split(':'))
+            granted, state, delay = leak(limit, state, now, count)
+            expiry = int(math.ceil(limit.capacity))
+            if value is None:
+                stored = self.client.add(key, '%r:%r' % state, time=expiry)
+            else:
+                stored = self.client.cas(key, '%r:%r' % state, time=expiry)
+            if stored:
+                return granted, state, delay
+        raise exception.TroveError(
+            _("Could not update rate limit bucket %s.") % key)
+
+
+BUCKET_BACKENDS = {
+    'mmap': MmapBucketBackend,
+    'memcached': MemcachedBucketBackend,
+}
+
+
+def get_bucket_backend(name=None):
+    name = name or CONF.rate_limit_backend
+    if name not in BUCKET_BACKENDS:
+        raise exception.TroveError(
+            _("Unknown rate limit backend %s.") % name)
+    return BUCKET_BACKENDS[name]()
+
+
+class SharedLimiter(Limiter):
+    """
+    Rate-limit checking class which keeps the buckets in a backend shared
+    by all API workers, so a user gets the configured rate no matter how
+    many workers serve it.
+
+    To save backend round trips a worker takes up to rate_limit_batch_size
+    requests from a bucket at once and admits the rest locally. Requests
+    left unused for longer than one request interval are given up, so a
+    worker admits at most that many requests more than the limit allows.
+    """
+
+    def __init__(self, limits, backend=None, **kwargs):
+        super(SharedLimiter, self).__init__(limits, **kwargs)
+        self.backend = backend or get_bucket_backend()
+        self.batch_size = CONF.rate_limit_batch_size
+
+    def check_for_delay(self, verb, url, username=None):
+        now = self._get_time()
+        level = self.levels.level(username, now)
+        delays = []
+
+        for limit in level.by_verb.get(verb, ()):
+            if not limit.pattern.match(url):
+                continue
+            delay = self._take(level, username, limit, now)
+            if delay:
+                delays.append((delay, limit.error_message))
+
+        if delays:
+            delays.sort()
+            return delays[0]
+
+        return None, None
+
+    def _take(self, level, username, limit, now):
+        taken, expires_at = level.taken.get(limit, (0, None))
+        if taken and now < expires_at:
+            level.taken[limit] = (taken - 1, expires_at)
+            return None
+        level.taken.pop(limit, None)
+
+        key = self.bucket_key(username, limit)
+        granted, state, delay = self.backend.take(key, limit, now,
+                                                  self.batch_size)
+        if granted > 1:
+            level.taken[limit] = (granted - 1, now + limit.request_value)
+
+        # Mirror the shared bucket so get_limits reports it.
+        limit.water_level, limit.last_request = state
+        limit.next_request = now + (delay or 0)
+        limit.remaining = math.floor(
+            (limit.capacity - limit.water_level) / limit.capacity *
+            limit.value)
+        return delay
+
+    @staticmethod
+    def bucket_key(username, limit):
+        """Return a key naming the bucket of a user and limit."""
+        name = '%s|%s|%s|%s|%s' % (username, limit.verb, limit.regex,
+                                   limit.value, limit.unit)
+        return 'trove-ratelimit-%s' % hashlib.md5(name).hexdigest()
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
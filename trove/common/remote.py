@@ -13,9 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import hashlib
+
 from trove.common import cfg
 from trove.common import exception
+from trove.common import utils
 from trove.openstack.common.importutils import import_class
+from trove.openstack.common import jsonutils
+from trove.openstack.common import timeutils
 
 from cinderclient.v2 import client as CinderClient
 from heatclient.v1 import client as HeatClient
@@ -28,6 +34,10 @@ CONF = cfg.CONF
 PROXY_AUTH_URL = CONF.trove_auth_url
 USE_SNET = CONF.backup_use_snet
 
+ENDPOINT_CACHE = utils.ExpiringCache(max_size=CONF.remote_endpoint_cache_size)
+CLIENT_CACHE = utils.ExpiringCache(ttl=CONF.remote_client_cache_ttl,
+                                   max_size=CONF.remote_client_cache_size)
+
 
 def normalize_url(url):
     """Adds trailing slash if necessary."""
@@ -54,6 +64,19 @@ def get_endpoint(service_catalog, service_type=None, endpoint_region=None,
     if not service_catalog:
         raise exception.EmptyCatalog()
 
+    catalog_hash = hashlib.sha1(
+        jsonutils.dumps(service_catalog, sort_keys=True)).hexdigest()
+    key = (catalog_hash, service_type, endpoint_region, endpoint_type)
+    url = ENDPOINT_CACHE.get(key)
+    if url is None:
+        url = _find_endpoint(service_catalog, service_type, endpoint_region,
+                             endpoint_type)
+        ENDPOINT_CACHE.set(key, url)
+    return url
+
+
+def _find_endpoint(service_catalog, service_type, endpoint_region,
+                   endpoint_type):
     # per IRC chat, X-Service-Catalog will be a v2 catalog regardless of token
     # format; see https://bugs.launchpad.net/python-keystoneclient/+bug/1302970
     # 'token' key necessary to get past factory validation
@@ -101,12 +124,12 @@ def nova_client(context):
     return client
 
 
-def create_admin_nova_client(context):
+def admin_nova_client(context):
     """
     Creates client that uses trove admin credentials
     :return: a client for nova for the trove admin
     """
-    client = create_nova_client(context)
+    client = _nova_client_factory(context)
     client.client.auth_token = None
     return client
 
@@ -162,9 +185,45 @@ def swift_client(context):
     return client
 
 
+def cached_client(name, factory):
+    """
+    Wrap a client factory so that clients are reused across calls made with
+    the same credentials, together with their HTTP sessions. A client is
+    dropped from the cache before the token it was created with expires.
+    """
+    @functools.wraps(factory)
+    def _create(context):
+        if not CLIENT_CACHE.enabled:
+            return factory(context)
+        key = (name, context.tenant, context.user, context.auth_token)
+        client = CLIENT_CACHE.get(key)
+        if client is None:
+            client = factory(context)
+            CLIENT_CACHE.set(key, client, ttl=_client_ttl(context))
+        return client
+    return _create
+
+
+def _client_ttl(context):
+    expires = getattr(context, 'auth_token_expires', None)
+    if not expires:
+        return CLIENT_CACHE.ttl
+    expires_in = timeutils.delta_seconds(timeutils.utcnow(),
+                                         timeutils.normalize_time(
+                                             timeutils.parse_isotime(expires)))
+    remaining = int(expires_in) - CONF.remote_client_expiry_margin
+    return max(min(CLIENT_CACHE.ttl or remaining, remaining), 0)
+
+
+_nova_client_factory = import_class(CONF.remote_nova_client)
+
+# Swift connections hold a single HTTP connection, so they are not shared.
 create_dns_client = import_class(CONF.remote_dns_client)
 create_guest_client = import_class(CONF.remote_guest_client)
-create_nova_client = import_class(CONF.remote_nova_client)
+create_nova_client = cached_client('nova', _nova_client_factory)
+create_admin_nova_client = cached_client('admin_nova', admin_nova_client)
 create_swift_client = import_class(CONF.remote_swift_client)
-create_cinder_client = import_class(CONF.remote_cinder_client)
-create_heat_client = import_class(CONF.remote_heat_client)
+create_cinder_client = cached_client(
+    'cinder', import_class(CONF.remote_cinder_client))
+create_heat_client = cached_client(
+    'heat', import_class(CONF.remote_heat_client))
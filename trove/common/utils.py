@@ -25,6 +25,7 @@ import os
 import shutil
 
 from eventlet import event
+from eventlet import greenpool
 from eventlet import greenthread
 from eventlet.timeout import Timeout
 from passlib import utils as passlib_utils
@@ -135,6 +136,71 @@ class cached_property(object):
         return value
 
 
+class ExpiringCache(object):
+    """A bounded in-memory cache whose entries expire after a ttl.
+
+    Entries are stored with the time they expire at. Once the cache holds
+    more than max_size entries the least recently used ones are evicted,
+    down to nine tenths of max_size so that eviction is not repeated on
+    every insert. A ttl of None means entries never expire and a ttl of
+    zero or less disables the cache altogether.
+    """
+
+    def __init__(self, ttl=None, max_size=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = {}
+        self._counter = 0
+
+    @property
+    def enabled(self):
+        return self.ttl is None or self.ttl > 0
+
+    def _touch(self):
+        self._counter += 1
+        return self._counter
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at, _used = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            return default
+        self._data[key] = (value, expires_at, self._touch())
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at, self._touch())
+        if self.max_size and len(self._data) > self.max_size:
+            self._evict(int(self.max_size * 0.9))
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def _evict(self, size):
+        by_use = sorted(self._data.items(), key=lambda item: item[1][2])
+        for key, _entry in by_use[:len(by_use) - size]:
+            del self._data[key]
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self._data)
+
+
 class MethodInspector(object):
 
     def __init__(self, func):
@@ -291,6 +357,43 @@ def execute_with_timeout(*args, **kwargs):
         timeout.cancel()
 
 
+def fan_out(func, items, concurrency=None, timeout=None):
+    """Calls func once for each item in a bounded pool of green threads.
+
+    At most concurrency calls run at the same time and a call that does not
+    return within timeout seconds is abandoned; both default to their
+    fan_out_* options. Returns a tuple of two dicts keyed by item: the
+    results of the calls that succeeded and the exceptions raised by those
+    that failed or timed out.
+    """
+    concurrency = concurrency or CONF.fan_out_concurrency
+    if timeout is None:
+        timeout = CONF.fan_out_timeout or None
+    results = {}
+    failures = {}
+
+    def call(item):
+        timer = Timeout(timeout)
+        try:
+            results[item] = func(item)
+        except Timeout as t:
+            if t is not timer:
+                raise
+            failures[item] = exception.PollTimeOut(
+                _("Call for %(item)s timed out after %(timeout)s seconds.")
+                % {'item': item, 'timeout': timeout})
+        except Exception as e:
+            failures[item] = e
+        finally:
+            timer.cancel()
+
+    pool = greenpool.GreenPool(concurrency)
+    for item in items:
+        pool.spawn_n(call, item)
+    pool.waitall()
+    return results, failures
+
+
 def correct_id_with_req(id, request):
     # Due to a shortcoming with the way Trove uses routes.mapper,
     # URL entities right of the last slash that contain at least
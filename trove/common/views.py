@@ -14,8 +14,11 @@
 #    under the License.
 
 
+from trove.common import cfg
 from trove.common import wsgi
 
+CONF = cfg.CONF
+
 
 def create_links(resource_path, request, id):
     """Creates the links dictionary in the format typical of most resources."""
@@ -38,3 +41,10 @@ def create_links(resource_path, request, id):
             "rel": "bookmark"
         }
     ]
+
+
+def collection(items):
+    """Returns the items of a list view, lazily if responses are streamed."""
+    if CONF.stream_list_responses:
+        return wsgi.StreamedList(items)
+    return list(items)
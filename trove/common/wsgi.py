@@ -229,6 +229,21 @@ class Result(object):
         return self._data
 
 
+class StreamedList(object):
+    """A list in a response body that is serialized as it is iterated.
+
+    Views wrap the items of large listings in a StreamedList so that the
+    response is written out item by item instead of being built in memory
+    first.
+    """
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+
 class Resource(openstack_wsgi.Resource):
     def __init__(self, controller, deserializer, serializer,
                  exception_map=None):
@@ -357,16 +372,37 @@ class Controller(object):
 
     schemas = {}
 
+    # Validators built so far, by id of their schema. The schema is kept
+    # alongside so that its id cannot be reused while the entry exists.
+    _validators = {}
+
     @classmethod
     def get_schema(cls, action, body):
-        LOG.debug("Getting schema for %s:%s" %
-                  (cls.__class__.__name__, action))
         if cls.schemas:
-            matching_schema = cls.schemas.get(action, {})
-            if matching_schema:
-                LOG.debug("Found Schema: %s" % matching_schema.get("name",
-                                                                   "none"))
-            return matching_schema
+            return cls.schemas.get(action, {})
+
+    @classmethod
+    def get_validator(cls, schema):
+        entry = Controller._validators.get(id(schema))
+        if entry is None or entry[0] is not schema:
+            LOG.debug("Building validator for schema %s.",
+                      schema.get("name", "none"))
+            entry = (schema, jsonschema.Draft4Validator(schema))
+            Controller._validators[id(schema)] = entry
+        return entry[1]
+
+    @classmethod
+    def load_validators(cls):
+        """Build the validators of every schema of this controller."""
+        pending = [cls.schemas]
+        while pending:
+            schema = pending.pop()
+            if not isinstance(schema, dict):
+                continue
+            if "type" in schema:
+                cls.get_validator(schema)
+            else:
+                pending.extend(schema.values())
 
     @staticmethod
     def format_validation_msg(errors):
@@ -386,15 +422,15 @@ class Controller(object):
         body = action_args.get('body', {})
         schema = self.get_schema(action, body)
         if schema:
-            validator = jsonschema.Draft4Validator(schema)
-            if not validator.is_valid(body):
-                errors = sorted(validator.iter_errors(body),
-                                key=lambda e: e.path)
+            errors = sorted(self.get_validator(schema).iter_errors(body),
+                            key=lambda e: e.path)
+            if errors:
                 error_msg = self.format_validation_msg(errors)
                 LOG.info(error_msg)
                 raise exception.BadRequest(message=error_msg)
 
     def create_resource(self):
+        self.load_validators()
         return Resource(
             self,
             RequestDeserializer(),
@@ -407,6 +443,9 @@ class Controller(object):
 
 
 class TroveResponseSerializer(openstack_wsgi.ResponseSerializer):
+
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     def serialize_body(self, response, data, content_type, action):
         """Overrides body serialization in openstack_wsgi.ResponseSerializer.
 
@@ -414,15 +453,60 @@ class TroveResponseSerializer(openstack_wsgi.ResponseSerializer):
         method is called and *that* is passed to the superclass implementation
         instead of the actual data.
 
+        If the data holds a StreamedList and JSON was asked for, the body is
+        serialized lazily through the app_iter of the response.
+
         """
         if isinstance(data, Result):
             data = data.data(content_type)
+        if isinstance(data, dict) and any(isinstance(value, StreamedList)
+                                          for value in data.values()):
+            if content_type == 'application/json':
+                response.headers['Content-Type'] = content_type
+                serializer = self.get_body_serializer(content_type)
+                response.app_iter = self._iter_body(serializer, data, action)
+                return
+            data = dict((key, list(value))
+                        if isinstance(value, StreamedList) else (key, value)
+                        for key, value in data.items())
         super(TroveResponseSerializer, self).serialize_body(
             response,
             data,
             content_type,
             action)
 
+    def _iter_body(self, serializer, data, action):
+        """Join the pieces of a streamed JSON body into larger chunks."""
+        chunk = []
+        size = 0
+        for piece in self._iter_json(serializer, data, action):
+            chunk.append(piece)
+            size += len(piece)
+            if size >= self.STREAM_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
+    @staticmethod
+    def _iter_json(serializer, data, action):
+        yield '{'
+        for index, (key, value) in enumerate(data.items()):
+            if index:
+                yield ', '
+            yield '%s: ' % jsonutils.dumps(key)
+            if isinstance(value, StreamedList):
+                yield '['
+                for count, item in enumerate(value):
+                    if count:
+                        yield ', '
+                    yield serializer.serialize(item, action)
+                yield ']'
+            else:
+                yield serializer.serialize(value, action)
+        yield '}'
+
     def serialize_headers(self, response, data, action):
         super(TroveResponseSerializer, self).serialize_headers(
             response,
@@ -509,6 +593,14 @@ class ContextMiddleware(openstack_wsgi.Middleware):
         return dict([(key, params[key]) for key in params.keys()
                      if key in ["limit", "marker"]])
 
+    @staticmethod
+    def _extract_token_expiry(request):
+        # Set by the keystone auth_token middleware, v2 or v3 token format.
+        token_info = request.environ.get('keystone.token_info') or {}
+        if 'access' in token_info:
+            return token_info['access'].get('token', {}).get('expires')
+        return token_info.get('token', {}).get('expires_at')
+
     def process_request(self, request):
         service_catalog = None
         catalog_header = request.headers.get('X-Service-Catalog', None)
@@ -528,13 +620,15 @@ class ContextMiddleware(openstack_wsgi.Middleware):
                 is_admin = True
                 break
         limits = self._extract_limits(request.params)
+        expires = self._extract_token_expiry(request)
         context = rd_context.TroveContext(auth_token=auth_token,
                                           tenant=tenant_id,
                                           user=user_id,
                                           is_admin=is_admin,
                                           limit=limits.get('limit'),
                                           marker=limits.get('marker'),
-                                          service_catalog=service_catalog)
+                                          service_catalog=service_catalog,
+                                          auth_token_expires=expires)
         request.environ[CONTEXT_KEY] = context
 
     @classmethod
@@ -15,6 +15,7 @@
 from trove.backup import models as bkup_models
 from trove.common import cfg
 from trove.common import exception
+from trove.common import utils
 from trove.common.instance import ServiceStatus
 from trove.conductor.models import LastSeen
 from trove.instance import models as t_models
@@ -27,10 +28,166 @@ RPC_API_VERSION = "1.0"
 CONF = cfg.CONF
 
 
+class LastSeenCache(object):
+    """Keeps the last sent time of conductor messages in memory.
+
+    The cache holds (instance_id, method_name) -> sent for the most recently
+    used instances. New sent times are written behind to the last seen table
+    by flush(), which never replaces a later time written by another
+    conductor; entries missing from memory, for instance after a restart,
+    are read back from the table on first use.
+    """
+
+    def __init__(self, max_size):
+        self.seen = utils.ExpiringCache(max_size=max_size)
+        self.dirty = {}
+
+    def get(self, instance_id, method_name):
+        return self.get_many([instance_id], method_name).get(instance_id)
+
+    def get_many(self, instance_ids, method_name):
+        found = {}
+        missing = []
+        for instance_id in instance_ids:
+            key = (instance_id, method_name)
+            sent = self.dirty.get(key)
+            if sent is None:
+                sent = self.seen.get(key)
+            if sent is None:
+                missing.append(instance_id)
+            else:
+                found[instance_id] = sent
+        for instance_id, seen in LastSeen.load_all(missing,
+                                                   method_name).items():
+            sent = float(seen.sent)
+            self.seen.set((instance_id, method_name), sent)
+            found[instance_id] = sent
+        return found
+
+    def update(self, instance_id, method_name, sent):
+        key = (instance_id, method_name)
+        self.seen.set(key, sent)
+        self.dirty[key] = sent
+
+    def flush(self):
+        dirty, self.dirty = self.dirty, {}
+        if not dirty:
+            return
+        for key, sent in dirty.items():
+            instance_id, method_name = key
+            try:
+                if not LastSeen.save_newer(instance_id, method_name, sent):
+                    # Another conductor has seen a later message; read the
+                    # table again on next use rather than trusting memory.
+                    self.seen.pop(key)
+            except Exception:
+                LOG.exception(_("Failed to write last seen record for "
+                                "%(instance)s %(method)s.")
+                              % {'instance': instance_id,
+                                 'method': method_name})
+                self.dirty.setdefault(key, sent)
+
+
+class HeartbeatBuffer(object):
+    """Coalesces guest heartbeats and writes them to the database in bulk.
+
+    Heartbeats are held in memory for heartbeat_batch_interval seconds. Only
+    the most recently sent heartbeat of each instance survives the window;
+    the survivors are checked against the last seen table in one query and
+    written with one UPDATE per distinct service status.
+
+    coalesced counts the heartbeats merged into one pending per instance,
+    and discarded those dropped because a later one was seen, whether in
+    the same window or already in the last seen table.
+    """
+
+    def __init__(self, interval, last_seen=None):
+        self.interval = interval
+        self.last_seen = last_seen
+        self.pending = {}
+        self.received = 0
+        self.coalesced = 0
+        self.discarded = 0
+        self.written = 0
+        self._flusher = None
+
+    def add(self, instance_id, status, sent):
+        self.received += 1
+        current = self.pending.get(instance_id)
+        if current is not None:
+            self.coalesced += 1
+            current_sent = current[0]
+            if sent is not None and current_sent is not None:
+                # Whichever of the two was sent first is superseded
+                self.discarded += 1
+                if sent < current_sent:
+                    return
+        self.pending[instance_id] = (sent, status)
+        self._start_flusher()
+
+    def _start_flusher(self):
+        # Started lazily so the green thread belongs to the worker process
+        # that received the heartbeat rather than the parent launcher.
+        if self._flusher is None:
+            self._flusher = utils.LoopingCall(f=self.flush)
+            self._flusher.start(self.interval, now=False)
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        try:
+            self._write(pending)
+        except Exception:
+            LOG.exception(_("Failed to write %d buffered heartbeats.")
+                          % len(pending))
+        LOG.debug("Heartbeats received: %(received)d, coalesced: "
+                  "%(coalesced)d, discarded: %(discarded)d, written: "
+                  "%(written)d." % {'received': self.received,
+                                    'coalesced': self.coalesced,
+                                    'discarded': self.discarded,
+                                    'written': self.written})
+
+    def _write(self, pending):
+        if self.last_seen is not None:
+            last_sent = self.last_seen.get_many(pending.keys(), 'heartbeat')
+        else:
+            last_sent = dict(
+                (instance_id, float(seen.sent)) for instance_id, seen
+                in LastSeen.load_all(pending.keys(), 'heartbeat').items())
+        changed = []
+        by_status = {}
+        for instance_id, (sent, status) in pending.items():
+            if sent is not None:
+                previous = last_sent.get(instance_id)
+                if previous is not None and previous >= sent:
+                    LOG.info(_("[Instance %s] Rec'd message is older than "
+                               "last seen. Discarding.") % instance_id)
+                    self.discarded += 1
+                    continue
+                changed.append((instance_id, sent))
+            by_status.setdefault(status, []).append(instance_id)
+        if self.last_seen is not None:
+            for instance_id, sent in changed:
+                self.last_seen.update(instance_id, 'heartbeat', sent)
+        elif changed:
+            LastSeen.save_all_newer('heartbeat', dict(changed), last_sent)
+        for status, instance_ids in by_status.items():
+            self.written += t_models.update_service_statuses(instance_ids,
+                                                             status)
+
+
 class Manager(periodic_task.PeriodicTasks):
 
     def __init__(self):
         super(Manager, self).__init__()
+        self.last_seen = None
+        if CONF.conductor_lastseen_cache_size > 0:
+            self.last_seen = LastSeenCache(CONF.conductor_lastseen_cache_size)
+        self.heartbeats = None
+        if CONF.heartbeat_batch_interval > 0:
+            self.heartbeats = HeartbeatBuffer(CONF.heartbeat_batch_interval,
+                                              last_seen=self.last_seen)
 
     def _message_too_old(self, instance_id, method_name, sent):
         fields = {
@@ -46,6 +203,15 @@ class Manager(periodic_task.PeriodicTasks):
                         "compare.") % instance_id)
             return False
 
+        if self.last_seen is not None:
+            last_sent = self.last_seen.get(instance_id, method_name)
+            if last_sent is not None and last_sent >= sent:
+                LOG.info(_("[Instance %s] Rec'd message is older than last "
+                           "seen. Discarding.") % instance_id)
+                return True
+            self.last_seen.update(instance_id, method_name, sent)
+            return False
+
         seen = None
         try:
             seen = LastSeen.load(instance_id=instance_id,
@@ -76,9 +242,22 @@ class Manager(periodic_task.PeriodicTasks):
                        "Discarding.") % instance_id)
             return True
 
+    @periodic_task.periodic_task
+    def flush_last_seen(self, context):
+        """Writes the last seen times held in memory back to the table."""
+        if self.last_seen is not None:
+            self.last_seen.flush()
+
     def heartbeat(self, context, instance_id, payload, sent=None):
         LOG.debug("Instance ID: %s" % str(instance_id))
         LOG.debug("Payload: %s" % str(payload))
+        if self.heartbeats is not None:
+            status = None
+            if payload.get('service_status') is not None:
+                status = ServiceStatus.from_description(
+                    payload['service_status'])
+            self.heartbeats.add(instance_id, status, sent)
+            return
         status = t_models.InstanceServiceStatus.find_by(
             instance_id=instance_id)
         if self._message_too_old(instance_id, 'heartbeat', sent):
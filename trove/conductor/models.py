@@ -12,6 +12,11 @@
 #See the License for the specific language governing permissions and
 #limitations under the License.
 
+import sqlalchemy
+import sqlalchemy.exc
+from sqlalchemy import orm
+
+from trove.common import exception
 from trove.db import get_db_api
 from trove.openstack.common import log as logging
 
@@ -46,6 +51,71 @@ class LastSeen(object):
                                     method_name=method_name)
         return seen
 
+    @classmethod
+    def load_all(cls, instance_ids, method_name):
+        """Loads the last seen records of many instances in one query."""
+        if not instance_ids:
+            return {}
+        query = get_db_api()._base_query(cls)
+        query = query.filter(cls.instance_id.in_(instance_ids),
+                             cls.method_name == method_name)
+        return dict((seen.instance_id, seen) for seen in query.all())
+
+    @classmethod
+    def save_newer(cls, instance_id, method_name, sent):
+        """Records sent unless the table already holds a later time.
+
+        The comparison is made by the UPDATE itself, so conductors sharing
+        the table never move a last seen time backwards. Returns False if a
+        later (or equal) time was already recorded.
+        """
+        query = get_db_api()._query_by(cls, instance_id=instance_id,
+                                       method_name=method_name)
+        if query.filter(cls.sent < sent).update(
+                {'sent': sent}, synchronize_session=False):
+            return True
+        if query.first() is not None:
+            return False
+        try:
+            cls.create(instance_id, method_name, sent)
+        except exception.DBConstraintError:
+            # Another conductor inserted the row first; compare against it.
+            return cls.save_newer(instance_id, method_name, sent)
+        return True
+
+    @classmethod
+    def save_all_newer(cls, method_name, sent_times, existing):
+        """Records many sent times with one UPDATE and one INSERT.
+
+        :param sent_times: dict of instance id to sent time
+        :param existing: ids of the instances which already have a row
+        Stored times which are later than the new ones are left alone.
+        """
+        updates = dict((instance_id, sent) for instance_id, sent
+                       in sent_times.items() if instance_id in existing)
+        inserts = [{'instance_id': instance_id,
+                    'method_name': method_name,
+                    'sent': sent}
+                   for instance_id, sent in sent_times.items()
+                   if instance_id not in existing]
+        if updates:
+            sent = sqlalchemy.case(updates.items(), value=cls.instance_id)
+            query = get_db_api()._base_query(cls)
+            query = query.filter(cls.method_name == method_name,
+                                 cls.instance_id.in_(updates.keys()),
+                                 cls.sent < sent)
+            query.update({'sent': sent}, synchronize_session=False)
+        if inserts:
+            db_session = get_db_api()._base_query(cls).session
+            try:
+                db_session.execute(orm.class_mapper(cls).mapped_table.insert(),
+                                   inserts)
+            except sqlalchemy.exc.IntegrityError:
+                # Another conductor created some of the rows first.
+                for row in inserts:
+                    cls.save_newer(row['instance_id'], method_name,
+                                   row['sent'])
+
     @classmethod
     def create(cls, instance_id, method_name, sent):
         seen = LastSeen(instance_id, method_name, sent)
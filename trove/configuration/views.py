@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from trove.common.views import collection
 from trove.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
@@ -42,10 +43,8 @@ class ConfigurationsView(object):
         self.configurations = configurations
 
     def data(self):
-        data = []
-
-        for configuration in self.configurations:
-            data.append(self.data_for_configuration(configuration))
+        data = collection(self.data_for_configuration(configuration)
+                          for configuration in self.configurations)
 
         return {"configurations": data}
 
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+
 import sqlalchemy.exc
 
 from trove.common import exception
@@ -61,6 +63,18 @@ def save(model):
                                           error=str(error.orig))
 
 
+@contextlib.contextmanager
+def transaction():
+    """Yield a session whose statements run in a single transaction.
+
+    The transaction commits when the block exits and rolls back if it
+    raises.
+    """
+    db_session = session.get_session()
+    with db_session.begin():
+        yield db_session
+
+
 def delete(model):
     db_session = session.get_session()
     model = db_session.merge(model)
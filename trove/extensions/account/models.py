@@ -13,8 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from sqlalchemy import and_
+from sqlalchemy import desc
+from sqlalchemy import func
+from sqlalchemy import or_
+
 from trove.openstack.common import log as logging
+from trove.openstack.common.gettextutils import _
 
+from trove.common import exception
 from trove.common.remote import create_nova_client
 from trove.instance.models import DBInstance
 from trove.extensions.mgmt.instances.models import MgmtInstances
@@ -57,20 +64,54 @@ class Account(object):
 
 class AccountsSummary(object):
 
-    def __init__(self, accounts):
+    SORT_KEYS = ('id', 'num_instances')
+
+    def __init__(self, accounts, next_marker=None):
         self.accounts = accounts
+        self.next_marker = next_marker
 
     @classmethod
-    def load(cls):
-        # TODO(pdmars): This should probably be changed to a more generic
-        # database filter query if one is added, however, this should suffice
-        # for now.
-        db_infos = DBInstance.find_all(deleted=False)
-        tenant_ids_for_instances = [db_info.tenant_id for db_info in db_infos]
-        tenant_ids = set(tenant_ids_for_instances)
-        LOG.debug("All tenants with instances: %s" % tenant_ids)
-        accounts = []
-        for tenant_id in tenant_ids:
-            num_instances = tenant_ids_for_instances.count(tenant_id)
-            accounts.append({'id': tenant_id, 'num_instances': num_instances})
-        return cls(accounts)
+    def load(cls, limit=None, marker=None, sort_by=None):
+        """
+        Counts the non-deleted instances of every tenant that has any with
+        a single GROUP BY query.
+        :param limit: the most accounts to return, or None for all of them
+        :param marker: the id of the last account on the previous page
+        :param sort_by: 'id' to order accounts by id (the default) or
+        'num_instances' to list the accounts with the most instances first
+        """
+        sort_by = sort_by or 'id'
+        if sort_by not in cls.SORT_KEYS:
+            raise exception.BadRequest(
+                _("Accounts can only be sorted by %s.") %
+                ', '.join(cls.SORT_KEYS))
+        limit = int(limit) if limit else None
+        tenant_id = DBInstance.tenant_id
+        num_instances = func.count(DBInstance.id)
+        query = DBInstance.query().filter_by(deleted=False)
+        query = query.with_entities(tenant_id, num_instances)
+        query = query.group_by(tenant_id)
+        if sort_by == 'num_instances':
+            if marker is not None:
+                marker_count = DBInstance.query().filter_by(
+                    tenant_id=marker, deleted=False).count()
+                query = query.having(or_(
+                    num_instances < marker_count,
+                    and_(num_instances == marker_count, tenant_id > marker)))
+            query = query.order_by(desc(num_instances), tenant_id)
+        else:
+            if marker is not None:
+                query = query.filter(tenant_id > marker)
+            query = query.order_by(tenant_id)
+        if limit:
+            # Fetch one extra row to know whether there is a next page.
+            query = query.limit(limit + 1)
+        rows = query.all()
+        next_marker = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_marker = rows[-1][0]
+        LOG.debug("Found %d tenants with instances." % len(rows))
+        accounts = [{'id': tenant, 'num_instances': count}
+                    for tenant, count in rows]
+        return cls(accounts, next_marker)
@@ -15,6 +15,7 @@
 
 from trove.openstack.common import log as logging
 
+from trove.common import pagination
 from trove.common import wsgi
 from trove.common.auth import admin_context
 from trove.extensions.account import models
@@ -45,5 +46,11 @@ class AccountController(wsgi.Controller):
         """Return a list of all accounts with non-deleted instances."""
         LOG.info(_("req : '%s'\n\n") % req)
         LOG.info(_("Showing all accounts with instances for '%s'") % tenant_id)
-        accounts_summary = models.AccountsSummary.load()
-        return wsgi.Result(views.AccountsView(accounts_summary).data(), 200)
+        context = req.environ[wsgi.CONTEXT_KEY]
+        accounts_summary = models.AccountsSummary.load(
+            limit=context.limit, marker=context.marker,
+            sort_by=req.GET.get('sort_by'))
+        view = views.AccountsView(accounts_summary)
+        paged = pagination.SimplePaginatedDataView(
+            req.url, 'accounts', view, accounts_summary.next_marker)
+        return wsgi.Result(paged.data(), 200)
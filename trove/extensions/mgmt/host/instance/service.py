@@ -34,7 +34,8 @@ class HostInstanceController(wsgi.Controller):
             raise exception.BadRequest(_("Invalid request body."))
         context = req.environ[wsgi.CONTEXT_KEY]
         host = models.DetailedHost.load(context, host_id)
-        _actions = {'update': self._action_update}
+        _actions = {'update': self._action_update,
+                    'upgrade': self._action_upgrade}
         selected_action = None
         for key in body:
             if key in _actions:
@@ -55,3 +56,15 @@ class HostInstanceController(wsgi.Controller):
         LOG.debug("Updating all instances for host: %s" % host.name)
         host.update_all(context)
         return wsgi.Result(None, 202)
+
+    def _action_upgrade(self, context, host, body):
+        LOG.debug("Upgrading all instances for host: %s" % host.name)
+        upgrade = body['upgrade'] or {}
+        try:
+            host.upgrade_all(context,
+                             upgrade.get('instance_version'),
+                             upgrade.get('location'),
+                             upgrade.get('metadata'))
+        except ValueError:
+            raise exception.BadRequest(_("Invalid upgrade request."))
+        return wsgi.Result(None, 202)
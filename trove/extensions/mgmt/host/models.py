@@ -20,8 +20,9 @@ Model classes that extend the instances functionality for MySQL instances.
 from trove.openstack.common import log as logging
 
 from trove.common import exception
-from trove.instance.models import DBInstance
-from trove.instance.models import InstanceServiceStatus
+from trove.common import utils
+from trove.extensions.mgmt.upgrade.models import UpgradeMessageSender
+from trove.instance.models import load_instances_by_compute_ids
 from trove.instance.models import SimpleInstance
 from trove.common.remote import create_guest_client
 from trove.common.remote import create_nova_client
@@ -60,36 +61,52 @@ class DetailedHost(object):
         for instance in self.instances:
             instance['server_id'] = instance['uuid']
             del instance['uuid']
-            try:
-                db_info = DBInstance.find_by(
-                    compute_instance_id=instance['server_id'])
+        found = load_instances_by_compute_ids(
+            [instance['server_id'] for instance in self.instances])
+        for instance in self.instances:
+            db_info, status = found.get(instance['server_id'], (None, None))
+            if db_info is not None:
                 instance['id'] = db_info.id
                 instance['tenant_id'] = db_info.tenant_id
-                status = InstanceServiceStatus.find_by(
-                    instance_id=db_info.id)
-                instance_info = SimpleInstance(None, db_info, status)
-                instance['status'] = instance_info.status
-            except exception.TroveError as re:
-                LOG.error(re)
+            if status is None:
                 LOG.error("Compute Instance ID found with no associated RD "
                           "instance: %s" % instance['server_id'])
                 instance['id'] = None
+                continue
+            instance_info = SimpleInstance(None, db_info, status)
+            instance['status'] = instance_info.status
+
+    @property
+    def instance_ids(self):
+        """The ids of the trove instances found on this host."""
+        return [instance['id'] for instance in self.instances
+                if instance['id'] is not None]
 
     def update_all(self, context):
         num_i = len(self.instances)
         LOG.debug("Host %s has %s instances to update" % (self.name, num_i))
-        failed_instances = []
-        for instance in self.instances:
-            client = create_guest_client(context, instance['id'])
-            try:
-                client.update_guest()
-            except exception.TroveError as re:
-                LOG.error(re)
-                LOG.error("Unable to update instance: %s" % instance['id'])
-                failed_instances.append(instance['id'])
-        if len(failed_instances) > 0:
-            msg = "Failed to update instances: %s" % failed_instances
-            raise exception.UpdateGuestError(msg)
+
+        def update_guest(instance_id):
+            create_guest_client(context, instance_id).update_guest()
+
+        _results, failures = utils.fan_out(update_guest, self.instance_ids)
+        self._raise_for_failures(failures, "Failed to update instances: %s")
+
+    def upgrade_all(self, context, instance_version, location,
+                    metadata=None):
+        num_i = len(self.instances)
+        LOG.debug("Host %s has %s instances to upgrade" % (self.name, num_i))
+        send = UpgradeMessageSender.create_all(
+            context, self.instance_ids, instance_version, location, metadata)
+        self._raise_for_failures(send(), "Failed to upgrade instances: %s")
+
+    @staticmethod
+    def _raise_for_failures(failures, msg):
+        for instance_id, failure in failures.items():
+            LOG.error(failure)
+            LOG.error("Guest call failed for instance: %s" % instance_id)
+        if failures:
+            raise exception.UpdateGuestError(msg % sorted(failures))
 
     @staticmethod
     def load(context, name):
@@ -13,10 +13,13 @@
 #    under the License.
 import datetime
 
+from eventlet import greenthread
+
 from trove.common import cfg
 from trove.common import remote
 from trove.common import utils
 from trove.openstack.common import log as logging
+from trove.openstack.common.gettextutils import _
 from trove.openstack.common.notifier import api as notifier
 from trove.instance import models as imodels
 from trove.instance.models import load_instance, InstanceServiceStatus
@@ -45,6 +48,67 @@ def load_mgmt_instances(context, deleted=None, client=None):
     return instances
 
 
+def _instances_with_status_query():
+    """Returns a query yielding (DBInstance, InstanceServiceStatus) pairs
+    for the non-deleted instances, so statuses need no lookup of their own.
+    """
+    DBInstance = instance_models.DBInstance
+    query = DBInstance.query().filter_by(deleted=False)
+    query = query.add_entity(InstanceServiceStatus)
+    return query.join(InstanceServiceStatus,
+                      InstanceServiceStatus.instance_id == DBInstance.id)
+
+
+def iter_instances_with_status(batch_size=None):
+    """Yields every non-deleted instance along with its service status.
+
+    Instances are read a page of batch_size rows at a time, keyed on the
+    instance id, so only one page is ever held in memory.
+    """
+    batch_size = batch_size or CONF.exists_notification_batch_size
+    DBInstance = instance_models.DBInstance
+    marker = None
+    while True:
+        query = _instances_with_status_query()
+        if marker is not None:
+            query = query.filter(DBInstance.id > marker)
+        page = query.order_by(DBInstance.id).limit(batch_size).all()
+        for db_info, service_status in page:
+            yield db_info, service_status
+        if len(page) < batch_size:
+            return
+        marker = page[-1][0].id
+
+
+def iter_mgmt_instances(context, client, batch_size=None):
+    """Yields a SimpleMgmtInstance for every non-deleted instance that
+    has a server in Nova.
+
+    Nova's server list is paged through with a marker and the instances
+    for each page are loaded with a single query on their compute ids,
+    rather than holding every server across all tenants at once.
+    """
+    batch_size = batch_size or CONF.exists_notification_batch_size
+    DBInstance = instance_models.DBInstance
+    marker = None
+    while True:
+        search_opts = {'all_tenants': 1, 'limit': batch_size}
+        if marker is not None:
+            search_opts['marker'] = marker
+        servers = client.servers.list(search_opts=search_opts)
+        if not servers:
+            return
+        by_id = dict((server.id, server) for server in servers)
+        query = _instances_with_status_query().filter(
+            DBInstance.compute_instance_id.in_(by_id.keys()))
+        for db_info, service_status in query.all():
+            server = by_id[db_info.compute_instance_id]
+            yield SimpleMgmtInstance(context, db_info, server, service_status)
+        # Nova caps the page size at its own osapi_max_limit, so keep going
+        # until an empty page rather than stopping on a short one.
+        marker = servers[-1].id
+
+
 def load_mgmt_instance(cls, context, id):
     try:
         instance = load_instance(cls, context, id, needs_server=True)
@@ -155,16 +219,40 @@ def _load_servers(instances, find_server):
     return instances
 
 
+def _exists_batch_pause(batch_size):
+    """Returns how long to pause between batches of exists events so that
+    publishing is spread over exists_notification_spread of the window
+    between two runs.
+    """
+    if CONF.exists_notification_spread <= 0:
+        return 0
+    window = (CONF.exists_notification_ticks * CONF.report_interval *
+              min(CONF.exists_notification_spread, 1.0))
+    count = instance_models.DBInstance.query().filter_by(
+        deleted=False).count()
+    batches = (count + batch_size - 1) // batch_size
+    if batches <= 1:
+        return 0
+    return float(window) / batches
+
+
 def publish_exist_events(transformer, admin_context):
+    batch_size = CONF.exists_notification_batch_size
+    pause = _exists_batch_pause(batch_size)
     notifications = transformer()
     # clear out admin_context.auth_token so it does not get logged
     admin_context.auth_token = None
+    published = 0
     for notification in notifications:
         notifier.notify(admin_context,
                         CONF.host,
                         "trove.instance.exists",
                         'INFO',
                         notification)
+        published += 1
+        if pause and published % batch_size == 0:
+            greenthread.sleep(pause)
+    LOG.info(_("Published %d exists events.") % published)
 
 
 class NotificationTransformer(object):
@@ -211,16 +299,11 @@ class NotificationTransformer(object):
         return payload
 
     def __call__(self):
+        """Yields the exists payloads one instance at a time."""
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        messages = []
-        db_infos = instance_models.DBInstance.find_all(deleted=False)
-        for db_info in db_infos:
-            service_status = InstanceServiceStatus.find_by(
-                instance_id=db_info.id)
+        for db_info, service_status in iter_instances_with_status():
             instance = SimpleMgmtInstance(None, db_info, None, service_status)
-            message = self.transform_instance(instance, audit_start, audit_end)
-            messages.append(message)
-        return messages
+            yield self.transform_instance(instance, audit_start, audit_end)
 
 
 class NovaNotificationTransformer(NotificationTransformer):
@@ -241,13 +324,12 @@ class NovaNotificationTransformer(NotificationTransformer):
         return self._flavor_cache[flavor_id]
 
     def __call__(self):
+        """Yields the exists payloads one instance at a time."""
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        instances = load_mgmt_instances(self.context, deleted=False,
-                                        client=self.nova_client)
-        messages = []
-        for instance in filter(
-                lambda inst: inst.status != 'SHUTDOWN' and inst.server,
-                instances):
+        instances = iter_mgmt_instances(self.context, self.nova_client)
+        for instance in instances:
+            if instance.status == 'SHUTDOWN' or not instance.server:
+                continue
             message = {
                 'instance_type': self._lookup_flavor(instance.flavor_id),
                 'user_id': instance.server.user_id
@@ -255,5 +337,4 @@ class NovaNotificationTransformer(NotificationTransformer):
             message.update(self.transform_instance(instance,
                                                    audit_start,
                                                    audit_end))
-            messages.append(message)
-        return messages
+            yield message
@@ -14,6 +14,7 @@
 #    under the License.
 
 
+from trove.common.views import collection
 from trove.instance.views import InstanceDetailView
 
 
@@ -101,11 +102,9 @@ class MgmtInstancesView(object):
         self.req = req
 
     def data(self):
-        data = []
         # These are model instances
-        for instance in self.instances:
-            data.append(self.data_for_instance(instance))
-        return {'instances': data}
+        return {'instances': collection(self.data_for_instance(instance)
+                                        for instance in self.instances)}
 
     def data_for_instance(self, instance):
         view = MgmtInstanceView(instance, req=self.req)
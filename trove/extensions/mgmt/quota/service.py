@@ -45,22 +45,25 @@ class QuotaController(wsgi.Controller):
         quotas = {}
         quota = None
         registered_resources = quota_engine.resources
-        for resource, limit in body['quotas'].items():
-            if limit is None:
-                continue
-            if resource == "xmlns":
-                continue
-            if resource not in registered_resources:
-                raise exception.QuotaResourceUnknown(unknown=resource)
-            try:
-                quota = Quota.find_by(tenant_id=id, resource=resource)
-                quota.hard_limit = limit
-                quota.save()
-            except exception.ModelNotFoundError:
-                quota = Quota.create(tenant_id=id,
-                                     resource=resource,
-                                     hard_limit=limit)
-
-            quotas[resource] = quota
+        try:
+            for resource, limit in body['quotas'].items():
+                if limit is None:
+                    continue
+                if resource == "xmlns":
+                    continue
+                if resource not in registered_resources:
+                    raise exception.QuotaResourceUnknown(unknown=resource)
+                try:
+                    quota = Quota.find_by(tenant_id=id, resource=resource)
+                    quota.hard_limit = limit
+                    quota.save()
+                except exception.ModelNotFoundError:
+                    quota = Quota.create(tenant_id=id,
+                                         resource=resource,
+                                         hard_limit=limit)
 
+                quotas[resource] = quota
+        finally:
+            # Limits saved before a failure must not be hidden by the cache
+            quota_engine.invalidate_quotas(id)
         return wsgi.Result(views.QuotaView(quotas).data(), 200)
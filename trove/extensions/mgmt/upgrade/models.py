@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from trove.common import utils
 from trove.common.remote import guest_client
 
 
@@ -40,6 +41,25 @@ class UpgradeMessageSender(object):
                 instance_version, location, metadata)
         return _create_resources
 
+    @staticmethod
+    def create_all(context, instance_ids, instance_version, location,
+                   metadata=None):
+        """
+        Like create, but the returned function sends the message to every
+        instance in instance_ids through utils.fan_out and returns the
+        failures keyed by instance id.
+        """
+        senders = dict(
+            (instance_id, UpgradeMessageSender.create(
+                context, instance_id, instance_version, location, metadata))
+            for instance_id in instance_ids)
+
+        def _create_resources():
+            _results, failures = utils.fan_out(
+                lambda instance_id: senders[instance_id](), senders)
+            return failures
+        return _create_resources
+
     @staticmethod
     def _validate(s, max_length):
         if s is None:
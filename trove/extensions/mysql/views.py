@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from trove.common.views import collection
+
 
 class UserView(object):
 
@@ -34,10 +36,10 @@ class UsersView(object):
         self.users = users
 
     def data(self):
-        userlist = [{"name": user.name,
-                     "host": user.host,
-                     "databases": user.databases}
-                    for user in self.users]
+        userlist = collection({"name": user.name,
+                               "host": user.host,
+                               "databases": user.databases}
+                              for user in self.users)
 
         return {"users": userlist}
 
@@ -85,9 +87,8 @@ class SchemasView(object):
         self.schemas = schemas
 
     def data(self):
-        data = []
         # These are model instances
-        for schema in self.schemas:
-            data.append(SchemaView(schema).data())
+        data = collection(SchemaView(schema).data()
+                          for schema in self.schemas)
 
         return {"databases": data}
@@ -45,6 +45,7 @@ INCREMENTAL = CONF.backup_incremental_strategy.get(STRATEGY,
                                                    STRATEGY)
 
 INCREMENTAL_RUNNER = get_backup_strategy(INCREMENTAL, NAMESPACE)
+CODEC = CONF.backup_codec.get(STRATEGY)
 
 
 class BackupAgent(object):
@@ -78,6 +79,11 @@ class BackupAgent(object):
             parent = backup_info['parent']
             parent_metadata = storage.load_metadata(parent['location'],
                                                     parent['checksum'])
+            # Codec metrics describe how the parent was encoded; they are
+            # not arguments for this backup's runner
+            parent_metadata = dict((key, value) for key, value
+                                   in parent_metadata.items()
+                                   if not key.startswith('codec'))
             # The parent could be another incremental backup so we need to
             # reset the location and checksum to *this* parents info
             parent_metadata.update({
@@ -100,7 +106,7 @@ class BackupAgent(object):
 
         try:
             with runner(filename=backup_id, extra_opts=extra_opts,
-                        **parent_metadata) as bkup:
+                        codec=CODEC, **parent_metadata) as bkup:
                 try:
                     LOG.info(_("Starting Backup %s"), backup_id)
                     success, note, checksum, location = storage.save(
@@ -126,6 +132,12 @@ class BackupAgent(object):
                         raise BackupError(note)
 
                     meta = bkup.metadata()
+                    if bkup.codec:
+                        metrics = bkup.codec.metrics()
+                        LOG.info(_("Backup %(backup_id)s codec metrics: "
+                                   "%(metrics)s") %
+                                 {'backup_id': backup_id, 'metrics': metrics})
+                        meta.update(metrics)
                     meta['datastore'] = backup_info['datastore']
                     meta['datastore_version'] = backup_info[
                         'datastore_version']
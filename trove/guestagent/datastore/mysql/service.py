@@ -215,32 +215,141 @@ class LocalSqlClient(object):
             raise
 
 
+class SqlBatch(object):
+    """Runs many sql_query statements over the connection of a
+    LocalSqlClient block in as few round trips as possible, recording the
+    outcome for each item.
+
+    Statements are added along with the item they belong to and sent in
+    multi-statement batches of up to sql_batch_size. When a batch fails
+    its statements are run again one at a time, so the failure is pinned
+    on its item and the other items still go through; this relies on the
+    statements being idempotent, as CREATE DATABASE IF NOT EXISTS, GRANT
+    and password updates are. Once one of an item's statements fails its
+    later statements are skipped. Privileges are flushed once, when the
+    client's block exits.
+    """
+
+    def __init__(self, conn, batch_size=None):
+        self.conn = conn
+        self.batch_size = max(batch_size or CONF.sql_batch_size, 1)
+        self.statements = []
+        self.results = {}
+        # Errors raised by the server, as opposed to programming errors,
+        # either wrapped by sqlalchemy or straight from the DB-API cursor.
+        self.db_errors = (exc.DBAPIError, conn.dialect.dbapi.Error)
+
+    def add(self, item, query):
+        self.statements.append((item, str(query)))
+        self.results.setdefault(item, None)
+
+    def _execute_many(self, statements):
+        """Sends several statements to the server in one round trip.
+
+        The statements are joined into a single multi-statement query and
+        run on the raw DB-API cursor, so they are not parsed for bind
+        parameters. Every result set is drained before returning so the
+        connection can be used again.
+        """
+        cursor = self.conn.connection.cursor()
+        try:
+            cursor.execute("\n".join(statements))
+            while cursor.nextset():
+                pass
+        finally:
+            cursor.close()
+
+    def execute(self):
+        """Runs every statement added so far.
+
+        :return: the items whose statements failed, mapped to the error
+        :rtype: dict
+        """
+        statements, self.statements = self.statements, []
+        for start in range(0, len(statements), self.batch_size):
+            chunk = [(item, sql) for item, sql
+                     in statements[start:start + self.batch_size]
+                     if self.results[item] is None]
+            if len(chunk) > 1:
+                try:
+                    self._execute_many([sql for _item, sql in chunk])
+                    continue
+                except self.db_errors as e:
+                    LOG.warn(_("Batch of %(count)d statements failed, "
+                               "running them one at a time: %(error)s")
+                             % {'count': len(chunk), 'error': e})
+            for item, sql in chunk:
+                if self.results[item] is not None:
+                    continue
+                try:
+                    self.conn.execute(text(sql))
+                except self.db_errors as e:
+                    LOG.error(_("Statement for %(item)s failed: %(error)s")
+                              % {'item': item, 'error': e})
+                    self.results[item] = e
+        return dict((item, error) for item, error in self.results.items()
+                    if error is not None)
+
+
 class MySqlAdmin(object):
     """Handles administrative tasks on the MySQL database."""
 
     def _associate_dbs(self, user):
         """Internal. Given a MySQLUser, populate its databases attribute."""
-        LOG.debug("Associating dbs to user %s at %s" % (user.name, user.host))
         with LocalSqlClient(get_engine()) as client:
-            q = sql_query.Query()
-            q.columns = ["grantee", "table_schema"]
-            q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
-            q.group = ["grantee", "table_schema"]
-            q.where = ["privilege_type != 'USAGE'"]
-            t = text(str(q))
-            db_result = client.execute(t)
-            for db in db_result:
-                LOG.debug("\t db: %s" % db)
-                if db['grantee'] == "'%s'@'%s'" % (user.name, user.host):
-                    mysql_db = models.MySQLDatabase()
-                    mysql_db.name = db['table_schema']
-                    user.databases.append(mysql_db.serialize())
+            self._load_user_dbs(client, [user])
+
+    def _load_user_dbs(self, client, users):
+        """Internal. Populate the databases attribute of many MySQLUsers
+        from a single query over just their grants.
+        """
+        by_grantee = dict(("'%s'@'%s'" % (user.name, user.host), user)
+                          for user in users)
+        grants = self._get_grants(client, by_grantee.keys())
+        for grantee, db_names in grants.items():
+            user = by_grantee[grantee]
+            for db_name in db_names:
+                LOG.debug("\t db: %s" % db_name)
+                mysql_db = models.MySQLDatabase()
+                mysql_db.name = db_name
+                user.databases.append(mysql_db.serialize())
+
+    def _get_grants(self, client, grantees):
+        """Internal. Return the databases on which each of the given
+        grantees ('user'@'host') has more than USAGE, keyed by grantee.
+        Grantees with no such databases are left out.
+        """
+        grantees = list(grantees)
+        if not grantees:
+            return {}
+        LOG.debug("Loading the grants of %d users" % len(grantees))
+        params = dict(('grantee%d' % index, grantee)
+                      for index, grantee in enumerate(grantees))
+        q = sql_query.Query()
+        q.columns = ["grantee", "table_schema"]
+        q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
+        q.group = ["grantee", "table_schema"]
+        q.where = ["privilege_type != 'USAGE'",
+                   "grantee IN (%s)" % ", ".join(':%s' % name
+                                                 for name in sorted(params))]
+        t = text(str(q))
+        grants = {}
+        for db in client.execute(t, **params):
+            grants.setdefault(db['grantee'], []).append(db['table_schema'])
+        return grants
+
+    def _raise_for_failures(self, action, failures):
+        """Internal. Raise if any item of a SqlBatch failed."""
+        if failures:
+            raise exception.BatchStatementError(
+                action=action, items=", ".join(sorted(failures)))
 
     def change_passwords(self, users):
         """Change the passwords of one or more existing users."""
         LOG.debug("Changing the password of some users.")
         LOG.debug("Users is %s" % users)
         with LocalSqlClient(get_engine()) as client:
+            batch = SqlBatch(client)
             for item in users:
                 LOG.debug("\tUser: %s" % item)
                 user_dict = {'_name': item['name'],
@@ -251,29 +360,23 @@ class MySqlAdmin(object):
                 LOG.debug("\tDeserialized: %s" % user.__dict__)
                 uu = sql_query.UpdateUser(user.name, host=user.host,
                                           clear=user.password)
-                t = text(str(uu))
-                client.execute(t)
+                batch.add("%s@%s" % (user.name, user.host), uu)
+            failures = batch.execute()
+        self._raise_for_failures("change passwords", failures)
 
     def update_attributes(self, username, hostname, user_attrs):
         """Change the attributes of an existing user."""
         LOG.debug("Changing the user attributes")
         LOG.debug("User is %s" % username)
         user = self._get_user(username, hostname)
-        db_access = set()
-        grantee = set()
+        uname = user_attrs.get('name') or username
+        host = user_attrs.get('host') or hostname
+        find_user = "'%s'@'%s'" % (uname, host)
         with LocalSqlClient(get_engine()) as client:
-            q = sql_query.Query()
-            q.columns = ["grantee", "table_schema"]
-            q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
-            q.group = ["grantee", "table_schema"]
-            q.where = ["privilege_type != 'USAGE'"]
-            t = text(str(q))
-            db_result = client.execute(t)
-            for db in db_result:
-                grantee.add(db['grantee'])
-                if db['grantee'] == "'%s'@'%s'" % (user.name, user.host):
-                    db_name = db['table_schema']
-                    db_access.add(db_name)
+            grants = self._get_grants(
+                client, set(["'%s'@'%s'" % (user.name, user.host),
+                             find_user]))
+        db_access = set(grants.get("'%s'@'%s'" % (user.name, user.host), []))
         with LocalSqlClient(get_engine()) as client:
             uu = sql_query.UpdateUser(user.name, host=user.host,
                                       clear=user_attrs.get('password'),
@@ -281,46 +384,47 @@ class MySqlAdmin(object):
                                       new_host=user_attrs.get('host'))
             t = text(str(uu))
             client.execute(t)
-            uname = user_attrs.get('name') or username
-            host = user_attrs.get('host') or hostname
-            find_user = "'%s'@'%s'" % (uname, host)
-            if find_user not in grantee:
+            if find_user not in grants:
                 self.grant_access(uname, host, db_access)
 
     def create_database(self, databases):
         """Create the list of specified databases."""
         with LocalSqlClient(get_engine()) as client:
+            batch = SqlBatch(client)
             for item in databases:
                 mydb = models.ValidatedMySQLDatabase()
                 mydb.deserialize(item)
                 cd = sql_query.CreateDatabase(mydb.name,
                                               mydb.character_set,
                                               mydb.collate)
-                t = text(str(cd))
-                client.execute(t)
+                batch.add(mydb.name, cd)
+            failures = batch.execute()
+        self._raise_for_failures("create databases", failures)
 
     def create_user(self, users):
         """Create users and grant them privileges for the
            specified databases.
         """
         with LocalSqlClient(get_engine()) as client:
+            batch = SqlBatch(client)
             for item in users:
                 user = models.MySQLUser()
                 user.deserialize(item)
+                user_key = "%s@%s" % (user.name, user.host)
                 # TODO(cp16net):Should users be allowed to create users
                 # 'os_admin' or 'debian-sys-maint'
                 g = sql_query.Grant(user=user.name, host=user.host,
                                     clear=user.password)
-                t = text(str(g))
-                client.execute(t)
+                batch.add(user_key, g)
                 for database in user.databases:
                     mydb = models.ValidatedMySQLDatabase()
                     mydb.deserialize(database)
                     g = sql_query.Grant(permissions='ALL', database=mydb.name,
                                         user=user.name, host=user.host,
                                         clear=user.password)
-                    t = text(str(g))
-                    client.execute(t)
+                    batch.add(user_key, g)
+            failures = batch.execute()
+        self._raise_for_failures("create users", failures)
 
     def delete_database(self, database):
         """Delete the specified database."""
@@ -372,7 +476,7 @@ class MySqlAdmin(object):
             found_user = result[0]
             user.password = found_user['Password']
             user.host = found_user['Host']
-            self._associate_dbs(user)
+            self._load_user_dbs(client, [user])
             return user
 
     def grant_access(self, username, hostname, databases):
@@ -380,6 +484,7 @@ class MySqlAdmin(object):
         user = self._get_user(username, hostname)
         mydb = models.ValidatedMySQLDatabase()
         with LocalSqlClient(get_engine()) as client:
+            batch = SqlBatch(client)
             for database in databases:
                     try:
                         mydb.name = database
@@ -390,8 +495,9 @@ class MySqlAdmin(object):
                     g = sql_query.Grant(permissions='ALL', database=mydb.name,
                                         user=user.name, host=user.host,
                                         hashed=user.password)
-                    t = text(str(g))
-                    client.execute(t)
+                    batch.add(mydb.name, g)
+            failures = batch.execute()
+        self._raise_for_failures("grant access", failures)
 
     def is_root_enabled(self):
         """Return True if root access is enabled; False otherwise."""
@@ -494,6 +600,7 @@ class MySqlAdmin(object):
             result = client.execute(t)
             next_marker = None
             LOG.debug("result = " + str(result))
+            page = []
             for count, row in enumerate(result):
                 if count >= limit:
                     break
@@ -501,9 +608,11 @@ class MySqlAdmin(object):
                 mysql_user = models.MySQLUser()
                 mysql_user.name = row['User']
                 mysql_user.host = row['Host']
-                self._associate_dbs(mysql_user)
                 next_marker = row['Marker']
-                users.append(mysql_user.serialize())
+                page.append(mysql_user)
+            if page:
+                self._load_user_dbs(client, page)
+            users = [mysql_user.serialize() for mysql_user in page]
         if result.rowcount <= limit:
             next_marker = None
         LOG.debug("users = " + str(users))
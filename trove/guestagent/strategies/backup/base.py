@@ -15,6 +15,7 @@
 #
 
 from trove.guestagent.strategy import Strategy
+from trove.guestagent.strategies.codec import get_codec_strategy
 from trove.openstack.common import log as logging
 from trove.common import cfg, utils
 from eventlet.green import subprocess
@@ -49,6 +50,8 @@ class BackupRunner(Strategy):
         self.base_filename = filename
         self.process = None
         self.pid = None
+        self.codec = None
+        self.codec_class = self._get_codec_class(kwargs.pop('codec', None))
         kwargs.update({'filename': filename})
         self.command = self.cmd % kwargs
         super(BackupRunner, self).__init__()
@@ -63,6 +66,19 @@ class BackupRunner(Strategy):
                                         stderr=subprocess.PIPE,
                                         preexec_fn=os.setsid)
         self.pid = self.process.pid
+        if self.codec_class:
+            self.codec = self.codec_class(self.process.stdout)
+
+    def _get_codec_class(self, codec):
+        """Load the codec compressing the backup in place of gzip."""
+        if not codec or not self.is_zipped:
+            return None
+        if self.is_encrypted:
+            # The backup has to be compressed before openssl encrypts it
+            LOG.warn("Not using backup codec %s for an encrypted backup.",
+                     codec)
+            return None
+        return get_codec_strategy(codec, CONF.backup_codec_namespace)
 
     def __enter__(self):
         """Start up the process."""
@@ -73,6 +89,8 @@ class BackupRunner(Strategy):
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Clean up everything."""
+        if self.codec:
+            self.codec.close()
         if exc_type is not None:
             return False
 
@@ -110,7 +128,7 @@ class BackupRunner(Strategy):
 
     @property
     def zip_cmd(self):
-        return ' | gzip' if self.is_zipped else ''
+        return ' | gzip' if self.is_zipped and not self.codec_class else ''
 
     @property
     def zip_manifest(self):
@@ -130,6 +148,8 @@ class BackupRunner(Strategy):
         return True
 
     def read(self, chunk_size):
+        if self.codec:
+            return self.codec.read(chunk_size)
         return self.process.stdout.read(chunk_size)
 
     def _run_pre_backup(self):
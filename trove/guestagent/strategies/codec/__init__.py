@@ -0,0 +1,25 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from trove.guestagent.strategy import Strategy
+from trove.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+def get_codec_strategy(codec_driver, ns=__name__):
+    LOG.debug("Getting codec strategy: %s" % codec_driver)
+    return Strategy.get_strategy(codec_driver, ns)
@@ -0,0 +1,80 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import abc
+import os
+import time
+
+from trove.guestagent.strategy import Strategy
+
+
+class Codec(Strategy):
+    """Base class for in-process backup codecs.
+
+    A codec wraps the output stream of a backup process and encodes it as
+    it is read, in place of a shell pipeline stage.
+    """
+    __strategy_type__ = 'backup_codec'
+    __strategy_ns__ = 'trove.guestagent.strategies.codec'
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.started = None
+        self.finished = None
+        self._cpu_started = None
+        self._cpu_finished = None
+        super(Codec, self).__init__()
+
+    @abc.abstractmethod
+    def encode(self, chunk_size):
+        """Return up to chunk_size encoded bytes, or '' at the end."""
+
+    def read(self, chunk_size):
+        if self.started is None:
+            self.started = time.time()
+            self._cpu_started = self._cpu_time()
+        chunk = self.encode(chunk_size)
+        self.bytes_out += len(chunk)
+        if not chunk and self.finished is None:
+            self.finished = time.time()
+            self._cpu_finished = self._cpu_time()
+        return chunk
+
+    def close(self):
+        """Hook for subclasses to release resources."""
+        pass
+
+    def _cpu_time(self):
+        times = os.times()
+        return times[0] + times[1]
+
+    def metrics(self):
+        """Throughput and CPU use of the codec, for the backup metadata."""
+        if self.started is None:
+            return {}
+        finished = self.finished or time.time()
+        cpu_finished = self._cpu_finished or self._cpu_time()
+        seconds = max(finished - self.started, 0.001)
+        return {
+            'codec_name': self.get_strategy_name(),
+            'codec_bytes_in': self.bytes_in,
+            'codec_bytes_out': self.bytes_out,
+            'codec_seconds': round(seconds, 3),
+            'codec_cpu_seconds': round(cpu_finished - self._cpu_started, 3),
+            'codec_throughput': int(self.bytes_in / seconds),
+        }
@@ -0,0 +1,102 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import collections
+import zlib
+
+import eventlet
+from eventlet import tpool
+
+from trove.common import cfg
+from trove.guestagent.strategies.codec import base
+from trove.openstack.common import log as logging
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+THREADS = CONF.backup_codec_threads
+BLOCK_SIZE = CONF.backup_codec_block_size
+# gzip framing for zlib, see deflateInit2
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def compress_block(block, level=zlib.Z_DEFAULT_COMPRESSION):
+    """Compress a block into a complete gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(block) + compressor.flush()
+
+
+class ParallelGzip(base.Codec):
+    """Compress the stream in blocks on several native threads.
+
+    Each block of BLOCK_SIZE bytes is compressed into its own gzip member
+    on a tpool thread. zlib releases the GIL while compressing, so up to
+    THREADS cores are used. A concatenation of gzip members is a valid
+    gzip stream, which keeps these backups restorable with gzip -d.
+    """
+    __strategy_name__ = 'parallel_gzip'
+
+    def __init__(self, stream):
+        super(ParallelGzip, self).__init__(stream)
+        self.pending = collections.deque()
+        # Compressed members not yet returned, the bytes of the first one
+        # already returned, and the bytes left to return across all of them
+        self.ready = collections.deque()
+        self.offset = 0
+        self.ready_size = 0
+        self.end_of_stream = False
+
+    def encode(self, chunk_size):
+        while self.ready_size < chunk_size and self._fill():
+            pass
+        parts = []
+        needed = chunk_size
+        while needed and self.ready:
+            member = self.ready[0]
+            part = member[self.offset:self.offset + needed]
+            parts.append(part)
+            needed -= len(part)
+            self.offset += len(part)
+            if self.offset == len(member):
+                self.ready.popleft()
+                self.offset = 0
+        self.ready_size -= chunk_size - needed
+        return ''.join(parts)
+
+    def _fill(self):
+        """Queue blocks for compression and collect the oldest one.
+
+        Returns False once the stream is exhausted and all the compressed
+        blocks have been collected.
+        """
+        while not self.end_of_stream and len(self.pending) < THREADS:
+            block = self.stream.read(BLOCK_SIZE)
+            if not block:
+                self.end_of_stream = True
+                break
+            self.bytes_in += len(block)
+            self.pending.append(eventlet.spawn(tpool.execute,
+                                               compress_block, block))
+        if not self.pending:
+            return False
+        member = self.pending.popleft().wait()
+        self.ready.append(member)
+        self.ready_size += len(member)
+        return True
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().kill()
@@ -0,0 +1,157 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import errno
+import hashlib
+import json
+import mmap
+import os
+
+from eventlet import greenthread
+
+from trove.guestagent.strategies.storage import base
+from trove.openstack.common import log as logging
+from trove.openstack.common.gettextutils import _  # noqa
+from trove.common import cfg
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+CHUNK_SIZE = CONF.backup_chunk_size
+BACKUP_DIR = CONF.backup_local_storage_dir
+
+
+class LocalStorageIntegrityError(Exception):
+    """Integrity error while reading a backup from the local filesystem."""
+
+
+class LocalStorage(base.Storage):
+    """Implementation of Storage Strategy for a local filesystem path.
+
+    Backups are written to BACKUP_DIR, which may be a fast local volume or
+    an NFS mount. The location of a backup is the path of its file and its
+    metadata is kept next to it in a JSON file.
+    """
+    __strategy_name__ = 'local'
+
+    def save(self, filename, stream):
+        """Persist information from the stream to BACKUP_DIR/<filename>.
+
+        The backup is written under a temporary name and renamed once it
+        is complete, so a partial backup is never found at the location.
+        """
+        location = os.path.join(BACKUP_DIR, filename)
+        if not os.path.isdir(BACKUP_DIR):
+            os.makedirs(BACKUP_DIR)
+
+        checksum = hashlib.md5()
+        tmp_location = '%s.part' % location
+        try:
+            with open(tmp_location, 'wb') as backup_file:
+                chunk = stream.read(CHUNK_SIZE)
+                while chunk:
+                    backup_file.write(chunk)
+                    checksum.update(chunk)
+                    chunk = stream.read(CHUNK_SIZE)
+            os.rename(tmp_location, location)
+        except (IOError, OSError) as e:
+            LOG.exception(_("Error saving data to %(location)s: %(error)s") %
+                          {'location': location, 'error': e})
+            if os.path.exists(tmp_location):
+                os.unlink(tmp_location)
+            return False, "Error saving data to local storage!", None, location
+
+        return (True, "Successfully saved data to local storage!",
+                checksum.hexdigest(), location)
+
+    def _verify_checksum(self, location, backup, size, checksum):
+        """Hash the backup a chunk at a time, yielding between chunks so a
+        large file does not hold up the other green threads.
+        """
+        md5 = hashlib.md5()
+        for offset in xrange(0, size, CHUNK_SIZE):
+            md5.update(backup[offset:offset + CHUNK_SIZE])
+            greenthread.sleep(0)
+        backup_checksum = md5.hexdigest()
+        if backup_checksum != checksum:
+            msg = ("Original checksum: %(original)s does not match"
+                   " the current checksum of %(location)s: %(current)s" %
+                   {'original': checksum, 'location': location,
+                    'current': backup_checksum})
+            LOG.error(msg)
+            raise LocalStorageIntegrityError(msg)
+        return True
+
+    def load(self, location, backup_checksum):
+        """Stream a backup from the local filesystem.
+
+        The file is memory mapped and served in chunks of CHUNK_SIZE.
+        """
+        with open(location, 'rb') as backup_file:
+            size = os.fstat(backup_file.fileno()).st_size
+            if not size:
+                backup = ''
+            else:
+                backup = mmap.mmap(backup_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        if CONF.verify_swift_checksum_on_restore:
+            try:
+                self._verify_checksum(location, backup, size,
+                                      backup_checksum)
+            except Exception:
+                if size:
+                    backup.close()
+                raise
+        return self._read_chunks(backup, size)
+
+    def _read_chunks(self, backup, size):
+        try:
+            for offset in xrange(0, size, CHUNK_SIZE):
+                yield backup[offset:offset + CHUNK_SIZE]
+        finally:
+            if size:
+                backup.close()
+
+    def _metadata_location(self, location):
+        return '%s.metadata' % location
+
+    def load_metadata(self, location, backup_checksum):
+        """Load metadata from the file stored next to the backup."""
+        metadata_location = self._metadata_location(location)
+        if not os.path.exists(metadata_location):
+            return {}
+        with open(metadata_location) as metadata_file:
+            return json.load(metadata_file)
+
+    def save_metadata(self, location, metadata={}):
+        """Save metadata to a file stored next to the backup."""
+        LOG.info(_("Writing metadata: %s"), str(metadata))
+        with open(self._metadata_location(location), 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+
+    def delete(self, location):
+        """Remove the backup and its metadata file.
+
+        Files which are already gone are ignored, so a delete can be retried
+        after a partial failure.
+        """
+        for path in (location, self._metadata_location(location)):
+            LOG.info(_("Deleting file: %s"), path)
+            try:
+                os.unlink(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
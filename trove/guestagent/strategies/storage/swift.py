@@ -14,8 +14,12 @@
 #    under the License.
 #
 
+import collections
 import hashlib
 
+import eventlet
+from eventlet import queue
+
 from trove.guestagent.strategies.storage import base
 from trove.openstack.common import log as logging
 from trove.openstack.common.gettextutils import _  # noqa
@@ -28,6 +32,10 @@ CONF = cfg.CONF
 CHUNK_SIZE = CONF.backup_chunk_size
 MAX_FILE_SIZE = CONF.backup_segment_max_size
 BACKUP_CONTAINER = CONF.backup_swift_container
+UPLOAD_CONCURRENCY = CONF.backup_upload_concurrency
+UPLOAD_SEGMENT_SIZE = CONF.backup_upload_segment_size
+DOWNLOAD_CONCURRENCY = CONF.backup_download_concurrency
+DOWNLOAD_RANGE_SIZE = CONF.backup_download_range_size
 
 
 class DownloadError(Exception):
@@ -110,30 +118,22 @@ class SwiftStorage(base.Storage):
         # Swift Checksum is the checksum of the concatenated segment checksums
         swift_checksum = hashlib.md5()
 
-        # Wrap the output of the backup process to segment it for swift
-        stream_reader = StreamReader(stream, filename)
-
         url = self.connection.url
         # Full location where the backup manifest is stored
         location = "%s/%s/%s" % (url, BACKUP_CONTAINER, filename)
 
-        # Read from the stream and write to the container in swift
-        while not stream_reader.end_of_file:
-            etag = self.connection.put_object(BACKUP_CONTAINER,
-                                              stream_reader.segment,
-                                              stream_reader)
-
-            segment_checksum = stream_reader.segment_checksum.hexdigest()
-
-            # Check each segment MD5 hash against swift etag
-            # Raise an error and mark backup as failed
-            if etag != segment_checksum:
-                LOG.error("Error saving data segment to swift. "
-                          "ETAG: %s Segment MD5: %s",
-                          etag, segment_checksum)
-                return False, "Error saving data to Swift!", None, location
-
-            swift_checksum.update(segment_checksum)
+        # Wrap the output of the backup process to segment it for swift
+        if UPLOAD_CONCURRENCY > 1:
+            stream_reader = StreamReader(
+                stream, filename,
+                max_file_size=min(MAX_FILE_SIZE, UPLOAD_SEGMENT_SIZE))
+            saved = self._save_segments_concurrently(stream_reader,
+                                                     swift_checksum)
+        else:
+            stream_reader = StreamReader(stream, filename)
+            saved = self._save_segments(stream_reader, swift_checksum)
+        if not saved:
+            return False, "Error saving data to Swift!", None, location
 
         # Create the manifest file
         # We create the manifest file after all the segments have been uploaded
@@ -166,6 +166,88 @@ class SwiftStorage(base.Storage):
         return (True, "Successfully saved data to Swift!",
                 final_swift_checksum, location)
 
+    def _verify_segment(self, segment, etag, segment_checksum):
+        # Check each segment MD5 hash against swift etag
+        if etag != segment_checksum:
+            LOG.error("Error saving data segment %s to swift. "
+                      "ETAG: %s Segment MD5: %s",
+                      segment, etag, segment_checksum)
+            return False
+        return True
+
+    def _save_segments(self, stream_reader, swift_checksum):
+        """Upload the segments of the stream one after another."""
+        # Read from the stream and write to the container in swift
+        while not stream_reader.end_of_file:
+            segment = stream_reader.segment
+            etag = self.connection.put_object(BACKUP_CONTAINER,
+                                              segment,
+                                              stream_reader)
+
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            if not self._verify_segment(segment, etag, segment_checksum):
+                return False
+
+            swift_checksum.update(segment_checksum)
+        return True
+
+    def _save_segments_concurrently(self, stream_reader, swift_checksum):
+        """Upload up to UPLOAD_CONCURRENCY segments of the stream at once.
+
+        Each segment is read into memory while its MD5 is computed and is
+        then handed to a green thread for upload. Spawning blocks while all
+        the green threads are busy, which bounds the number of buffered
+        segments. The etags are verified and folded into the manifest
+        checksum in segment order once the uploads complete.
+        """
+        put_object = self._concurrent_call('put_object', UPLOAD_CONCURRENCY)
+
+        def put_segment(segment, contents):
+            return put_object(BACKUP_CONTAINER, segment, contents)
+
+        pool = eventlet.GreenPool(UPLOAD_CONCURRENCY)
+        uploads = []
+        while not stream_reader.end_of_file:
+            segment = stream_reader.segment
+            chunks = []
+            chunk = stream_reader.read(CHUNK_SIZE)
+            while chunk:
+                chunks.append(chunk)
+                chunk = stream_reader.read(CHUNK_SIZE)
+            if not chunks and stream_reader.end_of_file and uploads:
+                break
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            upload = pool.spawn(put_segment, segment, ''.join(chunks))
+            uploads.append((segment, segment_checksum, upload))
+
+        saved = True
+        for segment, segment_checksum, upload in uploads:
+            etag = upload.wait()
+            if saved and not self._verify_segment(segment, etag,
+                                                  segment_checksum):
+                saved = False
+            swift_checksum.update(segment_checksum)
+        return saved
+
+    def _concurrent_call(self, method_name, concurrency):
+        """Return a function calling method_name on a free connection.
+
+        A swift connection holds a single HTTP connection, so each of the
+        concurrent requests needs its own.
+        """
+        connections = queue.LightQueue()
+        connections.put(self.connection)
+        for _i in range(concurrency - 1):
+            connections.put(create_swift_client(self.context))
+
+        def call(*args, **kwargs):
+            connection = connections.get()
+            try:
+                return getattr(connection, method_name)(*args, **kwargs)
+            finally:
+                connections.put(connection)
+        return call
+
     def _explodeLocation(self, location):
         storage_url = "/".join(location.split('/')[:-2])
         container = location.split('/')[-2]
@@ -186,6 +268,19 @@ class SwiftStorage(base.Storage):
         """Restore a backup from the input stream to the restore_location."""
         storage_url, container, filename = self._explodeLocation(location)
 
+        if DOWNLOAD_CONCURRENCY > 1:
+            headers = self.connection.head_object(container, filename)
+            if CONF.verify_swift_checksum_on_restore:
+                self._verify_checksum(headers.get('etag', ''),
+                                      backup_checksum)
+            manifest = headers.get('x-object-manifest')
+            if manifest:
+                segment_container, prefix = manifest.split('/', 1)
+                _headers, segments = self.connection.get_container(
+                    segment_container, prefix=prefix, full_listing=True)
+                return self._load_segments_concurrently(segment_container,
+                                                        segments)
+
         headers, info = self.connection.get_object(container, filename,
                                                    resp_chunk_size=CHUNK_SIZE)
 
@@ -194,6 +289,61 @@ class SwiftStorage(base.Storage):
 
         return info
 
+    def _load_segments_concurrently(self, container, segments):
+        """Stream the segments of a backup, fetching several ranges ahead.
+
+        Every segment is split into byte ranges of DOWNLOAD_RANGE_SIZE which
+        are fetched by up to DOWNLOAD_CONCURRENCY green threads while the
+        earlier ranges are consumed. Ranges are yielded in order and each
+        segment is checked against the MD5 swift lists for it.
+        """
+        ranges = []
+        for segment in sorted(segments, key=lambda segment: segment['name']):
+            size = int(segment['bytes'])
+            start = 0
+            while True:
+                end = min(start + DOWNLOAD_RANGE_SIZE, size)
+                ranges.append((segment, start, end))
+                start = end
+                if start >= size:
+                    break
+
+        get_object = self._concurrent_call('get_object', DOWNLOAD_CONCURRENCY)
+
+        def get_range(name, start, end):
+            if start == end:
+                return ''
+            headers = {'Range': 'bytes=%d-%d' % (start, end - 1)}
+            _headers, contents = get_object(container, name, headers=headers)
+            return contents
+
+        pool = eventlet.GreenPool(DOWNLOAD_CONCURRENCY)
+        pending = collections.deque()
+        ranges = iter(ranges)
+
+        def fetch_next():
+            for segment, start, end in ranges:
+                pending.append((segment, start, end,
+                                pool.spawn(get_range, segment['name'],
+                                           start, end)))
+                return
+
+        for _i in range(DOWNLOAD_CONCURRENCY):
+            fetch_next()
+
+        segment_checksum = None
+        while pending:
+            segment, start, end, download = pending.popleft()
+            contents = download.wait()
+            fetch_next()
+            if start == 0:
+                segment_checksum = hashlib.md5()
+            segment_checksum.update(contents)
+            if end == int(segment['bytes']):
+                self._verify_checksum(segment['hash'],
+                                      segment_checksum.hexdigest())
+            yield contents
+
     def _get_attr(self, original):
         """Get a friendly name from an object header key."""
         key = original.replace('-', '_')
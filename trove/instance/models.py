@@ -18,6 +18,7 @@
 
 import re
 from datetime import datetime
+import eventlet
 from novaclient import exceptions as nova_exceptions
 from oslo.config.cfg import NoSuchOptError
 from trove.common import cfg
@@ -53,18 +54,52 @@ def filter_ips(ips, regex):
     return [ip for ip in ips if re.search(regex, ip)]
 
 
-def load_server(context, instance_id, server_id):
+# Nova servers recently read by this process, keyed by (tenant, server id).
+# Entries expire after server_status_cache_ttl seconds. Only read-only API
+# views are served from it; anything that acts on a server loads it fresh.
+# An action started through this process drops the server's entry, but
+# other processes keep theirs until it expires.
+SERVER_CACHE = utils.ExpiringCache(ttl=CONF.server_status_cache_ttl,
+                                   max_size=CONF.server_status_cache_size)
+
+
+def get_cached_server(tenant_id, server_id):
+    """Returns the cached server, or None if it is missing or expired."""
+    return SERVER_CACHE.get((tenant_id, server_id))
+
+
+def cache_servers(servers, tenant_id=None):
+    """Caches servers under the tenant which owns them."""
+    if not SERVER_CACHE.enabled:
+        return
+    for server in servers:
+        owner = getattr(server, 'tenant_id', None) or tenant_id
+        SERVER_CACHE.set((owner, server.id), server)
+
+
+def invalidate_cached_server(tenant_id, server_id):
+    SERVER_CACHE.pop((tenant_id, server_id))
+
+
+def load_server(context, instance_id, server_id, use_cache=False):
     """
     Loads a server or raises an exception.
     :param context: request context used to access nova
     :param instance_id: the trove instance id corresponding to the nova server
     (informational only)
     :param server_id: the compute instance id which will be retrieved from nova
+    :param use_cache: return a cached server if there is one (read-only
+    views only)
     :type context: trove.common.context.TroveContext
     :type instance_id: unicode
     :type server_id: unicode
+    :type use_cache: bool
     :rtype: novaclient.v1_1.servers.Server
     """
+    if use_cache:
+        server = get_cached_server(context.tenant, server_id)
+        if server is not None:
+            return server
     client = create_nova_client(context)
     try:
         server = client.servers.get(server_id)
@@ -74,6 +109,7 @@ def load_server(context, instance_id, server_id):
                                                 server_id=server_id)
     except nova_exceptions.ClientException as e:
         raise exception.TroveError(str(e))
+    cache_servers([server], tenant_id=context.tenant)
     return server
 
 
@@ -101,15 +137,24 @@ def validate_volume_size(size):
         raise exception.VolumeQuotaExceeded(msg)
 
 
-def load_simple_instance_server_status(context, db_info):
+def load_simple_instance_server_status(context, db_info, use_cache=False):
     """Loads a server or raises an exception."""
     if 'BUILDING' == db_info.task_status.action:
         db_info.server_status = "BUILD"
         db_info.addresses = {}
     else:
+        server = None
+        if use_cache:
+            server = get_cached_server(context.tenant,
+                                       db_info.compute_instance_id)
+        if server is not None:
+            db_info.server_status = server.status
+            db_info.addresses = server.addresses
+            return
         client = create_nova_client(context)
         try:
             server = client.servers.get(db_info.compute_instance_id)
+            cache_servers([server], tenant_id=context.tenant)
             db_info.server_status = server.status
             db_info.addresses = server.addresses
         except nova_exceptions.NotFound:
@@ -429,9 +474,9 @@ def load_instance(cls, context, id, needs_server=False):
     return cls(context, db_info, server, service_status)
 
 
-def load_instance_with_guest(cls, context, id):
+def load_instance_with_guest(cls, context, id, use_cache=False):
     db_info = get_db_info(context, id)
-    load_simple_instance_server_status(context, db_info)
+    load_simple_instance_server_status(context, db_info, use_cache=use_cache)
     datastore_status = InstanceServiceStatus.find_by(instance_id=id)
     LOG.info("datastore status=%s" % datastore_status.status)
     instance = cls(context, db_info, datastore_status)
@@ -504,6 +549,7 @@ class BaseInstance(SimpleInstance):
             LOG.debug(" ... setting status to DELETING.")
             self.update_db(task_status=InstanceTasks.DELETING,
                            configuration_id=None)
+            self.invalidate_cached_server()
             task_api.API(self.context).delete_instance(self.id)
 
         deltas = {'instances': -1}
@@ -547,6 +593,16 @@ class BaseInstance(SimpleInstance):
             self._nova_client = create_nova_client(self.context)
         return self._nova_client
 
+    def invalidate_cached_server(self):
+        """Drops this instance's server from this process' server cache.
+
+        Called as an action that changes the server is handed to the
+        taskmanager. Servers cached by other API workers still expire only
+        after server_status_cache_ttl.
+        """
+        invalidate_cached_server(self.tenant_id,
+                                 self.db_info.compute_instance_id)
+
     def update_db(self, **values):
         self.db_info = DBInstance.find_by(id=self.id, deleted=False)
         for key in values:
@@ -738,6 +794,7 @@ class Instance(BuiltInstance):
         # Set the task to RESIZING and begin the async call before returning.
         self.update_db(task_status=InstanceTasks.RESIZING)
         LOG.debug("Instance %s set to RESIZING." % self.id)
+        self.invalidate_cached_server()
         task_api.API(self.context).resize_flavor(self.id, old_flavor,
                                                  new_flavor)
 
@@ -755,6 +812,7 @@ class Instance(BuiltInstance):
                                              "size of '%s'") % old_size)
             # Set the task to Resizing before sending off to the taskmanager
             self.update_db(task_status=InstanceTasks.RESIZING)
+            self.invalidate_cached_server()
             task_api.API(self.context).resize_volume(new_size, self.id)
 
         new_size_l = long(new_size)
@@ -767,6 +825,7 @@ class Instance(BuiltInstance):
         self.validate_can_perform_action()
         LOG.info("Rebooting instance %s..." % self.id)
         self.update_db(task_status=InstanceTasks.REBOOTING)
+        self.invalidate_cached_server()
         task_api.API(self.context).reboot(self.id)
 
     def restart(self):
@@ -785,6 +844,7 @@ class Instance(BuiltInstance):
         self.validate_can_perform_action()
         LOG.info("Migrating instance id = %s, to host = %s" % (self.id, host))
         self.update_db(task_status=InstanceTasks.MIGRATING)
+        self.invalidate_cached_server()
         task_api.API(self.context).migrate(self.id, host)
 
     def validate_can_perform_action(self):
@@ -888,26 +948,138 @@ class Instance(BuiltInstance):
 
 def create_server_list_matcher(server_list):
     # Returns a method which finds a server from the given list.
+    # The list is indexed by server id once up front so each lookup is a
+    # dict access rather than a scan of every server.
+    servers_by_id = {}
+    duplicate_ids = set()
+    for server in server_list or []:
+        if server.id in servers_by_id:
+            duplicate_ids.add(server.id)
+        servers_by_id[server.id] = server
+
     def find_server(instance_id, server_id):
-        matches = [server for server in server_list if server.id == server_id]
-        if len(matches) == 1:
-            return matches[0]
-        elif len(matches) < 1:
-            # The instance was not found in the list and
-            # this can happen if the instance is deleted from
-            # nova but still in trove database
-            raise exception.ComputeInstanceNotFound(
-                instance_id=instance_id, server_id=server_id)
-        else:
+        if server_id in duplicate_ids:
             # Should never happen, but never say never.
             LOG.error(_("Server %(server)s for instance %(instance)s was"
                         "found twice!") % {'server': server_id,
                                            'instance': instance_id})
             raise exception.TroveError(uuid=instance_id)
+        server = servers_by_id.get(server_id)
+        if server is None:
+            # The instance was not found in the list and
+            # this can happen if the instance is deleted from
+            # nova but still in trove database
+            raise exception.ComputeInstanceNotFound(
+                instance_id=instance_id, server_id=server_id)
+        return server
 
     return find_server
 
 
+def load_service_statuses(instance_ids):
+    """
+    Loads the service statuses for many instances with a single query.
+    :param instance_ids: the trove instance ids to load statuses for
+    :type instance_ids: list
+    :return: the service statuses keyed by instance id; instances without
+    a status row are absent from the result
+    :rtype: dict
+    """
+    if not instance_ids:
+        return {}
+    query = InstanceServiceStatus.query()
+    query = query.filter(
+        InstanceServiceStatus.instance_id.in_(instance_ids))
+    return dict((status.instance_id, status) for status in query.all())
+
+
+def load_instances_by_compute_ids(compute_instance_ids):
+    """
+    Loads the instances backed by many Nova servers, along with their
+    service statuses, with a single query.
+    :param compute_instance_ids: the nova server ids to look up
+    :type compute_instance_ids: list
+    :return: (DBInstance, InstanceServiceStatus) pairs keyed by server id;
+    the status is None for instances without one and servers without an
+    instance are absent from the result
+    :rtype: dict
+    """
+    if not compute_instance_ids:
+        return {}
+    query = DBInstance.query()
+    query = query.filter(
+        DBInstance.compute_instance_id.in_(compute_instance_ids))
+    query = query.add_entity(InstanceServiceStatus)
+    query = query.outerjoin(
+        InstanceServiceStatus,
+        InstanceServiceStatus.instance_id == DBInstance.id)
+    return dict((db_info.compute_instance_id, (db_info, status))
+                for db_info, status in query.all())
+
+
+def update_service_statuses(instance_ids, status=None):
+    """
+    Updates the service status of many instances with a single statement.
+    :param instance_ids: the trove instance ids whose status is updated
+    :param status: the new status, or None to only mark them as updated
+    :type instance_ids: list
+    :type status: trove.common.instance.ServiceStatus
+    :return: the number of rows updated
+    :rtype: int
+    """
+    if not instance_ids:
+        return 0
+    values = {'updated_at': utils.utcnow()}
+    if status is not None:
+        values['status_id'] = status.code
+        values['status_description'] = status.description
+    query = InstanceServiceStatus.query()
+    query = query.filter(
+        InstanceServiceStatus.instance_id.in_(instance_ids))
+    return query.update(values, synchronize_session=False)
+
+
+def load_servers_for_instances(context, db_infos):
+    """
+    Loads only the Nova servers backing the given instance records instead
+    of listing every server owned by the tenant.
+    :param context: request context used to access nova
+    :param db_infos: the instance records whose servers should be loaded
+    :type context: trove.common.context.TroveContext
+    :type db_infos: list of trove.instance.models.DBInstance
+    :return: the servers which still exist in Nova
+    :rtype: list of novaclient.v1_1.servers.Server
+    """
+    server_ids = [db.compute_instance_id for db in db_infos
+                  if db.compute_instance_id and
+                  InstanceTasks.BUILDING != db.task_status]
+    servers = []
+    missing_ids = []
+    for server_id in server_ids:
+        server = get_cached_server(context.tenant, server_id)
+        if server is not None:
+            servers.append(server)
+        else:
+            missing_ids.append(server_id)
+    if not missing_ids:
+        return servers
+    client = create_nova_client(context)
+
+    def get_server(server_id):
+        try:
+            return client.servers.get(server_id)
+        except nova_exceptions.NotFound:
+            LOG.debug("Could not find nova server_id(%s)" % server_id)
+            return None
+
+    pool = eventlet.GreenPool(min(CONF.server_load_concurrency,
+                                  len(missing_ids)))
+    fetched = [server for server in pool.imap(get_server, missing_ids)
+               if server is not None]
+    cache_servers(fetched, tenant_id=context.tenant)
+    return servers + fetched
+
+
 class Instances(object):
     DEFAULT_LIMIT = CONF.instances_page_size
 
@@ -919,8 +1091,6 @@ class Instances(object):
 
         if context is None:
             raise TypeError("Argument context not defined.")
-        client = create_nova_client(context)
-        servers = client.servers.list()
 
         db_infos = DBInstance.find_all(tenant_id=context.tenant, deleted=False)
         limit = int(context.limit or Instances.DEFAULT_LIMIT)
@@ -931,10 +1101,9 @@ class Instances(object):
                                                   marker=context.marker)
         next_marker = data_view.next_page_marker
 
+        # Only the servers behind the current page are fetched from Nova.
+        servers = load_servers_for_instances(context, data_view.collection)
         find_server = create_server_list_matcher(servers)
-        for db in db_infos:
-            LOG.debug("Checking for db [id=%s, compute_instance_id=%s]" %
-                      (db.id, db.compute_instance_id))
         ret = Instances._load_servers_status(load_simple_instance, context,
                                              data_view.collection,
                                              find_server)
@@ -943,33 +1112,31 @@ class Instances(object):
     @staticmethod
     def _load_servers_status(load_instance, context, db_items, find_server):
         ret = []
+        db_items = list(db_items)
+        statuses = load_service_statuses([db.id for db in db_items])
         for db in db_items:
+            LOG.debug("Checking for db [id=%s, compute_instance_id=%s]" %
+                      (db.id, db.compute_instance_id))
             server = None
-            try:
-                #TODO(tim.simpson): Delete when we get notifications working!
-                if InstanceTasks.BUILDING == db.task_status:
-                    db.server_status = "BUILD"
-                else:
-                    try:
-                        server = find_server(db.id, db.compute_instance_id)
-                        db.server_status = server.status
-                    except exception.ComputeInstanceNotFound:
-                        db.server_status = "SHUTDOWN"  # Fake it...
-                #TODO(tim.simpson): End of hack.
-
-                #volumes = find_volumes(server.id)
-                datastore_status = InstanceServiceStatus.find_by(
-                    instance_id=db.id)
-                if not datastore_status.status:  # This should never happen.
-                    LOG.error(_("Server status could not be read for "
-                                "instance id(%s)") % db.id)
-                    continue
-                LOG.info(_("Server api_status(%s)") %
-                         datastore_status.status.api_status)
-            except exception.ModelNotFoundError:
+            #TODO(tim.simpson): Delete when we get notifications working!
+            if InstanceTasks.BUILDING == db.task_status:
+                db.server_status = "BUILD"
+            else:
+                try:
+                    server = find_server(db.id, db.compute_instance_id)
+                    db.server_status = server.status
+                except exception.ComputeInstanceNotFound:
+                    db.server_status = "SHUTDOWN"  # Fake it...
+            #TODO(tim.simpson): End of hack.
+
+            #volumes = find_volumes(server.id)
+            datastore_status = statuses.get(db.id)
+            if datastore_status is None or not datastore_status.status:
                 LOG.error(_("Server status could not be read for "
                             "instance id(%s)") % db.id)
                 continue
+            LOG.info(_("Server api_status(%s)") %
+                     datastore_status.status.api_status)
             ret.append(load_instance(context, db, datastore_status,
                                      server=server))
         return ret
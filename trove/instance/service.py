@@ -159,7 +159,7 @@ class InstanceController(wsgi.Controller):
 
         context = req.environ[wsgi.CONTEXT_KEY]
         server = models.load_instance_with_guest(models.DetailInstance,
-                                                 context, id)
+                                                 context, id, use_cache=True)
         return wsgi.Result(views.InstanceDetailView(server,
                                                     req=req).data(), 200)
 
@@ -15,6 +15,7 @@
 
 from trove.openstack.common import log as logging
 from trove.common import cfg
+from trove.common.views import collection
 from trove.common.views import create_links
 from trove.instance import models
 
@@ -115,11 +116,9 @@ class InstancesView(object):
         self.req = req
 
     def data(self):
-        data = []
         # These are model instances
-        for instance in self.instances:
-            data.append(self.data_for_instance(instance))
-        return {'instances': data}
+        return {'instances': collection(self.data_for_instance(instance)
+                                        for instance in self.instances)}
 
     def data_for_instance(self, instance):
         view = InstanceView(instance, req=self.req)
@@ -18,7 +18,10 @@
 from trove.openstack.common import log as logging
 from trove.openstack.common.gettextutils import _
 from oslo.config import cfg
+import sqlalchemy.exc
 from trove.common import exception
+from trove.common import utils
+from trove.db import get_db_api
 from trove.openstack.common import importutils
 from trove.quota.models import Quota
 from trove.quota.models import QuotaUsage
@@ -28,6 +31,9 @@ from trove.quota.models import Resource
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+QUOTA_CACHE = utils.ExpiringCache(ttl=CONF.quota_cache_ttl,
+                                  max_size=CONF.quota_cache_size)
+
 
 class DbQuotaDriver(object):
     """
@@ -56,7 +62,7 @@ class DbQuotaDriver(object):
         :param tenant_id: The ID of the tenant to return quotas for.
         """
 
-        all_quotas = Quota.find_all(tenant_id=tenant_id).all()
+        all_quotas = self._load_quotas(tenant_id)
         result_quotas = dict((quota.resource, quota)
                              for quota in all_quotas
                              if quota.resource in resources)
@@ -72,6 +78,28 @@ class DbQuotaDriver(object):
 
         return result_quotas
 
+    def _load_quotas(self, tenant_id):
+        """Load the quota limits of a tenant, through QUOTA_CACHE.
+
+        The cache holds a plain dict of resource to hard limit, and a hit
+        builds new Quota objects from it, so a caller changing a quota it
+        was given can never change what other requests see.
+        """
+
+        limits = QUOTA_CACHE.get(tenant_id)
+        if limits is not None:
+            return [Quota(tenant_id, resource, hard_limit)
+                    for resource, hard_limit in limits.items()]
+        quotas = Quota.find_all(tenant_id=tenant_id).all()
+        QUOTA_CACHE.set(tenant_id, dict((quota.resource, quota.hard_limit)
+                                        for quota in quotas))
+        return quotas
+
+    def invalidate_quotas(self, tenant_id):
+        """Drop the cached quota limits of a tenant."""
+
+        QUOTA_CACHE.pop(tenant_id)
+
     def get_quota_usage_by_tenant(self, tenant_id, resource):
         """Get a specific quota usage by tenant."""
 
@@ -201,6 +229,150 @@ class DbQuotaDriver(object):
             reservation.save()
 
 
+def _is_deadlock(error):
+    # MySQL reports "Deadlock found", PostgreSQL "deadlock detected".
+    return 'deadlock' in str(error.orig).lower()
+
+
+class BulkDbQuotaDriver(DbQuotaDriver):
+    """
+    Database quota driver which reserves, commits and rolls back the
+    resources of a request in a single transaction.  The usages involved
+    are locked with SELECT ... FOR UPDATE so that concurrent reservations
+    for a tenant can not both pass the quota check.  A reservation that
+    loses a race to create a usage row, or is chosen as a deadlock victim,
+    is retried up to reserve_attempts times.
+    """
+
+    reserve_attempts = 3
+
+    def reserve(self, tenant_id, resources, deltas):
+        """Check quotas and reserve resources for a tenant.
+
+        Same contract as DbQuotaDriver.reserve; the usages are loaded,
+        checked and updated and the reservations inserted in one
+        transaction.
+        """
+
+        unregistered_resources = [delta for delta in deltas
+                                  if delta not in resources]
+        if unregistered_resources:
+            raise exception.QuotaResourceUnknown(unknown=
+                                                 unregistered_resources)
+
+        quotas = self.get_all_quotas_by_tenant(tenant_id, deltas.keys())
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._reserve(tenant_id, deltas, quotas)
+            except sqlalchemy.exc.DBAPIError as error:
+                # A concurrent reserve may have created a missing usage row
+                # first, or the database may have picked this transaction
+                # as a deadlock victim; both succeed when run again.
+                if attempt >= self.reserve_attempts or not (
+                        isinstance(error, sqlalchemy.exc.IntegrityError) or
+                        _is_deadlock(error)):
+                    raise
+                LOG.debug("Retrying quota reservation for tenant %s: %s"
+                          % (tenant_id, error))
+
+    def _lock_usages(self, db_session, tenant_id, resources):
+        """Load and lock the tenant's usages with SELECT ... FOR UPDATE."""
+        query = (db_session.query(QuotaUsage)
+                 .filter_by(tenant_id=tenant_id)
+                 .filter(QuotaUsage.resource.in_(resources)))
+        return dict((usage.resource, usage) for usage
+                    in query.with_lockmode('update'))
+
+    def _reserve(self, tenant_id, deltas, quotas):
+        now = utils.utcnow()
+        with get_db_api().transaction() as db_session:
+            quota_usages = self._lock_usages(db_session, tenant_id,
+                                             deltas.keys())
+            for resource in deltas:
+                if resource not in quota_usages:
+                    usage = QuotaUsage(id=utils.generate_uuid(),
+                                       created=now,
+                                       tenant_id=tenant_id,
+                                       resource=resource,
+                                       in_use=0,
+                                       reserved=0)
+                    db_session.add(usage)
+                    quota_usages[resource] = usage
+
+            overs = [resource for resource in deltas
+                     if (int(deltas[resource]) > 0 and
+                        (quota_usages[resource].in_use +
+                         quota_usages[resource].reserved +
+                         int(deltas[resource])) >
+                         quotas[resource].hard_limit)]
+
+            if overs:
+                raise exception.QuotaExceeded(overs=sorted(overs))
+
+            reservations = []
+            for resource in deltas:
+                reserved = deltas[resource]
+                usage = quota_usages[resource]
+                usage.reserved += reserved
+                usage.updated = now
+                resv = Reservation(id=utils.generate_uuid(),
+                                   created=now,
+                                   updated=now,
+                                   usage_id=usage.id,
+                                   delta=reserved,
+                                   status=Reservation.Statuses.RESERVED)
+                db_session.add(resv)
+                reservations.append(resv)
+
+        return reservations
+
+    def _settle(self, reservations, status):
+        """Apply reservations to their usages and mark them with status."""
+
+        if not reservations:
+            return
+        now = utils.utcnow()
+        with get_db_api().transaction() as db_session:
+            query = db_session.query(QuotaUsage).filter(QuotaUsage.id.in_(
+                set(reservation.usage_id for reservation in reservations)))
+            usages = dict((usage.id, usage) for usage
+                          in query.with_lockmode('update'))
+            for reservation in reservations:
+                usage = usages[reservation.usage_id]
+                if status == Reservation.Statuses.COMMITTED:
+                    usage.in_use = max(usage.in_use + reservation.delta, 0)
+                usage.reserved -= reservation.delta
+                usage.updated = now
+            (db_session.query(Reservation)
+             .filter(Reservation.id.in_([reservation.id
+                                         for reservation in reservations]))
+             .update({'status': status, 'updated': now},
+                     synchronize_session=False))
+
+        for reservation in reservations:
+            reservation.status = status
+
+    def commit(self, reservations):
+        """Commit reservations.
+
+        :param reservations: A list of the reservation UUIDs, as
+                             returned by the reserve() method.
+        """
+
+        self._settle(reservations, Reservation.Statuses.COMMITTED)
+
+    def rollback(self, reservations):
+        """Roll back reservations.
+
+        :param reservations: A list of the reservation UUIDs, as
+                             returned by the reserve() method.
+        """
+
+        self._settle(reservations, Reservation.Statuses.ROLLEDBACK)
+
+
 class QuotaEngine(object):
     """Represent the set of recognized quotas."""
 
@@ -249,6 +421,14 @@ class QuotaEngine(object):
         return self._driver.get_all_quotas_by_tenant(tenant_id,
                                                      self._resources)
 
+    def invalidate_quotas(self, tenant_id):
+        """Drop any cached quota limits of the given tenant.
+
+        :param tenant_id: The ID of the tenant whose limits changed.
+        """
+
+        self._driver.invalidate_quotas(tenant_id)
+
     def reserve(self, tenant_id, **deltas):
         """Check quotas and reserve resources.
 
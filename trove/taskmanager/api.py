@@ -110,6 +110,11 @@ class API(proxy.RpcProxy):
         self.cast(self.context, self.make_msg("delete_backup",
                                               backup_id=backup_id))
 
+    def delete_backups(self, backup_ids):
+        LOG.debug("Making async call to delete backups: %s" % backup_ids)
+        self.cast(self.context, self.make_msg("delete_backups",
+                                              backup_ids=backup_ids))
+
     def create_instance(self, instance_id, name, flavor,
                         image_id, databases, users, datastore_manager,
                         packages, volume_size, backup_id=None,
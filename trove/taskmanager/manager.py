@@ -12,6 +12,8 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import eventlet
+
 from trove.common.context import TroveContext
 
 import trove.extensions.mgmt.instances.models as mgmtmodels
@@ -36,6 +38,7 @@ class Manager(periodic_task.PeriodicTasks):
             user=CONF.nova_proxy_admin_user,
             auth_token=CONF.nova_proxy_admin_pass,
             tenant=CONF.nova_proxy_admin_tenant_name)
+        self._exists_publisher = None
         if CONF.exists_notification_transformer:
             self.exists_transformer = importutils.import_object(
                 CONF.exists_notification_transformer,
@@ -74,6 +77,9 @@ class Manager(periodic_task.PeriodicTasks):
     def delete_backup(self, context, backup_id):
         models.BackupTasks.delete_backup(context, backup_id)
 
+    def delete_backups(self, context, backup_ids):
+        models.BackupTasks.delete_backups(context, backup_ids)
+
     def create_backup(self, context, backup_info, instance_id):
         instance_tasks = models.BuiltInstanceTasks.load(context, instance_id)
         instance_tasks.create_backup(backup_info)
@@ -106,5 +112,16 @@ class Manager(periodic_task.PeriodicTasks):
             Push this in Instance Tasks to fetch a report/collection
             :param context: currently None as specied in bin script
             """
-            mgmtmodels.publish_exist_events(self.exists_transformer,
-                                            self.admin_context)
+            if CONF.exists_notification_spread <= 0:
+                mgmtmodels.publish_exist_events(self.exists_transformer,
+                                                self.admin_context)
+                return
+            # A spread out run pauses between batches, so it is kept off
+            # the periodic task loop to avoid holding up the other tasks.
+            if self._exists_publisher and not self._exists_publisher.dead:
+                LOG.warn("Previous exists event run is still in progress, "
+                         "skipping this one.")
+                return
+            self._exists_publisher = eventlet.spawn(
+                mgmtmodels.publish_exist_events, self.exists_transformer,
+                self.admin_context)
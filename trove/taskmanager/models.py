@@ -13,12 +13,16 @@
 #    under the License.
 
 import re
+import time
 import traceback
 import os.path
 
 from heatclient import exc as heat_exceptions
 from cinderclient import exceptions as cinder_exceptions
+import eventlet
+from eventlet import event
 from eventlet import greenthread
+from eventlet import queue
 from novaclient import exceptions as nova_exceptions
 from trove.backup import models as bkup_models
 from trove.common import cfg
@@ -41,6 +45,7 @@ from trove.extensions.mysql import models as mysql_models
 from trove.configuration.models import Configuration
 from trove.extensions.security_group.models import SecurityGroup
 from trove.extensions.security_group.models import SecurityGroupRule
+from trove.guestagent.strategies.storage import get_storage_strategy
 from swiftclient.client import ClientException
 from trove.instance import models as inst_models
 from trove.instance.models import BuiltInstance
@@ -63,6 +68,8 @@ RESIZE_TIME_OUT = CONF.resize_time_out  # seconds.
 REVERT_TIME_OUT = CONF.revert_time_out  # seconds.
 HEAT_TIME_OUT = CONF.heat_time_out  # seconds.
 USAGE_SLEEP_TIME = CONF.usage_sleep_time  # seconds.
+BACKUP_DELETE_CONCURRENCY = CONF.backup_delete_concurrency
+LOCAL_STORAGE_NAMESPACE = 'trove.guestagent.strategies.storage.local'
 HEAT_STACK_SUCCESSFUL_STATUSES = [('CREATE', 'CREATE_COMPLETE')]
 HEAT_RESOURCE_SUCCESSFUL_STATE = 'CREATE_COMPLETE'
 
@@ -70,6 +77,97 @@ use_nova_server_volume = CONF.use_nova_server_volume
 use_heat = CONF.use_heat
 
 
+class ServerDeletionPoller(object):
+    """Waits for nova servers to be deleted.
+
+    Every pending delete of a tenant is checked with a single server list
+    call per poll, instead of one get call per server. A server missing
+    from the list is looked up once more before it counts as deleted, in
+    case the list was cut short by nova's page limit.
+    """
+
+    def __init__(self, interval=2):
+        self.interval = interval
+        self._pending = {}
+        self._clients = {}
+        self._poller = None
+
+    @property
+    def queue_depth(self):
+        return sum(len(waiters) for waiters in self._pending.values())
+
+    def wait(self, client, tenant, server_id, timeout):
+        done = event.Event()
+        self._pending.setdefault(tenant, {})[server_id] = done
+        self._clients[tenant] = client
+        if self._poller is None:
+            self._poller = eventlet.spawn(self._poll)
+        try:
+            with eventlet.Timeout(timeout):
+                done.wait()
+        except eventlet.Timeout:
+            raise PollTimeOut()
+        finally:
+            self._remove(tenant, server_id)
+
+    def _remove(self, tenant, server_id):
+        waiters = self._pending.get(tenant, {})
+        done = waiters.pop(server_id, None)
+        if not waiters:
+            self._pending.pop(tenant, None)
+            self._clients.pop(tenant, None)
+        return done
+
+    def _poll(self):
+        try:
+            while self._pending:
+                greenthread.sleep(self.interval)
+                for tenant in list(self._pending):
+                    # One tenant's failure must not stop the polls of the
+                    # others, which share this green thread.
+                    try:
+                        self._poll_tenant(tenant)
+                    except Exception:
+                        LOG.exception(_("Error polling server deletes of "
+                                        "tenant %s.") % tenant)
+                LOG.debug("%s server deletes pending." % self.queue_depth)
+        finally:
+            self._poller = None
+
+    def _poll_tenant(self, tenant):
+        client = self._clients.get(tenant)
+        if client is None:
+            # Every waiter of the tenant gave up while polling others.
+            return
+        try:
+            servers = dict((server.id, server)
+                           for server in client.servers.list())
+        except Exception:
+            LOG.exception(_("Error listing servers of tenant %s.") % tenant)
+            return
+        for server_id in list(self._pending.get(tenant, {})):
+            server = servers.get(server_id)
+            if server is None:
+                try:
+                    server = client.servers.get(server_id)
+                except nova_exceptions.NotFound:
+                    done = self._remove(tenant, server_id)
+                    # The waiter may have timed out in the meantime.
+                    if done is not None:
+                        done.send(True)
+                    continue
+                except Exception:
+                    LOG.exception(_("Error getting server %s.") % server_id)
+                    continue
+            if server.status.upper() not in ('SHUTDOWN', 'ACTIVE'):
+                LOG.error(_("Server %(server_id)s got into %(status)s status "
+                            "during delete.") %
+                          {'server_id': server_id, 'status': server.status})
+
+
+SERVER_DELETIONS = ServerDeletionPoller()
+
+
 class NotifyMixin(object):
     """Notification Mixin
 
@@ -713,6 +811,34 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
         LOG.debug("begin _delete_resources for id: %s" % self.id)
         server_id = self.db_info.compute_instance_id
         old_server = self.nova_client.servers.get(server_id)
+        # The server and the dns entry are deleted side by side.
+        pool = eventlet.GreenPool()
+        pool.spawn_n(self._timed_step, 'server', self._delete_server)
+        pool.spawn_n(self._timed_step, 'dns entry', self._delete_dns_entry)
+        pool.waitall()
+
+        try:
+            self._timed_step('server wait', SERVER_DELETIONS.wait,
+                             self.nova_client, self.context.tenant,
+                             server_id, CONF.server_delete_time_out)
+        except PollTimeOut:
+            LOG.exception(_("Timout during nova server delete of server: %s") %
+                          server_id)
+        self.send_usage_event('delete',
+                              deleted_at=timeutils.isotime(deleted_at),
+                              server=old_server)
+        LOG.debug("end _delete_resources for id: %s" % self.id)
+
+    def _timed_step(self, step, func, *args):
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            LOG.debug("Delete step '%(step)s' of instance %(id)s took "
+                      "%(seconds).2fs." % {'step': step, 'id': self.id,
+                                           'seconds': time.time() - start})
+
+    def _delete_server(self):
         try:
             if use_heat:
                 # Delete the server via heat
@@ -721,9 +847,11 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
                 heatclient.stacks.delete(name)
             else:
                 self.server.delete()
-        except Exception as ex:
+        except Exception:
             LOG.exception(_("Error during delete compute server %s")
                           % self.server.id)
+
+    def _delete_dns_entry(self):
         try:
             dns_support = CONF.trove_dns_support
             LOG.debug("trove dns support = %s" % dns_support)
@@ -734,30 +862,6 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
             LOG.exception(_("Error during dns entry of instance %(id)s: "
                             "%(ex)s") % {'id': self.db_info.id, 'ex': ex})
 
-            # Poll until the server is gone.
-        def server_is_finished():
-            try:
-                server = self.nova_client.servers.get(server_id)
-                if not self.server_status_matches(['SHUTDOWN', 'ACTIVE'],
-                                                  server=server):
-                    LOG.error(_("Server %(server_id)s got into ERROR status "
-                                "during delete of instance %(instance_id)s!") %
-                              {'server_id': server.id, 'instance_id': self.id})
-                return False
-            except nova_exceptions.NotFound:
-                return True
-
-        try:
-            utils.poll_until(server_is_finished, sleep_time=2,
-                             time_out=CONF.server_delete_time_out)
-        except PollTimeOut:
-            LOG.exception(_("Timout during nova server delete of server: %s") %
-                          server_id)
-        self.send_usage_event('delete',
-                              deleted_at=timeutils.isotime(deleted_at),
-                              server=old_server)
-        LOG.debug("end _delete_resources for id: %s" % self.id)
-
     def server_status_matches(self, expected_status, server=None):
         if not server:
             server = self.server
@@ -952,29 +1056,110 @@ class BackupTasks(object):
             LOG.info(_("Deleting files with prefix: %(cont)s/%(prefix)s") %
                      {'cont': cont, 'prefix': prefix})
             # list files from container/prefix specified by manifest
-            headers, segments = client.get_container(cont, prefix=prefix)
+            headers, segments = client.get_container(cont, prefix=prefix,
+                                                     full_listing=True)
             LOG.debug(headers)
-            for segment in segments:
-                name = segment.get('name')
-                if name:
-                    LOG.info(_("Deleting file: %(cont)s/%(name)s") %
-                             {'cont': cont, 'name': name})
-                    client.delete_object(cont, name)
+            names = [segment.get('name') for segment in segments
+                     if segment.get('name')]
+            cls._delete_objects(context, client, cont, names)
         # Delete the manifest file
         LOG.info(_("Deleting file: %(cont)s/%(filename)s") %
                  {'cont': cont, 'filename': filename})
         client.delete_object(container, filename)
 
+    @classmethod
+    def _delete_objects(cls, context, client, container, names):
+        """Delete objects, up to BACKUP_DELETE_CONCURRENCY at a time."""
+        concurrency = min(BACKUP_DELETE_CONCURRENCY, len(names))
+        if concurrency <= 1:
+            for name in names:
+                LOG.info(_("Deleting file: %(cont)s/%(name)s") %
+                         {'cont': container, 'name': name})
+                client.delete_object(container, name)
+            return
+
+        # A swift connection is not safe to share between green threads
+        clients = queue.LightQueue()
+        clients.put(client)
+        for _i in range(concurrency - 1):
+            clients.put(remote.create_swift_client(context))
+
+        def delete_object(name):
+            worker_client = clients.get()
+            try:
+                worker_client.delete_object(container, name)
+            finally:
+                clients.put(worker_client)
+
+        LOG.info(_("Deleting %(count)s files from %(cont)s") %
+                 {'count': len(names), 'cont': container})
+        pool = eventlet.GreenPool(concurrency)
+        for _result in pool.imap(delete_object, names):
+            pass
+
+    @classmethod
+    def delete_backups(cls, context, backup_ids):
+        """Delete a chain of backups, children before their parents.
+
+        If a backup cannot be deleted the chain stops there, since its
+        ancestors are still needed to restore it, and it and every backup
+        left in the chain are marked DELETE_FAILED so they can be retried.
+        """
+        total = len(backup_ids)
+        for done, backup_id in enumerate(backup_ids, 1):
+            try:
+                cls.delete_backup(context, backup_id)
+            except Exception:
+                LOG.exception(_("Failed to delete backup %(id)s, %(done)s "
+                                "of %(total)s in its chain.") %
+                              {'id': backup_id, 'done': done,
+                               'total': total})
+                cls._mark_delete_failed(context, backup_ids[done - 1:])
+                raise
+            LOG.info(_("Deleted backup %(id)s, %(done)s of %(total)s in "
+                       "its chain.") %
+                     {'id': backup_id, 'done': done, 'total': total})
+
+    @classmethod
+    def _mark_delete_failed(cls, context, backup_ids):
+        for backup_id in backup_ids:
+            try:
+                backup = bkup_models.Backup.get_by_id(context, backup_id)
+                backup.state = bkup_models.BackupState.DELETE_FAILED
+                backup.save()
+            except Exception:
+                LOG.exception(_("Unable to mark backup %s as "
+                                "DELETE_FAILED.") % backup_id)
+
+    @classmethod
+    def delete_files_from_local(cls, context, location):
+        """Delete a backup written by the guest's local storage strategy.
+
+        The location is a path under backup_local_storage_dir, so this only
+        succeeds where that directory is shared with the taskmanager.
+        """
+        storage = get_storage_strategy('LocalStorage',
+                                       LOCAL_STORAGE_NAMESPACE)(context)
+        storage.delete(location)
+
     @classmethod
     def delete_backup(cls, context, backup_id):
-        #delete backup from swift
+        #delete backup from swift, or from local storage if it is a path
         backup = bkup_models.Backup.get_by_id(context, backup_id)
         try:
             filename = backup.filename
-            if filename:
+            if filename and os.path.isabs(backup.location):
+                BackupTasks.delete_files_from_local(context, backup.location)
+            elif filename:
                 BackupTasks.delete_files_from_swift(context, filename)
         except ValueError:
             backup.delete()
+        except OSError as e:
+            LOG.exception(_("Exception deleting from local storage. "
+                            "Details: %s") % e)
+            backup.state = bkup_models.BackupState.DELETE_FAILED
+            backup.save()
+            raise TroveError("Failed to delete local backup files")
         except ClientException as e:
             if e.http_status == 404:
                 # Backup already deleted in swift
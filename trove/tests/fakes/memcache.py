@@ -0,0 +1,74 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+
+class FakeMemcacheClient(object):
+    """In-process stand-in for a python-memcached client with cas enabled.
+
+    Clients created with the same store share their data, like clients of
+    different API workers talking to one memcached server.
+    """
+
+    def __init__(self, store=None):
+        self.store = {} if store is None else store
+        self.cas_ids = {}
+
+    def _lookup(self, key):
+        entry = self.store.get(key)
+        if entry is not None and entry[2] and entry[2] <= time.time():
+            del self.store[key]
+            entry = None
+        return entry
+
+    def _store(self, key, val, time_):
+        entry = self._lookup(key)
+        version = entry[1] + 1 if entry else 1
+        expires_at = time.time() + time_ if time_ else None
+        self.store[key] = (val, version, expires_at)
+
+    def get(self, key):
+        entry = self._lookup(key)
+        return entry[0] if entry else None
+
+    def gets(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        self.cas_ids[key] = entry[1]
+        return entry[0]
+
+    def set(self, key, val, time=0):
+        self._store(key, val, time)
+        return True
+
+    def add(self, key, val, time=0):
+        if self._lookup(key) is not None:
+            return False
+        self._store(key, val, time)
+        return True
+
+    def cas(self, key, val, time=0):
+        if key not in self.cas_ids:
+            return self.set(key, val, time)
+        entry = self._lookup(key)
+        if entry is None or entry[1] != self.cas_ids.pop(key):
+            return False
+        self._store(key, val, time)
+        return True
+
+    def delete(self, key, time=0):
+        self.store.pop(key, None)
+        return True
@@ -18,6 +18,9 @@ Tests dealing with HTTP rate-limiting.
 """
 
 import httplib
+import os
+import shutil
+import tempfile
 from trove.quota.models import Quota
 import testtools
 import webob
@@ -25,12 +28,14 @@ import webob
 from mock import Mock, MagicMock
 import six
 
+from trove.common import exception
 from trove.common import limits
 from trove.common.limits import Limit
 from trove.limits import views
 from trove.limits.service import LimitsController
 from trove.openstack.common import jsonutils
 from trove.quota.quota import QUOTAS
+from trove.tests.fakes.memcache import FakeMemcacheClient
 
 TEST_LIMITS = [
     Limit("GET", "/delayed", "^/delayed", 1, limits.PER_MINUTE),
@@ -482,6 +487,132 @@ class LimiterTest(BaseLimitTestSuite):
         results = list(self._check(5, "PUT", "/anything", "user2"))
         self.assertEqual(expected, results)
 
+    def test_only_verb_limits_checked(self):
+        # Limits defined for other verbs are not evaluated.
+        for limit in self.limiter.levels[None]:
+            limit.pattern = Mock(wraps=limit.pattern)
+        self.limiter.check_for_delay("PUT", "/anything")
+        for limit in self.limiter.levels[None]:
+            self.assertEqual(limit.verb == "PUT",
+                             limit.pattern.match.called)
+
+    def test_idle_users_evicted(self):
+        self.limiter._get_time = Mock(return_value=0.0)
+        list(self._check(3, "PUT", "/anything", "user1"))
+        self.assertTrue("user1" in self.limiter.levels)
+
+        self.limiter._get_time = Mock(return_value=limits.PER_MINUTE + 1.0)
+        self.limiter.check_for_delay("PUT", "/anything", "user2")
+        self.assertFalse("user1" in self.limiter.levels)
+        self.assertTrue("user2" in self.limiter.levels)
+        self.assertTrue("user3" in self.limiter.levels)
+
+    def test_active_users_kept(self):
+        self.limiter._get_time = Mock(return_value=0.0)
+        self.limiter.check_for_delay("PUT", "/anything", "user1")
+
+        self.limiter._get_time = Mock(return_value=limits.PER_MINUTE - 1.0)
+        self.limiter.check_for_delay("PUT", "/anything", "user2")
+        self.assertTrue("user1" in self.limiter.levels)
+
+
+class SharedLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for `limits.SharedLimiter` and its bucket backends.
+    """
+
+    def setUp(self):
+        super(SharedLimiterTest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _workers(self, backends, batch_size=1):
+        workers = []
+        for backend in backends:
+            limiter = limits.SharedLimiter(TEST_LIMITS, backend=backend)
+            limiter._get_time = Mock(return_value=0.0)
+            limiter.batch_size = batch_size
+            workers.append(limiter)
+        return workers
+
+    def _check_round_robin(self, workers, num, verb="PUT", url="/anything"):
+        return [workers[x % len(workers)].check_for_delay(verb, url)[0]
+                for x in xrange(num)]
+
+    def _mmap_backends(self, num):
+        path = os.path.join(self.tmp_dir, 'rate_limits')
+        return [limits.MmapBucketBackend(path, slots=64)
+                for x in xrange(num)]
+
+    def _memcached_backends(self, num):
+        store = {}
+        return [limits.MemcachedBucketBackend(FakeMemcacheClient(store))
+                for x in xrange(num)]
+
+    def test_leak_matches_limit(self):
+        limit = Limit("PUT", "*", "", 10, limits.PER_MINUTE)
+        limit._get_time = Mock(return_value=0.0)
+        state = None
+        for x in xrange(12):
+            granted, state, delay = limits.leak(limit, state, 0.0)
+            self.assertEqual(limit("PUT", "/anything"), delay)
+
+    def test_mmap_workers_share_limits(self):
+        workers = self._workers(self._mmap_backends(3))
+        expected = [None] * 10 + [6.0] * 2
+        self.assertEqual(expected, self._check_round_robin(workers, 12))
+
+    def test_memcached_workers_share_limits(self):
+        workers = self._workers(self._memcached_backends(3))
+        expected = [None] * 10 + [6.0] * 2
+        self.assertEqual(expected, self._check_round_robin(workers, 12))
+
+    def test_users_do_not_share_buckets(self):
+        limiter = self._workers(self._memcached_backends(1))[0]
+        for x in xrange(10):
+            limiter.check_for_delay("PUT", "/anything", "user1")
+        delay, error = limiter.check_for_delay("PUT", "/anything", "user2")
+        self.assertEqual(None, delay)
+
+    def test_shared_bucket_leaks(self):
+        workers = self._workers(self._mmap_backends(2))
+        self._check_round_robin(workers, 11)
+        for worker in workers:
+            worker._get_time = Mock(return_value=6.0)
+        self.assertEqual([None, 6.0], self._check_round_robin(workers, 2))
+
+    def test_batched_takes(self):
+        backend = self._memcached_backends(1)[0]
+        backend.take = Mock(wraps=backend.take)
+        limiter = self._workers([backend], batch_size=5)[0]
+
+        results = [limiter.check_for_delay("PUT", "/anything")[0]
+                   for x in xrange(11)]
+
+        self.assertEqual([None] * 10 + [6.0], results)
+        self.assertEqual(3, backend.take.call_count)
+
+    def test_unused_batch_expires(self):
+        backend = self._memcached_backends(1)[0]
+        backend.take = Mock(wraps=backend.take)
+        limiter = self._workers([backend], batch_size=5)[0]
+        limiter.check_for_delay("PUT", "/anything")
+
+        limiter._get_time = Mock(return_value=60.0)
+        limiter.check_for_delay("PUT", "/anything")
+        self.assertEqual(2, backend.take.call_count)
+
+    def test_get_limits_reports_shared_bucket(self):
+        workers = self._workers(self._mmap_backends(2))
+        self._check_round_robin(workers, 4)
+        put = [limit for limit in workers[1].get_limits()
+               if limit['verb'] == 'PUT'][0]
+        self.assertEqual(6, put['remaining'])
+
+    def test_unknown_backend(self):
+        self.assertRaises(exception.TroveError,
+                          limits.get_bucket_backend, 'redis')
+
 
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
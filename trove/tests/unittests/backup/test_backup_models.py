@@ -222,6 +222,59 @@ class BackupDeleteTest(testtools.TestCase):
                                   self.context, 'backup_id')
 
 
+class BackupChainDeleteTest(testtools.TestCase):
+    def setUp(self):
+        super(BackupChainDeleteTest, self).setUp()
+        util.init_db()
+        self.context, self.instance_id = _prep_conf(utils.utcnow())
+        self.root = self._create()
+        self.child = self._create(parent_id=self.root.id)
+        self.grandchild = self._create(parent_id=self.child.id)
+        self.other = self._create()
+
+    def tearDown(self):
+        super(BackupChainDeleteTest, self).tearDown()
+        query = models.DBBackup.query()
+        query.filter_by(instance_id=self.instance_id).delete()
+
+    def _create(self, parent_id=None, state='COMPLETED'):
+        return models.DBBackup.create(tenant_id=self.context.tenant,
+                                      name=BACKUP_NAME,
+                                      state=state,
+                                      instance_id=self.instance_id,
+                                      parent_id=parent_id,
+                                      deleted=False,
+                                      size=2.0,
+                                      location=BACKUP_LOCATION)
+
+    def test_delete_chain(self):
+        with patch.object(models.Backup, 'verify_swift_auth_token'):
+            with patch.object(models, 'run_with_quotas') as run_with_quotas:
+                models.Backup.delete(self.context, self.root.id)
+        tenant, deltas, delete_resources = run_with_quotas.call_args[0]
+        self.assertEqual({'backups': -3}, deltas)
+        with patch.object(api.API, 'delete_backups') as delete_backups:
+            delete_resources()
+        delete_backups.assert_called_once_with(
+            [self.grandchild.id, self.child.id, self.root.id])
+
+    def test_delete_leaf(self):
+        with patch.object(models.Backup, 'verify_swift_auth_token'):
+            with patch.object(models, 'run_with_quotas') as run_with_quotas:
+                models.Backup.delete(self.context, self.grandchild.id)
+        tenant, deltas, delete_resources = run_with_quotas.call_args[0]
+        self.assertEqual({'backups': -1}, deltas)
+
+    def test_delete_chain_with_running_child(self):
+        self._create(parent_id=self.child.id, state='BUILDING')
+        with patch.object(models.Backup, 'verify_swift_auth_token'):
+            with patch.object(models, 'run_with_quotas') as run_with_quotas:
+                self.assertRaises(exception.UnprocessableEntity,
+                                  models.Backup.delete,
+                                  self.context, self.root.id)
+        self.assertFalse(run_with_quotas.called)
+
+
 class BackupORMTest(testtools.TestCase):
     def setUp(self):
         super(BackupORMTest, self).setUp()
@@ -338,37 +391,52 @@ class PaginationTests(testtools.TestCase):
     def test_pagination_list(self):
         # page one
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(20, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen = [backup.id for backup in backups]
         # page two
-        self.context.marker = 20
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen.extend(backup.id for backup in backups)
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
+        seen.extend(backup.id for backup in backups)
+        self.assertEqual(50, len(set(seen)))
 
     def test_pagination_list_for_instance(self):
         # page one
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
-        self.assertEqual(20, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
         # page two
-        self.context.marker = 20
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
 
+    def test_pagination_offset_marker(self):
+        self.context.marker = 40
+        backups, marker = models.Backup.list(self.context)
+        self.assertIsNone(marker)
+        self.assertEqual(10, len(backups))
+
+    def test_pagination_invalid_marker(self):
+        self.context.marker = 'not-a-marker'
+        self.assertRaises(exception.BadRequest,
+                          models.Backup.list, self.context)
+
 
 class OrderingTests(testtools.TestCase):
 
@@ -399,6 +399,38 @@ class BackupAgentTest(testtools.TestCase):
                                 ANY,
                                 meta))
 
+    def test_backup_incremental_parent_with_codec_metrics(self):
+        parent_metadata = {'lsn': '54321',
+                           'codec_name': 'parallel_gzip',
+                           'codec_bytes_in': '2048',
+                           'codec_throughput': '1024'}
+        runner = mysql_impl.InnoBackupExIncremental
+        patches = [patch.object(backupagent, 'get_storage_strategy',
+                                return_value=MockSwift),
+                   patch.object(MockSwift, 'load_metadata',
+                                return_value=parent_metadata),
+                   patch.object(runner, 'run'),
+                   patch.object(runner, 'metadata',
+                                return_value={'lsn': '12345'}),
+                   patch.object(runner, '__exit__', return_value=False)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        agent = backupagent.BackupAgent()
+        bkup_info = {'id': '123',
+                     'location': 'fake-location',
+                     'type': 'InnoBackupEx',
+                     'checksum': 'fake-checksum',
+                     'datastore': 'mysql',
+                     'datastore_version': '5.5',
+                     'parent': {'location': 'fake', 'checksum': 'md5'}}
+        with patch.object(MockSwift, 'save_metadata') as save_metadata:
+            agent.execute_backup(TroveContext(), bkup_info)
+        self.assertEqual({'lsn': '12345',
+                          'datastore': 'mysql',
+                          'datastore_version': '5.5'},
+                         save_metadata.call_args[0][1])
+
     def test_backup_incremental_bad_metadata(self):
         with patch.object(backupagent, 'get_storage_strategy',
                           return_value=MockSwift):
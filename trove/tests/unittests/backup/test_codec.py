@@ -0,0 +1,88 @@
+#    Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gzip
+import StringIO
+
+import testtools
+from mock import patch
+
+from trove.guestagent.strategies.backup import mysql_impl
+from trove.guestagent.strategies.codec import gzip_impl
+from trove.guestagent.strategies.codec.gzip_impl import ParallelGzip
+
+
+class ParallelGzipTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ParallelGzipTest, self).setUp()
+        patches = [patch.object(gzip_impl, 'BLOCK_SIZE', 1000),
+                   patch.object(gzip_impl, 'THREADS', 3)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.data = ''.join(str(i) for i in range(5000))
+
+    def _encode(self, codec, chunk_size=512):
+        chunks = []
+        chunk = codec.read(chunk_size)
+        while chunk:
+            self.assertTrue(len(chunk) <= chunk_size)
+            chunks.append(chunk)
+            chunk = codec.read(chunk_size)
+        return ''.join(chunks)
+
+    def test_output_is_gzip(self):
+        codec = ParallelGzip(StringIO.StringIO(self.data))
+        encoded = self._encode(codec)
+        decoded = gzip.GzipFile(fileobj=StringIO.StringIO(encoded)).read()
+        self.assertEqual(self.data, decoded)
+
+    def test_chunks_span_blocks(self):
+        expected = self._encode(ParallelGzip(StringIO.StringIO(self.data)))
+        for chunk_size in (7, 5000):
+            codec = ParallelGzip(StringIO.StringIO(self.data))
+            self.assertEqual(expected, self._encode(codec, chunk_size))
+
+    def test_empty_stream(self):
+        codec = ParallelGzip(StringIO.StringIO(''))
+        self.assertEqual('', self._encode(codec))
+
+    def test_metrics(self):
+        codec = ParallelGzip(StringIO.StringIO(self.data))
+        encoded = self._encode(codec)
+        metrics = codec.metrics()
+        self.assertEqual('parallel_gzip', metrics['codec_name'])
+        self.assertEqual(len(self.data), metrics['codec_bytes_in'])
+        self.assertEqual(len(encoded), metrics['codec_bytes_out'])
+
+
+class BackupRunnerCodecTest(testtools.TestCase):
+
+    def test_codec_replaces_gzip_pipeline(self):
+        with patch.multiple(mysql_impl.InnoBackupEx,
+                            is_zipped=True, is_encrypted=False):
+            runner = mysql_impl.InnoBackupEx('12345', extra_opts='',
+                                             codec='ParallelGzip')
+            self.assertTrue(runner.manifest.endswith('.gz'))
+        self.assertEqual(ParallelGzip, runner.codec_class)
+        self.assertNotIn('gzip', runner.command)
+
+    def test_codec_not_used_with_encryption(self):
+        with patch.multiple(mysql_impl.InnoBackupEx,
+                            is_zipped=True, is_encrypted=True):
+            runner = mysql_impl.InnoBackupEx('12345', extra_opts='',
+                                             codec='ParallelGzip')
+        self.assertIsNone(runner.codec_class)
+        self.assertIn('| gzip', runner.command)
@@ -15,6 +15,9 @@
 import testtools
 from mock import Mock, MagicMock, patch
 import hashlib
+import os
+import shutil
+import tempfile
 
 from trove.common.context import TroveContext
 from trove.tests.fakes.swift import FakeSwiftConnection
@@ -22,9 +25,13 @@ from trove.tests.unittests.backup.test_backupagent \
     import MockBackup as MockBackupRunner
 from trove.guestagent.strategies.storage.swift \
     import SwiftDownloadIntegrityError
+from trove.guestagent.strategies.storage import local
 from trove.guestagent.strategies.storage import swift
 from trove.guestagent.strategies.storage.swift import SwiftStorage
 from trove.guestagent.strategies.storage.swift import StreamReader
+from trove.guestagent.strategies.storage.local import LocalStorage
+from trove.guestagent.strategies.storage.local \
+    import LocalStorageIntegrityError
 
 
 class SwiftStorageSaveChecksumTests(testtools.TestCase):
@@ -129,6 +136,57 @@ class SwiftStorageSaveChecksumTests(testtools.TestCase):
                          "Incorrect swift location was returned.")
 
 
+class MockChunkedStream(object):
+    """Stream returning a fixed number of small chunks."""
+
+    def __init__(self, chunks=5, chunk_size=100):
+        self.chunks = [str(i) * chunk_size for i in range(chunks)]
+
+    def read(self, chunk_size):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return ''
+
+
+class SwiftStorageConcurrentSaveTests(testtools.TestCase):
+    """SwiftStorage.save uploading several segments at once."""
+
+    def setUp(self):
+        super(SwiftStorageConcurrentSaveTests, self).setUp()
+        self.context = TroveContext()
+        self.swift_client = FakeSwiftConnection()
+        patches = [patch.object(swift, 'create_swift_client',
+                                return_value=self.swift_client),
+                   patch.object(swift, 'UPLOAD_CONCURRENCY', 3),
+                   patch.object(swift, 'UPLOAD_SEGMENT_SIZE', 256),
+                   patch.object(swift, 'CHUNK_SIZE', 100)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_swift_concurrent_save(self):
+        storage_strategy = SwiftStorage(self.context)
+        success, note, checksum, location = storage_strategy.save(
+            '123.gz.enc', MockChunkedStream())
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual(3, len(self.swift_client.container_objects))
+        self.assertEqual('2' * 100 + '3' * 100,
+                         self.swift_client.container_objects['123_00000001'])
+        expected = hashlib.md5()
+        for name in sorted(self.swift_client.container_objects):
+            expected.update(hashlib.md5(
+                self.swift_client.container_objects[name]).hexdigest())
+        self.assertEqual(expected.hexdigest(), checksum)
+
+    def test_swift_concurrent_segment_checksum_etag_mismatch(self):
+        storage_strategy = SwiftStorage(self.context)
+        success, note, checksum, location = storage_strategy.save(
+            'bad_segment_etag_123.gz.enc', MockChunkedStream())
+        self.assertFalse(success, "The backup should have failed!")
+        self.assertTrue(note.startswith("Error saving data to Swift!"))
+        self.assertIsNone(checksum)
+
+
 class SwiftStorageUtils(testtools.TestCase):
 
     def setUp(self):
@@ -208,6 +266,58 @@ class SwiftStorageLoad(testtools.TestCase):
                           backup_checksum)
 
 
+class SwiftStorageConcurrentLoadTests(testtools.TestCase):
+    """SwiftStorage.load fetching ranges of the backup segments at once."""
+
+    def setUp(self):
+        super(SwiftStorageConcurrentLoadTests, self).setUp()
+        self.context = TroveContext()
+        self.segments = {'123_00000000': 'a' * 250,
+                         '123_00000001': 'b' * 250,
+                         '123_00000002': 'c' * 40}
+        self.swift_client = MagicMock()
+        self.swift_client.head_object.return_value = {
+            'etag': '"fake-md5-sum"',
+            'x-object-manifest': 'backups/123_'}
+        self.swift_client.get_container.return_value = ({}, [
+            {'name': name, 'bytes': len(contents),
+             'hash': hashlib.md5(contents).hexdigest()}
+            for name, contents in self.segments.items()])
+        self.swift_client.get_object.side_effect = self._get_range
+        patches = [patch.object(swift, 'create_swift_client',
+                                return_value=self.swift_client),
+                   patch.object(swift, 'DOWNLOAD_CONCURRENCY', 3),
+                   patch.object(swift, 'DOWNLOAD_RANGE_SIZE', 100)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _get_range(self, container, name, headers=None):
+        start, end = headers['Range'][len('bytes='):].split('-')
+        return {}, self.segments[name][int(start):int(end) + 1]
+
+    def test_concurrent_load(self):
+        storage_strategy = SwiftStorage(self.context)
+        stream = storage_strategy.load('/backup/location/123', 'fake-md5-sum')
+        self.assertEqual('a' * 250 + 'b' * 250 + 'c' * 40, ''.join(stream))
+        self.swift_client.get_container.assert_called_once_with(
+            'backups', prefix='123_', full_listing=True)
+        self.assertEqual(7, self.swift_client.get_object.call_count)
+
+    def test_concurrent_load_segment_checksum_mismatch(self):
+        self.segments['123_00000001'] = 'b' * 249 + 'x'
+        storage_strategy = SwiftStorage(self.context)
+        stream = storage_strategy.load('/backup/location/123', 'fake-md5-sum')
+        self.assertRaises(SwiftDownloadIntegrityError, ''.join, stream)
+
+    def test_concurrent_load_manifest_checksum_mismatch(self):
+        storage_strategy = SwiftStorage(self.context)
+        self.assertRaises(SwiftDownloadIntegrityError,
+                          storage_strategy.load,
+                          '/backup/location/123', 'other-md5-sum')
+        self.assertFalse(self.swift_client.get_object.called)
+
+
 class MockBackupStream(MockBackupRunner):
 
     def read(self, chunk_size):
@@ -319,3 +429,68 @@ class SwiftMetadataTests(testtools.TestCase):
         }
         self.swift_client.post_object.assert_called_with(
             'backups', 'mybackup.tar', headers=headers)
+
+
+class LocalStorageTests(testtools.TestCase):
+    """LocalStorage keeps backups in a directory of the guest."""
+
+    def setUp(self):
+        super(LocalStorageTests, self).setUp()
+        self.backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.backup_dir)
+        patches = [patch.object(local, 'BACKUP_DIR', self.backup_dir),
+                   patch.object(local, 'CHUNK_SIZE', 128)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.storage = LocalStorage(TroveContext())
+
+    def test_save_and_load(self):
+        stream = MockChunkedStream()
+        success, note, checksum, location = self.storage.save('123.gz',
+                                                              stream)
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual(os.path.join(self.backup_dir, '123.gz'), location)
+        data = ''.join(str(i) * 100 for i in range(5))
+        self.assertEqual(hashlib.md5(data).hexdigest(), checksum)
+        chunks = list(self.storage.load(location, checksum))
+        self.assertEqual(data, ''.join(chunks))
+        self.assertEqual(4, len(chunks))
+
+    def test_load_checksum_mismatch(self):
+        success, note, checksum, location = self.storage.save(
+            '123.gz', MockChunkedStream())
+        self.assertRaises(LocalStorageIntegrityError,
+                          self.storage.load, location, 'other-md5-sum')
+
+    def test_load_verifies_checksum_in_chunks(self):
+        success, note, checksum, location = self.storage.save(
+            '123.gz', MockChunkedStream())
+        with patch.object(local.greenthread, 'sleep') as sleep:
+            list(self.storage.load(location, checksum))
+        self.assertEqual(4, sleep.call_count)
+
+    def test_delete(self):
+        success, note, checksum, location = self.storage.save(
+            '123.gz', MockChunkedStream())
+        self.storage.save_metadata(location, {'lsn': '1234'})
+        self.storage.delete(location)
+        self.assertEqual([], os.listdir(self.backup_dir))
+        # Deleting again finds nothing to remove and succeeds
+        self.storage.delete(location)
+
+    def test_save_failure(self):
+        stream = Mock()
+        stream.read.side_effect = IOError('broken pipe')
+        success, note, checksum, location = self.storage.save('123.gz',
+                                                              stream)
+        self.assertFalse(success, "The backup should have failed!")
+        self.assertIsNone(checksum)
+        self.assertEqual([], os.listdir(self.backup_dir))
+
+    def test_metadata(self):
+        location = os.path.join(self.backup_dir, '123.gz')
+        self.assertEqual({}, self.storage.load_metadata(location, None))
+        self.storage.save_metadata(location, {'lsn': '1234'})
+        self.assertEqual({'lsn': '1234'},
+                         self.storage.load_metadata(location, None))
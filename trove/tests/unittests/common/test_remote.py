@@ -16,7 +16,10 @@
 #    under the License.
 #
 
+import datetime
+
 from mock import MagicMock
+from mock import patch
 import testtools
 from testtools import matchers
 
@@ -27,6 +30,8 @@ from trove.common.context import TroveContext
 from trove.common import remote
 from trove.common import exception
 from trove.common import cfg
+from trove.common import utils
+from trove.openstack.common import timeutils
 
 
 class TestRemote(testtools.TestCase):
@@ -638,3 +643,70 @@ class TestEndpoints(testtools.TestCase):
                                        service_type='object-store',
                                        endpoint_region='RegionOne')
         self.assertEqual('http://publicURL/', endpoint)
+
+
+class TestRemoteCaches(testtools.TestCase):
+
+    def setUp(self):
+        super(TestRemoteCaches, self).setUp()
+        self.service_catalog = [
+            {'endpoints': [{'publicURL': 'http://publicURL/',
+                            'region': 'RegionOne'},
+                           {'publicURL': 'http://publicURL2/',
+                            'region': 'RegionTwo'}],
+             'type': 'compute'}]
+        remote.ENDPOINT_CACHE.clear()
+        self.addCleanup(remote.ENDPOINT_CACHE.clear)
+        cache_patch = patch.object(remote, 'CLIENT_CACHE',
+                                   utils.ExpiringCache(ttl=600))
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        self.factory = MagicMock(side_effect=lambda context: object(),
+                                 __name__='factory')
+        self.create = remote.cached_client('test', self.factory)
+
+    def _context(self, token='token', expires_in=None):
+        expires = None
+        if expires_in is not None:
+            expires = timeutils.isotime(
+                timeutils.utcnow() + datetime.timedelta(seconds=expires_in))
+        return TroveContext(tenant='123', user='user', auth_token=token,
+                            auth_token_expires=expires)
+
+    def test_endpoint_memoized(self):
+        with patch.object(remote, '_find_endpoint',
+                          wraps=remote._find_endpoint) as find:
+            for region in ['RegionOne', 'RegionOne', 'RegionTwo']:
+                remote.get_endpoint(self.service_catalog,
+                                    service_type='compute',
+                                    endpoint_region=region)
+        self.assertEqual(2, find.call_count)
+        self.assertEqual('http://publicURL2/',
+                         remote.get_endpoint(self.service_catalog,
+                                             service_type='compute',
+                                             endpoint_region='RegionTwo'))
+
+    def test_client_reused(self):
+        client = self.create(self._context())
+        self.assertIs(client, self.create(self._context()))
+        self.assertEqual(1, self.factory.call_count)
+
+    def test_client_per_token(self):
+        client = self.create(self._context())
+        self.assertIsNot(client, self.create(self._context('token2')))
+
+    def test_client_not_cached_near_token_expiry(self):
+        self.create(self._context(expires_in=30))
+        self.create(self._context(expires_in=30))
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_client_cached_until_token_expiry(self):
+        self.create(self._context(expires_in=3600))
+        self.create(self._context(expires_in=3600))
+        self.assertEqual(1, self.factory.call_count)
+
+    def test_cache_disabled(self):
+        with patch.object(remote, 'CLIENT_CACHE', utils.ExpiringCache(ttl=0)):
+            self.create(self._context())
+            self.create(self._context())
+        self.assertEqual(2, self.factory.call_count)
@@ -0,0 +1,99 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from mock import patch
+import testtools
+
+from trove.common import exception
+from trove.common import utils
+
+
+class TestExpiringCache(testtools.TestCase):
+
+    def test_get_set(self):
+        cache = utils.ExpiringCache(ttl=10)
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIn('a', cache)
+        self.assertIsNone(cache.get('b'))
+
+    def test_expiry(self):
+        cache = utils.ExpiringCache(ttl=10)
+        with patch('time.time', return_value=100):
+            cache.set('a', 1)
+        with patch('time.time', return_value=111):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+    def test_disabled(self):
+        cache = utils.ExpiringCache(ttl=0)
+        cache.set('a', 1)
+        self.assertFalse(cache.enabled)
+        self.assertIsNone(cache.get('a'))
+
+    def test_evicts_least_recently_used(self):
+        cache = utils.ExpiringCache(max_size=10)
+        for i in range(10):
+            cache.set(i, i)
+        cache.get(0)
+        cache.set(10, 10)
+        self.assertEqual(9, len(cache))
+        self.assertIn(0, cache)
+        self.assertNotIn(1, cache)
+        self.assertIn(10, cache)
+
+    def test_pop(self):
+        cache = utils.ExpiringCache()
+        cache.set('a', 1)
+        self.assertEqual(1, cache.pop('a'))
+        self.assertIsNone(cache.pop('a'))
+
+
+class TestFanOut(testtools.TestCase):
+
+    def test_results_and_failures(self):
+        def double(item):
+            if item == 3:
+                raise ValueError(item)
+            return item * 2
+
+        results, failures = utils.fan_out(double, range(5), concurrency=2)
+        self.assertEqual({0: 0, 1: 2, 2: 4, 4: 8}, results)
+        self.assertEqual([3], list(failures))
+        self.assertIsInstance(failures[3], ValueError)
+
+    def test_concurrency_is_bounded(self):
+        running = []
+        peak = []
+
+        def call(item):
+            running.append(item)
+            peak.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(item)
+
+        utils.fan_out(call, range(10), concurrency=3)
+        self.assertEqual(3, max(peak))
+
+    def test_timeout(self):
+        def call(item):
+            if item == 'slow':
+                eventlet.sleep(1)
+            return item
+
+        results, failures = utils.fan_out(call, ['fast', 'slow'],
+                                          timeout=0.05)
+        self.assertEqual({'fast': 'fast'}, results)
+        self.assertIsInstance(failures['slow'], exception.PollTimeOut)
@@ -13,12 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 #
+import jsonschema
+from mock import patch
 import trove.common.wsgi as wsgi
 import webob
 
 import testtools
 from testtools.matchers import Equals, Is, Not
 
+from trove.common import apischema
+from trove.common import exception
+from trove.openstack.common import jsonutils
+
 
 class TestWsgi(testtools.TestCase):
     def test_process_request(self):
@@ -41,3 +47,88 @@ class TestWsgi(testtools.TestCase):
         self.assertThat(ctx.user, Equals(user_id))
         self.assertThat(ctx.auth_token, Equals(token))
         self.assertEqual(0, len(ctx.service_catalog))
+
+
+class FakeController(wsgi.Controller):
+    schemas = apischema.user
+
+
+class TestControllerValidation(testtools.TestCase):
+
+    def setUp(self):
+        super(TestControllerValidation, self).setUp()
+        self.controller = FakeController()
+        self.body = {"users": [{"name": "bob", "password": "secret",
+                                "databases": [{"name": "db1"}]}]}
+        wsgi.Controller._validators.clear()
+        self.addCleanup(wsgi.Controller._validators.clear)
+
+    def test_validator_built_once(self):
+        with patch.object(jsonschema, 'Draft4Validator',
+                          wraps=jsonschema.Draft4Validator) as validator:
+            for _ in range(100):
+                self.controller.validate_request('create',
+                                                 {'body': self.body})
+        self.assertEqual(1, validator.call_count)
+
+    def test_load_validators(self):
+        self.controller.load_validators()
+        schemas = [apischema.user['create'], apischema.user['update'],
+                   apischema.user['update_all']['users'],
+                   apischema.user['update_all']['databases']]
+        for schema in schemas:
+            self.assertTrue(id(schema) in wsgi.Controller._validators)
+
+    def test_invalid_body(self):
+        body = {"users": [{"name": "bob"}]}
+        error = self.assertRaises(exception.BadRequest,
+                                  self.controller.validate_request,
+                                  'create', {'body': body})
+        self.assertTrue("'password' is a required property"
+                        in error.message)
+
+
+class TestStreamedResponse(testtools.TestCase):
+
+    def setUp(self):
+        super(TestStreamedResponse, self).setUp()
+        self.serializer = wsgi.TroveResponseSerializer()
+        self.items = [{'id': str(i), 'name': 'instance-%s' % i}
+                      for i in range(1000)]
+
+    def _serialize(self, items):
+        data = {'instances': wsgi.StreamedList(iter(items)),
+                'links': [{'rel': 'next', 'href': 'https://next'}]}
+        return self.serializer.serialize(wsgi.Result(data, 200),
+                                         'application/json', 'index')
+
+    def test_streamed_body(self):
+        response = self._serialize(self.items)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual({'instances': self.items,
+                          'links': [{'rel': 'next', 'href': 'https://next'}]},
+                         jsonutils.loads(response.body))
+
+    def test_streamed_in_chunks(self):
+        with patch.object(wsgi.TroveResponseSerializer, 'STREAM_CHUNK_SIZE',
+                          1024):
+            chunks = list(self._serialize(self.items).app_iter)
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) >= 1024 for chunk in chunks[:-1]))
+
+    def test_items_serialized_lazily(self):
+        serialized = []
+
+        def items():
+            for item in self.items[:2]:
+                serialized.append(item)
+                yield item
+
+        response = self._serialize(items())
+        self.assertEqual([], serialized)
+        self.assertTrue(response.body)
+        self.assertEqual(self.items[:2], serialized)
+
+    def test_empty_list(self):
+        response = self._serialize([])
+        self.assertEqual([], jsonutils.loads(response.body)['instances'])
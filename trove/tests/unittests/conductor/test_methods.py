@@ -12,12 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from mock import patch
 import testtools
 from trove.backup import models as bkup_models
 from trove.common import exception as t_exception
 from trove.common import utils
 from trove.common.instance import ServiceStatuses
 from trove.conductor import manager as conductor_manager
+from trove.conductor.models import LastSeen
 from trove.guestagent.common import timeutils
 from trove.instance import models as t_models
 from trove.tests.unittests.util import util
@@ -188,3 +190,112 @@ class ConductorMethodTests(testtools.TestCase):
                                     sent=past, name=new_name)
         bkup = self._get_backup(bkup_id)
         self.assertEqual(old_name, bkup.name)
+
+    # --- Tests for batched heartbeats ---
+
+    def _batch_heartbeats(self):
+        heartbeats = conductor_manager.HeartbeatBuffer(1)
+        self.cond_mgr.heartbeats = heartbeats
+        return patch.object(heartbeats, '_start_flusher')
+
+    def test_batched_heartbeat_newest_written(self):
+        new_p = {'service_status': ServiceStatuses.NEW.description}
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        iss_id = self._create_iss()
+        now = timeutils.float_utcnow()
+        with self._batch_heartbeats():
+            self.cond_mgr.heartbeat(None, self.instance_id, build_p,
+                                    sent=now + 60)
+            self.cond_mgr.heartbeat(None, self.instance_id, new_p, sent=now)
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+        self.cond_mgr.heartbeats.flush()
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         self._get_iss(iss_id).status)
+        self.assertEqual(2, self.cond_mgr.heartbeats.received)
+        self.assertEqual(1, self.cond_mgr.heartbeats.coalesced)
+        self.assertEqual(1, self.cond_mgr.heartbeats.discarded)
+        self.assertEqual(1, self.cond_mgr.heartbeats.written)
+
+    def test_batched_heartbeat_older_timestamp_discarded(self):
+        new_p = {'service_status': ServiceStatuses.NEW.description}
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        iss_id = self._create_iss()
+        now = timeutils.float_utcnow()
+        with self._batch_heartbeats():
+            self.cond_mgr.heartbeat(None, self.instance_id, new_p, sent=now)
+            self.cond_mgr.heartbeats.flush()
+            self.cond_mgr.heartbeat(None, self.instance_id, build_p,
+                                    sent=now - 60)
+            self.cond_mgr.heartbeats.flush()
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+        self.assertEqual(1, self.cond_mgr.heartbeats.discarded)
+
+    def test_batched_last_seen_written_in_bulk(self):
+        now = timeutils.float_utcnow()
+        stored = utils.generate_uuid()
+        later = utils.generate_uuid()
+        new = utils.generate_uuid()
+        LastSeen.create(stored, 'heartbeat', now - 60)
+        LastSeen.create(later, 'heartbeat', now + 60)
+        with self._batch_heartbeats():
+            for instance_id in (stored, later, new):
+                self.cond_mgr.heartbeat(None, instance_id, {}, sent=now)
+            with patch.object(LastSeen, 'save_newer') as save_newer:
+                self.cond_mgr.heartbeats.flush()
+        self.assertFalse(save_newer.called)
+        self.assertEqual(now, float(LastSeen.load(stored, 'heartbeat').sent))
+        self.assertEqual(now + 60,
+                         float(LastSeen.load(later, 'heartbeat').sent))
+        self.assertEqual(now, float(LastSeen.load(new, 'heartbeat').sent))
+        self.assertEqual(1, self.cond_mgr.heartbeats.discarded)
+
+    def test_batched_heartbeat_bogus_status(self):
+        with self._batch_heartbeats():
+            self.assertRaises(ValueError, self.cond_mgr.heartbeat,
+                              None, self.instance_id,
+                              {'service_status': 'potato salad'})
+        self.assertEqual({}, self.cond_mgr.heartbeats.pending)
+
+    # --- Tests for the in-memory last seen cache ---
+
+    def test_cached_heartbeat_older_timestamp_discarded(self):
+        self.cond_mgr.last_seen = conductor_manager.LastSeenCache(10)
+        new_p = {'service_status': ServiceStatuses.NEW.description}
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        iss_id = self._create_iss()
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, new_p, sent=now)
+        with patch.object(LastSeen, 'load_all') as load_all:
+            self.cond_mgr.heartbeat(None, self.instance_id, build_p,
+                                    sent=now - 60)
+        self.assertFalse(load_all.called)
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+
+    def test_cached_last_seen_written_behind(self):
+        self.cond_mgr.last_seen = conductor_manager.LastSeenCache(10)
+        self._create_iss()
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, {}, sent=now)
+        self.assertIsNone(LastSeen.load(self.instance_id, 'heartbeat'))
+        self.cond_mgr.flush_last_seen(None)
+        seen = LastSeen.load(self.instance_id, 'heartbeat')
+        self.assertEqual(now, float(seen.sent))
+
+    def test_cached_flush_keeps_later_time_from_table(self):
+        now = timeutils.float_utcnow()
+        cache = conductor_manager.LastSeenCache(10)
+        cache.update(self.instance_id, 'heartbeat', now - 60)
+        LastSeen.create(self.instance_id, 'heartbeat', now)
+        cache.flush()
+        seen = LastSeen.load(self.instance_id, 'heartbeat')
+        self.assertEqual(now, float(seen.sent))
+        self.assertEqual(now, cache.get(self.instance_id, 'heartbeat'))
+
+    def test_cached_last_seen_rewarmed_from_table(self):
+        now = timeutils.float_utcnow()
+        LastSeen.create(self.instance_id, 'update_backup', now)
+        cache = conductor_manager.LastSeenCache(10)
+        self.assertEqual(now, cache.get(self.instance_id, 'update_backup'))
+        with patch.object(LastSeen, 'load_all') as load_all:
+            cache.get(self.instance_id, 'update_backup')
+        self.assertFalse(load_all.called)
@@ -13,6 +13,7 @@
 #    under the License.
 
 import os
+import sqlite3
 from uuid import uuid4
 import time
 from mock import Mock
@@ -25,6 +26,7 @@ from testtools.matchers import Is
 from testtools.matchers import Equals
 from testtools.matchers import Not
 from trove.common.exception import ProcessExecutionError
+from trove.common import cfg
 from trove.common import utils
 from trove.common import instance as rd_instance
 from trove.conductor import api as conductor_api
@@ -179,6 +181,9 @@ class MySqlAdminTest(testtools.TestCase):
 
         super(MySqlAdminTest, self).setUp()
 
+        # These tests check each statement on its own; SqlBatchTest covers
+        # sending them in batches.
+        cfg.CONF.set_override('sql_batch_size', 1)
         self.orig_get_engine = dbaas.get_engine
         self.orig_LocalSqlClient = dbaas.LocalSqlClient
         self.orig_LocalSqlClient_enter = dbaas.LocalSqlClient.__enter__
@@ -196,6 +201,7 @@ class MySqlAdminTest(testtools.TestCase):
     def tearDown(self):
 
         super(MySqlAdminTest, self).tearDown()
+        cfg.CONF.clear_override('sql_batch_size')
         dbaas.get_engine = self.orig_get_engine
         dbaas.LocalSqlClient = self.orig_LocalSqlClient
         dbaas.LocalSqlClient.__enter__ = self.orig_LocalSqlClient_enter
@@ -467,6 +473,137 @@ class MySqlAdminTest(testtools.TestCase):
             self.assertTrue(text in args[0].text, "%s not in query." % text)
 
 
+class SqlBatchTest(testtools.TestCase):
+    """Runs SqlBatch inside a real LocalSqlClient block on sqlite. sqlite
+    cannot run multi-statement queries, so the DB-API cursor used for the
+    batches is replaced while the single statements run for real.
+    """
+
+    def setUp(self):
+        super(SqlBatchTest, self).setUp()
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        self.cursor = MagicMock()
+        self.cursor.nextset.return_value = False
+
+    def _run(self, statements, batch_size=3):
+        with dbaas.LocalSqlClient(self.engine, use_flush=False) as client:
+            with patch.object(client.connection, 'cursor',
+                              return_value=self.cursor):
+                batch = dbaas.SqlBatch(client, batch_size=batch_size)
+                for item, sql in statements:
+                    batch.add(item, sql)
+                return batch.execute()
+
+    def _tables(self):
+        rows = self.engine.execute("SELECT name FROM sqlite_master "
+                                   "WHERE type = 'table'")
+        return sorted(row[0] for row in rows)
+
+    def test_statements_sent_in_batches(self):
+        failures = self._run([('t%d' % index,
+                               "CREATE TABLE t%d (a INTEGER);" % index)
+                              for index in range(5)])
+
+        self.assertEqual({}, failures)
+        self.assertEqual(2, self.cursor.execute.call_count)
+        sql, = self.cursor.execute.call_args_list[0][0]
+        self.assertEqual(3, len(sql.split("\n")))
+        self.assertTrue(self.cursor.close.called)
+
+    def test_failed_batch_retried_one_at_a_time(self):
+        self.cursor.execute.side_effect = sqlite3.OperationalError("batch")
+        statements = [('t%d' % index, "CREATE TABLE t%d (a INTEGER);" % index)
+                      for index in range(5)]
+        statements[1] = ('t1', "CREATE TABLE t1 (;")
+
+        failures = self._run(statements)
+
+        self.assertEqual(['t1'], list(failures))
+        self.assertEqual(['t0', 't2', 't3', 't4'], self._tables())
+
+    def test_statements_after_a_failure_skipped_for_the_item(self):
+        self.cursor.execute.side_effect = sqlite3.OperationalError("batch")
+
+        failures = self._run([('u1', "CREATE TABLE u1 (;"),
+                              ('u2', "CREATE TABLE u2 (a INTEGER);"),
+                              ('u1', "CREATE TABLE u1 (a INTEGER);"),
+                              ('u2', "CREATE TABLE u2b (a INTEGER);")],
+                             batch_size=2)
+
+        self.assertEqual(['u1'], list(failures))
+        self.assertEqual(['u2', 'u2b'], self._tables())
+
+    def test_programming_errors_not_swallowed(self):
+        self.cursor.execute.side_effect = AttributeError("execute_many")
+        self.assertRaises(AttributeError, self._run,
+                          [('t0', "CREATE TABLE t0 (a INTEGER);"),
+                           ('t1', "CREATE TABLE t1 (a INTEGER);")])
+
+
+class MySqlAdminGrantsTest(testtools.TestCase):
+    """Loads user grants from a stand-in for MySQL's information_schema,
+    kept in sqlite and holding thousands of users.
+    """
+
+    NUM_USERS = 5000
+    NUM_DATABASES = 50
+
+    def setUp(self):
+        super(MySqlAdminGrantsTest, self).setUp()
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        self.engine.execute("ATTACH DATABASE ':memory:' "
+                            "AS information_schema")
+        self.engine.execute("CREATE TABLE "
+                            "information_schema.SCHEMA_PRIVILEGES "
+                            "(grantee TEXT, table_schema TEXT, "
+                            "privilege_type TEXT)")
+        rows = []
+        for index in range(self.NUM_USERS):
+            grantee = "'user%d'@'%%'" % index
+            rows.append((grantee, 'db%d' % (index % 7), 'USAGE'))
+            for db_index in self._db_indexes(index):
+                for privilege in ('SELECT', 'INSERT'):
+                    rows.append((grantee, 'db%d' % db_index, privilege))
+        self.engine.execute(
+            sqlalchemy.text("INSERT INTO "
+                            "information_schema.SCHEMA_PRIVILEGES "
+                            "VALUES (:grantee, :table_schema, :privilege)"),
+            [{'grantee': grantee, 'table_schema': schema,
+              'privilege': privilege}
+             for grantee, schema, privilege in rows])
+
+    def _db_indexes(self, index):
+        return sorted(set([index % self.NUM_DATABASES,
+                           (index + 1) % self.NUM_DATABASES]))
+
+    def test_load_user_dbs_with_one_query(self):
+        users = []
+        for index in range(1000, 1100):
+            user = models.MySQLUser()
+            user.name = 'user%d' % index
+            user.host = '%'
+            users.append(user)
+
+        with dbaas.LocalSqlClient(self.engine, use_flush=False) as client:
+            with patch.object(client, 'execute',
+                              wraps=client.execute) as execute:
+                MySqlAdmin()._load_user_dbs(client, users)
+
+        self.assertEqual(1, execute.call_count)
+        for index, user in zip(range(1000, 1100), users):
+            self.assertEqual(sorted('db%d' % db
+                                    for db in self._db_indexes(index)),
+                             sorted(db['_name'] for db in user.databases))
+
+    def test_get_grants_leaves_out_users_without_grants(self):
+        with dbaas.LocalSqlClient(self.engine, use_flush=False) as client:
+            grants = MySqlAdmin()._get_grants(
+                client, ["'user1'@'%'", "'nobody'@'%'"])
+        self.assertEqual({"'user1'@'%'": ['db1', 'db2']},
+                         dict((grantee, sorted(dbs))
+                              for grantee, dbs in grants.items()))
+
+
 class MySqlAppTest(testtools.TestCase):
 
     def setUp(self):
@@ -12,14 +12,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from mock import Mock
+from mock import Mock, patch
+from novaclient import exceptions as nova_exceptions
 from testtools import TestCase
 from trove.common import cfg
+from trove.common import exception
 from trove.common.instance import ServiceStatuses
+from trove.instance import models as instance_models
+from trove.instance.models import create_server_list_matcher
 from trove.instance.models import filter_ips
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import DBInstance
 from trove.instance.models import Instance
+from trove.instance.models import Instances
+from trove.instance.models import load_servers_for_instances
 from trove.instance.models import SimpleInstance
 from trove.instance.tasks import InstanceTasks
 
@@ -84,3 +90,193 @@ class SimpleInstanceTest(TestCase):
         self.assertTrue('10.123.123.123' in ip)
         self.assertTrue('123.123.123.123' in ip)
         self.assertTrue('15.123.123.123' in ip)
+
+
+class ServerListMatcherTest(TestCase):
+
+    def _server(self, id, status='ACTIVE'):
+        server = Mock()
+        server.id = id
+        server.status = status
+        return server
+
+    def test_find_server(self):
+        servers = [self._server('s%d' % i) for i in range(100)]
+        find_server = create_server_list_matcher(servers)
+        self.assertIs(servers[42], find_server('i42', 's42'))
+
+    def test_find_server_not_found(self):
+        find_server = create_server_list_matcher([self._server('s1')])
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          find_server, 'i2', 's2')
+
+    def test_find_server_duplicate(self):
+        find_server = create_server_list_matcher([self._server('s1'),
+                                                  self._server('s1')])
+        self.assertRaises(exception.TroveError, find_server, 'i1', 's1')
+
+    def test_find_server_no_servers(self):
+        find_server = create_server_list_matcher(None)
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          find_server, 'i1', 's1')
+
+
+class LoadServersStatusTest(TestCase):
+
+    def _db_info(self, id, task_status=InstanceTasks.NONE):
+        return DBInstance(task_status, id=id, compute_instance_id='s' + id)
+
+    def test_statuses_loaded_in_one_query(self):
+        db_items = [self._db_info(str(i)) for i in range(10)]
+        statuses = dict(
+            (db.id, InstanceServiceStatus(ServiceStatuses.RUNNING,
+                                          instance_id=db.id))
+            for db in db_items)
+        find_server = create_server_list_matcher([])
+        load_instance = Mock()
+        with patch('trove.instance.models.load_service_statuses',
+                   return_value=statuses) as load_statuses:
+            ret = Instances._load_servers_status(load_instance, None,
+                                                 db_items, find_server)
+        load_statuses.assert_called_once_with([db.id for db in db_items])
+        self.assertEqual(10, len(ret))
+        self.assertEqual(10, load_instance.call_count)
+        self.assertEqual('SHUTDOWN', db_items[0].server_status)
+
+    def test_instances_without_status_skipped(self):
+        db_items = [self._db_info('1'), self._db_info('2')]
+        statuses = {'2': InstanceServiceStatus(ServiceStatuses.RUNNING,
+                                               instance_id='2')}
+        server = Mock()
+        server.id = 's2'
+        server.status = 'ACTIVE'
+        find_server = create_server_list_matcher([server])
+        load_instance = Mock()
+        with patch('trove.instance.models.load_service_statuses',
+                   return_value=statuses):
+            ret = Instances._load_servers_status(load_instance, None,
+                                                 db_items, find_server)
+        self.assertEqual(1, len(ret))
+        load_instance.assert_called_once_with(None, db_items[1],
+                                              statuses['2'], server=server)
+        self.assertEqual('ACTIVE', db_items[1].server_status)
+
+
+class LoadServersForInstancesTest(TestCase):
+
+    def test_only_page_servers_fetched(self):
+        db_items = [DBInstance(InstanceTasks.NONE, id='1',
+                               compute_instance_id='s1'),
+                    DBInstance(InstanceTasks.BUILDING, id='2',
+                               compute_instance_id='s2'),
+                    DBInstance(InstanceTasks.NONE, id='3',
+                               compute_instance_id='s3')]
+        client = Mock()
+
+        def get_server(server_id):
+            if server_id == 's3':
+                raise nova_exceptions.NotFound(404)
+            server = Mock()
+            server.id = server_id
+            return server
+
+        client.servers.get.side_effect = get_server
+        with patch('trove.instance.models.create_nova_client',
+                   return_value=client):
+            servers = load_servers_for_instances(Mock(), db_items)
+        self.assertEqual(['s1'], [server.id for server in servers])
+        self.assertEqual(2, client.servers.get.call_count)
+        self.assertFalse(client.servers.list.called)
+
+    def test_fetch_concurrency_is_bounded(self):
+        db_items = [DBInstance(InstanceTasks.NONE, id=str(i),
+                               compute_instance_id='s%d' % i)
+                    for i in range(CONF.server_load_concurrency * 3)]
+        client = Mock()
+        with patch('trove.instance.models.create_nova_client',
+                   return_value=client):
+            with patch.object(instance_models.eventlet, 'GreenPool',
+                              wraps=instance_models.eventlet.GreenPool) as gp:
+                servers = load_servers_for_instances(Mock(), db_items)
+        gp.assert_called_once_with(CONF.server_load_concurrency)
+        self.assertEqual(len(db_items), len(servers))
+
+    def test_no_servers_skips_nova(self):
+        db_items = [DBInstance(InstanceTasks.BUILDING, id='1',
+                               compute_instance_id=None)]
+        with patch('trove.instance.models.create_nova_client') as create:
+            self.assertEqual([], load_servers_for_instances(None, db_items))
+        self.assertFalse(create.called)
+
+
+class ServerCacheTest(TestCase):
+
+    def setUp(self):
+        super(ServerCacheTest, self).setUp()
+        self.orig_ttl = instance_models.SERVER_CACHE.ttl
+        instance_models.SERVER_CACHE.ttl = 60
+        self.context = Mock()
+        self.context.tenant = 'tenant'
+
+    def tearDown(self):
+        super(ServerCacheTest, self).tearDown()
+        instance_models.SERVER_CACHE.ttl = self.orig_ttl
+        instance_models.SERVER_CACHE.clear()
+
+    def _server(self, id):
+        server = Mock()
+        server.id = id
+        server.tenant_id = 'tenant'
+        return server
+
+    def test_load_server_reads_through_cache(self):
+        client = Mock()
+        client.servers.get.return_value = self._server('s1')
+        with patch('trove.instance.models.create_nova_client',
+                   return_value=client):
+            first = instance_models.load_server(self.context, 'i1', 's1',
+                                                use_cache=True)
+            second = instance_models.load_server(self.context, 'i1', 's1',
+                                                 use_cache=True)
+        self.assertIs(first, second)
+        self.assertEqual(1, client.servers.get.call_count)
+
+    def test_load_server_bypasses_cache_by_default(self):
+        instance_models.cache_servers([self._server('s1')])
+        client = Mock()
+        client.servers.get.return_value = self._server('s1')
+        with patch('trove.instance.models.create_nova_client',
+                   return_value=client):
+            server = instance_models.load_server(self.context, 'i1', 's1')
+        self.assertIs(client.servers.get.return_value, server)
+        self.assertEqual(1, client.servers.get.call_count)
+
+    def test_cache_is_tenant_scoped(self):
+        instance_models.cache_servers([self._server('s1')])
+        self.assertIsNone(instance_models.get_cached_server('other', 's1'))
+        self.assertIsNotNone(instance_models.get_cached_server('tenant',
+                                                               's1'))
+
+    def test_invalidate(self):
+        instance_models.cache_servers([self._server('s1')])
+        instance_models.invalidate_cached_server('tenant', 's1')
+        self.assertIsNone(instance_models.get_cached_server('tenant', 's1'))
+
+    def test_reboot_invalidates_cached_server(self):
+        instance_models.cache_servers([self._server('s1')])
+        instance = Instance.__new__(Instance)
+        instance.context = self.context
+        instance.db_info = DBInstance(InstanceTasks.NONE, id='i1',
+                                      tenant_id='tenant',
+                                      compute_instance_id='s1')
+        with patch.object(instance, 'validate_can_perform_action'):
+            with patch.object(instance, 'update_db'):
+                with patch('trove.instance.models.task_api.API') as api:
+                    instance.reboot()
+        api.return_value.reboot.assert_called_once_with('i1')
+        self.assertIsNone(instance_models.get_cached_server('tenant', 's1'))
+
+    def test_disabled_cache(self):
+        instance_models.SERVER_CACHE.ttl = 0
+        instance_models.cache_servers([self._server('s1')])
+        self.assertIsNone(instance_models.get_cached_server('tenant', 's1'))
@@ -0,0 +1,104 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import random
+import uuid
+
+import testtools
+from sqlalchemy import orm
+
+from trove.common import exception
+from trove.db.sqlalchemy import session
+from trove.extensions.account.models import AccountsSummary
+from trove.instance.models import DBInstance
+from trove.tests.unittests.util import util
+
+
+class AccountsSummaryTest(testtools.TestCase):
+
+    def setUp(self):
+        super(AccountsSummaryTest, self).setUp()
+        util.init_db()
+        self.prefix = str(uuid.uuid4())[:8]
+        self.table = orm.class_mapper(DBInstance).mapped_table
+        self.db_session = session.get_session()
+        self.addCleanup(self.db_session.execute, self.table.delete().where(
+            self.table.c.tenant_id.like(self.prefix + '%')))
+        self.expected = self._insert_instances(num_tenants=5,
+                                               num_instances=20)
+
+    def _insert_instances(self, num_tenants, num_instances):
+        """Insert instances spread unevenly over tenants.
+
+        Returns the number of non-deleted instances of each tenant.
+        """
+        expected = {}
+        rows = []
+        rand = random.Random(0)
+        for _index in range(num_instances):
+            tenant = rand.randint(0, num_tenants - 1)
+            tenant_id = '%s-%04d' % (self.prefix, tenant)
+            deleted = rand.random() < 0.1
+            if not deleted:
+                expected[tenant_id] = expected.get(tenant_id, 0) + 1
+            rows.append({'id': str(uuid.uuid4()),
+                         'tenant_id': tenant_id,
+                         'deleted': deleted})
+        self.db_session.execute(self.table.insert(), rows)
+        return expected
+
+    def _ours(self, accounts):
+        return dict((account['id'], account['num_instances'])
+                    for account in accounts
+                    if account['id'].startswith(self.prefix))
+
+    def _load_pages(self, limit, sort_by=None):
+        accounts = []
+        marker = None
+        while True:
+            summary = AccountsSummary.load(limit=limit, marker=marker,
+                                           sort_by=sort_by)
+            self.assertTrue(len(summary.accounts) <= limit)
+            accounts.extend(summary.accounts)
+            if not summary.next_marker:
+                return accounts
+            marker = summary.next_marker
+
+    def test_load_counts_instances_per_tenant(self):
+        summary = AccountsSummary.load()
+        self.assertEqual(self.expected, self._ours(summary.accounts))
+        self.assertIsNone(summary.next_marker)
+
+    def test_load_pages_by_id(self):
+        accounts = self._load_pages(limit=2)
+        ids = [account['id'] for account in accounts]
+        self.assertEqual(sorted(set(ids)), ids)
+        self.assertEqual(self.expected, self._ours(accounts))
+
+    def test_load_pages_by_num_instances(self):
+        accounts = self._load_pages(limit=2, sort_by='num_instances')
+        keys = [(-account['num_instances'], account['id'])
+                for account in accounts]
+        self.assertEqual(sorted(set(keys)), keys)
+        self.assertEqual(self.expected, self._ours(accounts))
+
+    def test_load_pages_many_tenants(self):
+        more = self._insert_instances(num_tenants=500, num_instances=10000)
+        for tenant_id, count in more.items():
+            self.expected[tenant_id] = self.expected.get(tenant_id, 0) + count
+        accounts = self._load_pages(limit=70, sort_by='num_instances')
+        self.assertEqual(self.expected, self._ours(accounts))
+
+    def test_load_rejects_unknown_sort_key(self):
+        self.assertRaises(exception.BadRequest, AccountsSummary.load,
+                          sort_by='name')
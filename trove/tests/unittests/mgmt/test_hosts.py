@@ -0,0 +1,56 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from mock import MagicMock, patch
+from testtools import TestCase
+
+from trove.common import exception
+from trove.extensions.mgmt.host import models
+
+
+class DetailedHostTest(TestCase):
+
+    def setUp(self):
+        super(DetailedHostTest, self).setUp()
+        host_info = MagicMock()
+        host_info.name = 'host_1'
+        host_info.instances = [{'uuid': 'server_%d' % i} for i in range(3)]
+        found = {}
+        for i in range(2):
+            db_info = MagicMock(id='instance_%d' % i, tenant_id='tenant')
+            found['server_%d' % i] = (db_info, MagicMock())
+        with patch.object(models, 'load_instances_by_compute_ids',
+                          return_value=found) as load:
+            with patch.object(models, 'SimpleInstance'):
+                self.host = models.DetailedHost(host_info)
+        load.assert_called_once_with(['server_0', 'server_1', 'server_2'])
+
+    def test_instances_resolved_in_bulk(self):
+        self.assertEqual(['instance_0', 'instance_1'], self.host.instance_ids)
+        self.assertIsNone(self.host.instances[2]['id'])
+
+    def test_update_all(self):
+        client = MagicMock()
+        with patch.object(models, 'create_guest_client',
+                          return_value=client):
+            self.host.update_all(MagicMock())
+        self.assertEqual(2, client.update_guest.call_count)
+
+    def test_update_all_reports_failures(self):
+        client = MagicMock()
+        client.update_guest.side_effect = [None, exception.TroveError()]
+        with patch.object(models, 'create_guest_client',
+                          return_value=client):
+            self.assertRaises(exception.UpdateGuestError,
+                              self.host.update_all, MagicMock())
+        self.assertEqual(2, client.update_guest.call_count)
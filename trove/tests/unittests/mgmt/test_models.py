@@ -79,8 +79,10 @@ class TestNotificationTransformer(MockMgmtInstanceTest):
         db_instance = MockMgmtInstanceTest.build_db_instance(
             status, InstanceTasks.BUILDING)
 
-        with patch.object(DatabaseModelBase, 'find_all',
-                          return_value=[db_instance]):
+        service_status = InstanceServiceStatus(
+            rd_instance.ServiceStatuses.BUILDING)
+        with patch.object(mgmtmodels, 'iter_instances_with_status',
+                          return_value=[(db_instance, service_status)]):
             stub_dsv_db_info = MagicMock(
                 spec=datastore_models.DBDatastoreVersion)
             stub_dsv_db_info.id = "test_datastore_version"
@@ -93,16 +95,9 @@ class TestNotificationTransformer(MockMgmtInstanceTest):
             stub_datastore_version = datastore_models.DatastoreVersion(
                 stub_dsv_db_info)
 
-            def side_effect_func(*args, **kwargs):
-                if 'instance_id' in kwargs:
-                    return InstanceServiceStatus(
-                        rd_instance.ServiceStatuses.BUILDING)
-                else:
-                    return stub_datastore_version
-
             with patch.object(DatabaseModelBase, 'find_by',
-                              side_effect=side_effect_func):
-                payloads = transformer()
+                              return_value=stub_datastore_version):
+                payloads = list(transformer())
                 self.assertIsNotNone(payloads)
                 self.assertThat(len(payloads), Equals(1))
                 payload = payloads[0]
@@ -182,7 +177,7 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         with patch.object(DatabaseModelBase, 'find_by',
                           return_value=stub_datastore_version):
 
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
+            with patch.object(mgmtmodels, 'iter_mgmt_instances',
                               return_value=[mgmt_instance]):
 
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
@@ -190,7 +185,7 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
                     # invocation
                     transformer = mgmtmodels.NovaNotificationTransformer(
                         context=self.context)
-                    payloads = transformer()
+                    payloads = list(transformer())
 
                     # assertions
                     self.assertIsNotNone(payloads)
@@ -235,7 +230,7 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
                                                                   db_instance,
                                                                   server,
                                                                   None)
-                    with patch.object(mgmtmodels, 'load_mgmt_instances',
+                    with patch.object(mgmtmodels, 'iter_mgmt_instances',
                                       return_value=[mgmt_instance]):
                         with patch.object(self.flavor_mgr,
                                           'get', return_value=flavor):
@@ -246,7 +241,7 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
                                     context=self.context)
                             )
 
-                            payloads = transformer()
+                            payloads = list(transformer())
                             # assertions
                             self.assertIsNotNone(payloads)
                             self.assertThat(len(payloads), Equals(1))
@@ -281,13 +276,13 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
 
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
+            with patch.object(mgmtmodels, 'iter_mgmt_instances',
                               return_value=[mgmt_instance]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     # invocation
                     transformer = mgmtmodels.NovaNotificationTransformer(
                         context=self.context)
-                    payloads = transformer()
+                    payloads = list(transformer())
                     # assertion that SHUTDOWN instances are not reported
                     self.assertIsNotNone(payloads)
                     self.assertThat(len(payloads), Equals(0))
@@ -305,13 +300,13 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
 
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
+            with patch.object(mgmtmodels, 'iter_mgmt_instances',
                               return_value=[mgmt_instance]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     # invocation
                     transformer = mgmtmodels.NovaNotificationTransformer(
                         context=self.context)
-                    payloads = transformer()
+                    payloads = list(transformer())
                     # assertion that SHUTDOWN instances are not reported
                     self.assertIsNotNone(payloads)
                     self.assertThat(len(payloads), Equals(0))
@@ -330,14 +325,14 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
+        with patch.object(mgmtmodels, 'iter_mgmt_instances',
                           return_value=[mgmt_instance]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                 transformer = mgmtmodels.NovaNotificationTransformer(
                     context=self.context)
-                transformer()
+                list(transformer())
                 # call twice ensure client.flavor invoked once
-                payloads = transformer()
+                payloads = list(transformer())
                 self.assertIsNotNone(payloads)
                 self.assertThat(len(payloads), Equals(1))
                 payload = payloads[0]
@@ -369,7 +364,7 @@ class TestMgmtInstanceTasks(MockMgmtInstanceTest):
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
+        with patch.object(mgmtmodels, 'iter_mgmt_instances',
                           return_value=[mgmt_instance]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                 self.assertThat(self.context.auth_token,
@@ -387,3 +382,45 @@ class TestMgmtInstanceTasks(MockMgmtInstanceTest):
                                                     'INFO',
                                                     ANY)
                     self.assertThat(self.context.auth_token, Is(None))
+
+    def test_publish_exists_events_in_batches(self):
+        CONF.set_override('exists_notification_batch_size', 2)
+        self.addCleanup(CONF.clear_override, 'exists_notification_batch_size')
+        transformer = MagicMock(return_value=iter([{}] * 5))
+
+        with patch.object(mgmtmodels, '_exists_batch_pause',
+                          return_value=7):
+            with patch.object(mgmtmodels.greenthread, 'sleep') as sleep:
+                with patch.object(notifier, 'notify', return_value=None):
+                    mgmtmodels.publish_exist_events(transformer,
+                                                    self.context)
+                    self.assertThat(notifier.notify.call_count, Equals(5))
+                    self.assertThat(sleep.call_count, Equals(2))
+                    sleep.assert_called_with(7)
+
+    def test_iter_mgmt_instances_pages_servers(self):
+        servers = []
+        for index in range(3):
+            server = MagicMock(spec=Server)
+            server.id = 'compute_id_%d' % index
+            servers.append(server)
+        self.server_mgr.list.side_effect = [servers[:2], servers[2:], []]
+        rows = []
+        for server in servers:
+            db_info = MagicMock(compute_instance_id=server.id)
+            rows.append((db_info, MagicMock()))
+        query = MagicMock()
+        query.filter.return_value.all.side_effect = [rows[:2], rows[2:]]
+
+        with patch.object(mgmtmodels, '_instances_with_status_query',
+                          return_value=query):
+            with patch.object(mgmtmodels, 'SimpleMgmtInstance') as instance:
+                instances = list(mgmtmodels.iter_mgmt_instances(
+                    self.context, self.client, batch_size=2))
+
+        self.assertThat(len(instances), Equals(3))
+        self.assertThat([call[0][2] for call in instance.call_args_list],
+                        Equals(servers))
+        self.server_mgr.list.assert_called_with(
+            search_opts={'all_tenants': 1, 'limit': 2,
+                         'marker': 'compute_id_2'})
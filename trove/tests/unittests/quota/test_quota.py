@@ -11,8 +11,12 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import sqlalchemy.exc
 import testtools
 from mock import Mock, MagicMock, patch
+from sqlalchemy.orm import Query
+from trove.quota import quota
+from trove.quota.quota import BulkDbQuotaDriver
 from trove.quota.quota import DbQuotaDriver
 from trove.quota.models import Resource
 from trove.quota.models import Quota
@@ -22,8 +26,10 @@ from trove.db.models import DatabaseModelBase
 from trove.extensions.mgmt.quota.service import QuotaController
 from trove.common import exception
 from trove.common import cfg
+from trove.common import utils
 from trove.quota.quota import run_with_quotas
 from trove.quota.quota import QUOTAS
+from trove.tests.unittests.util import util
 """
 Unit tests for the classes and functions in DbQuotaDriver.py.
 """
@@ -119,6 +125,28 @@ class QuotaControllerTest(testtools.TestCase):
             self.assertEqual(200, result.status)
             self.assertEqual(2, result._data['quotas']['instances'])
 
+    def test_update_invalidates_cached_quotas(self):
+        instance_quota = MagicMock(spec=Quota)
+        with patch.object(DatabaseModelBase, 'find_by',
+                          return_value=instance_quota):
+            with patch.object(QUOTAS, 'invalidate_quotas') as invalidate:
+                body = {'quotas': {'instances': 2}}
+                self.controller.update(self.req, body, FAKE_TENANT1,
+                                       FAKE_TENANT2)
+        invalidate.assert_called_once_with(FAKE_TENANT2)
+
+    def test_update_invalidates_cached_quotas_on_failure(self):
+        instance_quota = MagicMock(spec=Quota)
+        instance_quota.save.side_effect = exception.TroveError()
+        with patch.object(DatabaseModelBase, 'find_by',
+                          return_value=instance_quota):
+            with patch.object(QUOTAS, 'invalidate_quotas') as invalidate:
+                body = {'quotas': {'instances': 2}}
+                self.assertRaises(exception.TroveError,
+                                  self.controller.update, self.req, body,
+                                  FAKE_TENANT1, FAKE_TENANT2)
+        invalidate.assert_called_once_with(FAKE_TENANT2)
+
     @testtools.skipIf(not CONF.trove_volume_support,
                       'Volume support is not enabled')
     def test_update_resource_volume(self):
@@ -224,6 +252,44 @@ class DbQuotaDriverTest(testtools.TestCase):
         self.assertEqual(Resource.VOLUMES, quotas[Resource.VOLUMES].resource)
         self.assertEqual(15, quotas[Resource.VOLUMES].hard_limit)
 
+    def test_get_all_quotas_by_tenant_cached(self):
+
+        FAKE_QUOTAS = [Quota(tenant_id=FAKE_TENANT1,
+                             resource=Resource.INSTANCES,
+                             hard_limit=22)]
+
+        self.mock_quota_result.all = Mock(return_value=FAKE_QUOTAS)
+
+        with patch.object(quota, 'QUOTA_CACHE',
+                          utils.ExpiringCache(ttl=60)):
+            for _ in range(2):
+                quotas = self.driver.get_all_quotas_by_tenant(
+                    FAKE_TENANT1, resources.keys())
+                self.assertEqual(22, quotas[Resource.INSTANCES].hard_limit)
+            self.assertEqual(1, Quota.find_all.call_count)
+
+            self.driver.invalidate_quotas(FAKE_TENANT1)
+            self.driver.get_all_quotas_by_tenant(FAKE_TENANT1,
+                                                 resources.keys())
+            self.assertEqual(2, Quota.find_all.call_count)
+
+    def test_get_all_quotas_by_tenant_cache_not_shared(self):
+
+        FAKE_QUOTAS = [Quota(tenant_id=FAKE_TENANT1,
+                             resource=Resource.INSTANCES,
+                             hard_limit=22)]
+
+        self.mock_quota_result.all = Mock(return_value=FAKE_QUOTAS)
+
+        with patch.object(quota, 'QUOTA_CACHE',
+                          utils.ExpiringCache(ttl=60)):
+            quotas = self.driver.get_all_quotas_by_tenant(FAKE_TENANT1,
+                                                          resources.keys())
+            quotas[Resource.INSTANCES].hard_limit = 1
+            quotas = self.driver.get_all_quotas_by_tenant(FAKE_TENANT1,
+                                                          resources.keys())
+        self.assertEqual(22, quotas[Resource.INSTANCES].hard_limit)
+
     def test_get_all_quotas_by_tenant_with_all_default(self):
 
         self.mock_quota_result.all = Mock(return_value=[])
@@ -611,3 +677,118 @@ class DbQuotaDriverTest(testtools.TestCase):
         self.assertEqual(0, FAKE_QUOTAS[1].reserved)
         self.assertEqual(Reservation.Statuses.ROLLEDBACK,
                          FAKE_RESERVATIONS[1].status)
+
+
+class BulkDbQuotaDriverTest(testtools.TestCase):
+
+    def setUp(self):
+        super(BulkDbQuotaDriverTest, self).setUp()
+        util.init_db()
+        self.driver = BulkDbQuotaDriver(resources)
+        self.tenant_id = utils.generate_uuid()
+
+    def _usage(self, resource=Resource.INSTANCES):
+        return QuotaUsage.find_by(tenant_id=self.tenant_id, resource=resource)
+
+    def test_reserve(self):
+        reservations = self.driver.reserve(self.tenant_id, resources,
+                                           {'instances': 2, 'volumes': 3})
+        self.assertEqual(2, len(reservations))
+        self.assertEqual(2, self._usage(Resource.INSTANCES).reserved)
+        self.assertEqual(3, self._usage(Resource.VOLUMES).reserved)
+        for reservation in reservations:
+            self.assertEqual(Reservation.Statuses.RESERVED,
+                             Reservation.find_by(id=reservation.id).status)
+
+    def test_reserve_over_quota(self):
+        delta = {'instances': 1, 'volumes': CONF.max_volumes_per_user + 1}
+        self.assertRaises(exception.QuotaExceeded,
+                          self.driver.reserve,
+                          self.tenant_id,
+                          resources,
+                          delta)
+        self.assertEqual(0, QuotaUsage.find_all(
+            tenant_id=self.tenant_id).count())
+
+    def test_commit(self):
+        reservations = self.driver.reserve(self.tenant_id, resources,
+                                           {'instances': 2})
+        self.driver.commit(reservations)
+        usage = self._usage()
+        self.assertEqual(2, usage.in_use)
+        self.assertEqual(0, usage.reserved)
+        self.assertEqual(Reservation.Statuses.COMMITTED,
+                         Reservation.find_by(id=reservations[0].id).status)
+        self.assertEqual(Reservation.Statuses.COMMITTED,
+                         reservations[0].status)
+
+    def test_commit_cannot_be_less_than_zero(self):
+        reservations = self.driver.reserve(self.tenant_id, resources,
+                                           {'instances': -1})
+        self.driver.commit(reservations)
+        usage = self._usage()
+        self.assertEqual(0, usage.in_use)
+        self.assertEqual(0, usage.reserved)
+
+    def test_rollback(self):
+        reservations = self.driver.reserve(self.tenant_id, resources,
+                                           {'instances': 2})
+        self.driver.rollback(reservations)
+        usage = self._usage()
+        self.assertEqual(0, usage.in_use)
+        self.assertEqual(0, usage.reserved)
+        self.assertEqual(Reservation.Statuses.ROLLEDBACK,
+                         Reservation.find_by(id=reservations[0].id).status)
+
+    def test_reserve_locks_usages(self):
+        self.driver.reserve(self.tenant_id, resources, {'instances': 1})
+        with patch.object(Query, 'with_lockmode', autospec=True,
+                          side_effect=Query.with_lockmode) as lock:
+            self.driver.reserve(self.tenant_id, resources, {'instances': 1})
+        self.assertEqual(1, lock.call_count)
+        self.assertEqual('update', lock.call_args[0][1])
+        self.assertEqual(2, self._usage().reserved)
+
+    def test_reserve_retries_when_usage_created_concurrently(self):
+        lock_usages = self.driver._lock_usages
+
+        def interleave(db_session, tenant_id, resources):
+            usages = lock_usages(db_session, tenant_id, resources)
+            if not usages:
+                # Another reserve creates the row after this one found none.
+                QuotaUsage.create(tenant_id=tenant_id,
+                                  resource=Resource.INSTANCES,
+                                  in_use=1, reserved=0)
+            return usages
+
+        with patch.object(self.driver, '_lock_usages',
+                          side_effect=interleave) as lock:
+            reservations = self.driver.reserve(self.tenant_id, resources,
+                                               {'instances': 1})
+        self.assertEqual(2, lock.call_count)
+        self.assertEqual(1, len(reservations))
+        self.assertEqual(1, QuotaUsage.find_all(
+            tenant_id=self.tenant_id).count())
+        usage = self._usage()
+        self.assertEqual(1, usage.in_use)
+        self.assertEqual(1, usage.reserved)
+
+    def test_reserve_gives_up_after_attempts(self):
+        error = sqlalchemy.exc.OperationalError(
+            'SELECT', {}, Exception('Deadlock found when trying to get lock'))
+        with patch.object(self.driver, '_reserve',
+                          side_effect=error) as reserve:
+            self.assertRaises(sqlalchemy.exc.OperationalError,
+                              self.driver.reserve, self.tenant_id,
+                              resources, {'instances': 1})
+        self.assertEqual(self.driver.reserve_attempts, reserve.call_count)
+
+    def test_reserve_does_not_retry_other_errors(self):
+        error = sqlalchemy.exc.OperationalError(
+            'SELECT', {}, Exception('database is locked'))
+        with patch.object(self.driver, '_reserve',
+                          side_effect=error) as reserve:
+            self.assertRaises(sqlalchemy.exc.OperationalError,
+                              self.driver.reserve, self.tenant_id,
+                              resources, {'instances': 1})
+        self.assertEqual(1, reserve.call_count)
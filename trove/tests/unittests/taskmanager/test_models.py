@@ -13,6 +13,7 @@
 #    under the License.
 import datetime
 
+import eventlet
 import testtools
 from mock import Mock, MagicMock, patch
 from testtools.matchers import Equals, Is
@@ -38,6 +39,7 @@ from trove.extensions.mysql import models as mysql_models
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceStatus
 from trove.instance.models import DBInstance
+from trove.guestagent.strategies.storage.local import LocalStorage
 from trove.instance.tasks import InstanceTasks
 
 from trove.tests.unittests.util import util
@@ -581,6 +583,27 @@ class BuiltInstanceTasksTest(testtools.TestCase):
                             Is(InstanceTasks.NONE))
             self.assertThat(self.db_instance.flavor_id, Is('6'))
 
+    def test_delete_resources(self):
+        self.instance_task._delete_server = Mock()
+        self.instance_task._delete_dns_entry = Mock()
+        self.instance_task.send_usage_event = Mock()
+        with patch.object(taskmanager_models.SERVER_DELETIONS,
+                          'wait') as wait:
+            self.instance_task._delete_resources(datetime.datetime.utcnow())
+        self.instance_task._delete_server.assert_called_once_with()
+        self.instance_task._delete_dns_entry.assert_called_once_with()
+        self.assertEqual('computeinst-id-1', wait.call_args[0][2])
+        self.assertTrue(self.instance_task.send_usage_event.called)
+
+    def test_delete_resources_poll_timeout(self):
+        self.instance_task._delete_server = Mock()
+        self.instance_task._delete_dns_entry = Mock()
+        self.instance_task.send_usage_event = Mock()
+        with patch.object(taskmanager_models.SERVER_DELETIONS, 'wait',
+                          side_effect=PollTimeOut):
+            self.instance_task._delete_resources(datetime.datetime.utcnow())
+        self.assertTrue(self.instance_task.send_usage_event.called)
+
 
 class BackupTasksTest(testtools.TestCase):
     def setUp(self):
@@ -652,6 +675,74 @@ class BackupTasksTest(testtools.TestCase):
                 self.backup.state,
                 "backup should be in DELETE_FAILED status")
 
+    def test_delete_backup_from_local_storage(self):
+        self.backup.location = '/var/lib/trove/backups/12e48.xbstream.gz'
+        with patch.object(LocalStorage, 'delete') as delete:
+            taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                         self.backup.id)
+        delete.assert_called_once_with(self.backup.location)
+        self.assertFalse(self.swift_client.delete_object.called)
+        self.backup.delete.assert_any_call()
+
+    def test_delete_backup_fail_delete_local_file(self):
+        self.backup.location = '/var/lib/trove/backups/12e48.xbstream.gz'
+        with patch.object(LocalStorage, 'delete',
+                          side_effect=OSError(13, 'Permission denied')):
+            self.assertRaises(
+                TroveError,
+                taskmanager_models.BackupTasks.delete_backup,
+                'dummy context', self.backup.id)
+        self.assertFalse(self.backup.delete.called)
+        self.assertEqual(backup_models.BackupState.DELETE_FAILED,
+                         self.backup.state)
+
+    def test_delete_backups(self):
+        with patch.object(taskmanager_models.BackupTasks,
+                          'delete_backup') as delete_backup:
+            taskmanager_models.BackupTasks.delete_backups(
+                'dummy context', ['child', 'parent'])
+        self.assertEqual([(('dummy context', 'child'),),
+                          (('dummy context', 'parent'),)],
+                         delete_backup.call_args_list)
+
+    def test_delete_backups_stops_at_failure(self):
+        states = {}
+
+        def get_by_id(context, backup_id):
+            backup = MagicMock(id=backup_id)
+            backup.save.side_effect = (
+                lambda: states.__setitem__(backup_id, backup.state))
+            return backup
+
+        def delete_backup(context, backup_id):
+            if backup_id == 'child':
+                raise TroveError("Failed to delete swift objects")
+
+        with patch.object(taskmanager_models.BackupTasks, 'delete_backup',
+                          side_effect=delete_backup) as delete:
+            with patch.object(backup_models.Backup, 'get_by_id',
+                              side_effect=get_by_id):
+                tasks = taskmanager_models.BackupTasks
+                self.assertRaises(TroveError, tasks.delete_backups,
+                                  'dummy context',
+                                  ['grandchild', 'child', 'parent'])
+        self.assertEqual(2, delete.call_count)
+        failed = backup_models.BackupState.DELETE_FAILED
+        self.assertEqual({'child': failed, 'parent': failed}, states)
+
+    def test_delete_segments_concurrently(self):
+        self.swift_client.head_object = MagicMock(
+            return_value={'x-object-manifest': 'z_CLOUD/12e48'})
+        with patch.object(taskmanager_models,
+                          'BACKUP_DELETE_CONCURRENCY', 2):
+            taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                         self.backup.id)
+        deleted = sorted(call[0][1] for call
+                         in self.swift_client.delete_object.call_args_list)
+        self.assertEqual(['12e48.xbstream.gz', 'first', 'second', 'third'],
+                         deleted)
+        self.backup.delete.assert_any_call()
+
     def test_parse_manifest(self):
         manifest = 'container/prefix'
         cont, prefix = taskmanager_models.BackupTasks._parse_manifest(manifest)
@@ -677,6 +768,72 @@ class BackupTasksTest(testtools.TestCase):
         self.assertEqual(prefix, '')
 
 
+class ServerDeletionPollerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ServerDeletionPollerTest, self).setUp()
+        self.poller = taskmanager_models.ServerDeletionPoller(interval=0)
+        self.servers = dict((server_id, Mock(id=server_id, status='ACTIVE'))
+                            for server_id in ['s1', 's2', 's3'])
+        self.client = Mock()
+        self.client.servers.list.side_effect = self._list
+        self.client.servers.get.side_effect = self._get
+
+    def _list(self):
+        # Every poll sees one server less.
+        servers = sorted(self.servers.values(), key=lambda s: s.id)
+        if servers:
+            del self.servers[servers[0].id]
+        return servers
+
+    def _get(self, server_id):
+        if server_id not in self.servers:
+            raise nova_exceptions.NotFound(404)
+        return self.servers[server_id]
+
+    def test_wait_batches_polls(self):
+        pool = eventlet.GreenPool()
+        for server_id in sorted(self.servers):
+            pool.spawn(self.poller.wait, self.client, 'tenant', server_id, 5)
+        pool.waitall()
+        self.assertEqual(4, self.client.servers.list.call_count)
+        self.assertEqual(0, self.poller.queue_depth)
+
+    def test_wait_timeout(self):
+        self.client.servers.list.side_effect = None
+        self.client.servers.list.return_value = self.servers.values()
+        self.assertRaises(PollTimeOut, self.poller.wait, self.client,
+                          'tenant', 's1', 0.01)
+        self.assertEqual(0, self.poller.queue_depth)
+
+
+    def test_get_errors_do_not_stop_other_tenants(self):
+        bad_client = Mock()
+        bad_client.servers.list.return_value = []
+        bad_client.servers.get.side_effect = Exception("nova is down")
+        pool = eventlet.GreenPool()
+        bad = pool.spawn(self.poller.wait, bad_client, 'bad', 'x1', 0.2)
+        good = pool.spawn(self.poller.wait, self.client, 'tenant', 's1', 5)
+        good.wait()
+        self.assertRaises(PollTimeOut, bad.wait)
+        self.assertEqual(0, self.poller.queue_depth)
+
+    def test_waiter_gone_before_server_deleted(self):
+        self.poller._pending['tenant'] = {'s1': Mock()}
+        self.poller._clients['tenant'] = self.client
+        self.client.servers.list.side_effect = None
+        self.client.servers.list.return_value = []
+
+        def get(server_id):
+            # The waiter times out while the server is looked up.
+            self.poller._remove('tenant', server_id)
+            raise nova_exceptions.NotFound(404)
+        self.client.servers.get.side_effect = get
+
+        self.poller._poll_tenant('tenant')
+        self.assertEqual(0, self.poller.queue_depth)
+
+
 class NotifyMixinTest(testtools.TestCase):
     def test_get_service_id(self):
         id_map = {
@@ -14,7 +14,9 @@
 #    under the License.
 #
 from mock import Mock
+from mock import patch
 from testtools import TestCase
+from trove.extensions.mgmt.upgrade import models
 from trove.extensions.mgmt.upgrade.models import UpgradeMessageSender
 
 
@@ -22,6 +24,9 @@ class TestUpgradeModel(TestCase):
 
     def setUp(self):
         super(TestUpgradeModel, self).setUp()
+        # Some tests replace create with a mock; put the original back.
+        self.addCleanup(setattr, UpgradeMessageSender, 'create',
+                        UpgradeMessageSender.__dict__['create'])
 
     def tearDown(self):
         super(TestUpgradeModel, self).tearDown()
@@ -136,3 +141,20 @@ class TestUpgradeModel(TestCase):
 
         UpgradeMessageSender.create.assert_called_with(
             context, instance_id, instance_version, location, metadata)
+
+    def test_create_all(self):
+        """
+        Test sending the upgrade message to many instances
+        """
+        context = Mock()
+        instance_ids = ['1', '2', '3']
+        client = Mock()
+        client.upgrade.side_effect = [None, Exception('boom'), None]
+
+        with patch.object(models, 'guest_client', return_value=client):
+            send = UpgradeMessageSender.create_all(
+                context, instance_ids, "v1.0.1", "http://swift/guest.tar.gz")
+            failures = send()
+
+        self.assertEqual(3, client.upgrade.call_count)
+        self.assertEqual(1, len(failures))